@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_alter_projectsettings_concept_extraction_prompt_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectsettings',
+            name='quiz_generation_mode',
+            field=models.CharField(choices=[('eager', 'Eager (all concepts on upload)'), ('lazy', 'Lazy (on first quiz request)')], default='eager', help_text='When quiz questions are generated.', max_length=20, verbose_name='Quiz Generation Mode'),
+        ),
+        migrations.AddField(
+            model_name='projectsettings',
+            name='quiz_prefetch_units',
+            field=models.PositiveIntegerField(default=3, help_text='In lazy mode, number of upcoming study units whose quizzes are generated in the background.', verbose_name='Quiz Prefetch Units'),
+        ),
+    ]
@@ -12,6 +12,10 @@ class ProjectSettings(models.Model):
         OPENAI = 'openai', 'OpenAI'
         DEEPSEEK = 'deepseek', 'DeepSeek'
 
+    class QuizGenerationMode(models.TextChoices):
+        EAGER = 'eager', _('Eager (all concepts on upload)')
+        LAZY = 'lazy', _('Lazy (on first quiz request)')
+
     transcription_engine = models.CharField(
         max_length=20,
         choices=TranscriptionEngine.choices,
@@ -26,6 +30,20 @@ class ProjectSettings(models.Model):
         help_text=_('Select LLM provider.'),
         verbose_name=_('LLM Provider'),
     )
+    quiz_generation_mode = models.CharField(
+        max_length=20,
+        choices=QuizGenerationMode.choices,
+        default=QuizGenerationMode.EAGER,
+        help_text=_('When quiz questions are generated.'),
+        verbose_name=_('Quiz Generation Mode'),
+    )
+    quiz_prefetch_units = models.PositiveIntegerField(
+        default=3,
+        help_text=_(
+            'In lazy mode, number of upcoming study units whose quizzes are generated in the background.'
+        ),
+        verbose_name=_('Quiz Prefetch Units'),
+    )
     summarize_prompt_default = (
         'Analyze the user-provided text. Think step-by-step:\n'
         '1. IDENTIFY the main topic and the type of material (e.g., lecture, code documentation, article).\n'
@@ -104,8 +122,12 @@ class ProjectSettings(models.Model):
         pass
 
     @classmethod
-    def load(cls):
-        obj = cache.get('project_settings')
+    def load(cls, fresh=False):
+        """
+        Returns the settings, from the cache unless `fresh`: tasks that act
+        on a settings change read them from the database.
+        """
+        obj = None if fresh else cache.get('project_settings')
         if obj is None:
             obj, created = cls.objects.get_or_create(pk=1)
             cache.set('project_settings', obj)
@@ -1,8 +1,11 @@
 from django import forms
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.cache import cache
 from django.urls import reverse_lazy
 from django.views.generic import UpdateView
 
+from apps.library.tasks import sweep_stale_content
+
 from .models import ProjectSettings
 
 
@@ -11,6 +14,8 @@ class ProjectSettingsView(LoginRequiredMixin, UpdateView):
     fields = [
         'transcription_engine',
         'llm_provider',
+        'quiz_generation_mode',
+        'quiz_prefetch_units',
         'summarization_prompt',
         'concept_extraction_prompt',
         'plan_generation_prompt',
@@ -24,7 +29,13 @@ class ProjectSettingsView(LoginRequiredMixin, UpdateView):
         form = super().get_form(form_class)
         for field_name, field in form.fields.items():
             if isinstance(
-                field.widget, (forms.TextInput, forms.Textarea, forms.Select)
+                field.widget,
+                (
+                    forms.TextInput,
+                    forms.NumberInput,
+                    forms.Textarea,
+                    forms.Select,
+                ),
             ):
                 attrs = field.widget.attrs
                 attrs['class'] = attrs.get('class', '') + ' form-control'
@@ -32,3 +43,12 @@ class ProjectSettingsView(LoginRequiredMixin, UpdateView):
 
     def get_object(self):
         return ProjectSettings.load()
+
+    def form_valid(self, form):
+        response = super().form_valid(form)
+
+        if any(name.endswith('_prompt') for name in form.changed_data):
+            cache.delete('regeneration-sweep-cursor')
+            sweep_stale_content.delay()
+
+        return response
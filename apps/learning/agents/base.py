@@ -1,18 +1,29 @@
+import json
+import logging
+import re
+from typing import Optional
+
 from django.conf import settings
 from django.core.cache import cache
+from langchain_core.messages import HumanMessage
 from langchain_deepseek import ChatDeepSeek
 from langchain_openai import ChatOpenAI
+from pydantic import BaseModel, ValidationError
 
 from apps.core.models import ProjectSettings
 
+logger = logging.getLogger(__name__)
+
 
-def get_llm(temperature: float = 0.0):
+def get_llm(temperature: float = 0.0, provider: Optional[str] = None):
     """
     Returns a configured LLM instance based on ProjectSettings.
+    Pass `provider` to override the configured LLM provider.
     """
-    cache.delete('project_settings')
-    project_settings = ProjectSettings.load()
-    provider = project_settings.llm_provider
+    if provider is None:
+        cache.delete('project_settings')
+        project_settings = ProjectSettings.load()
+        provider = project_settings.llm_provider
 
     if provider == ProjectSettings.LLMProvider.DEEPSEEK:
         key = settings.DEEPSEEK_API_KEY
@@ -31,3 +42,129 @@ def get_llm(temperature: float = 0.0):
             model=settings.OPENAI_MODEL,
             temperature=temperature,
         )
+
+
+def get_secondary_provider() -> Optional[str]:
+    """
+    Returns the LLM provider that is not selected in ProjectSettings,
+    or None if it has no API key configured.
+    """
+    project_settings = ProjectSettings.load()
+
+    if project_settings.llm_provider == ProjectSettings.LLMProvider.DEEPSEEK:
+        provider = ProjectSettings.LLMProvider.OPENAI
+        key = settings.OPENAI_API_KEY
+    else:
+        provider = ProjectSettings.LLMProvider.DEEPSEEK
+        key = settings.DEEPSEEK_API_KEY
+
+    return provider if key else None
+
+
+def _repair_structured_output(raw, schema: type[BaseModel]):
+    """
+    Tries to recover a schema instance from a raw model message that the
+    structured output parser rejected (fenced JSON, text around the object).
+    Returns (parsed, error).
+    """
+    error = ValueError('Model returned no structured output.')
+    candidates = [call.get('args') for call in getattr(raw, 'tool_calls', [])]
+
+    content = raw.content if isinstance(raw.content, str) else ''
+    content = re.sub(r'^```(?:json)?|```$', '', content.strip()).strip()
+    start, end = content.find('{'), content.rfind('}')
+    if start != -1 and end > start:
+        try:
+            candidates.append(json.loads(content[start : end + 1]))
+        except json.JSONDecodeError as e:
+            error = e
+
+    for candidate in candidates:
+        try:
+            return schema.model_validate(candidate), None
+        except ValidationError as e:
+            error = e
+
+    return None, error
+
+
+def _resolve_structured_output(result: dict, schema: type[BaseModel], name):
+    raw = result['raw']
+    usage = getattr(raw, 'usage_metadata', None) or {}
+    logger.info(
+        f'{name} token usage: input={usage.get("input_tokens")}, '
+        f'output={usage.get("output_tokens")}'
+    )
+
+    if result['parsed'] is not None:
+        return result['parsed'], None
+
+    logger.warning(f'{name} structured output invalid, trying local repair')
+    return _repair_structured_output(raw, schema)
+
+
+def _retry_messages(messages: list, error: Exception) -> list:
+    return messages + [
+        HumanMessage(
+            content=(
+                'Your previous answer did not match the required schema:\n'
+                f'{error}\n\nAnswer again, fixing these errors.'
+            )
+        )
+    ]
+
+
+def _structured_attempts(messages: list, schema: type[BaseModel], name: str):
+    """
+    Shared logic of invoke_structured and ainvoke_structured: a generator
+    that yields the messages to send and receives the model result of each
+    attempt, returning the parsed schema instance.
+    """
+    parsed, error = _resolve_structured_output((yield messages), schema, name)
+    if parsed is None:
+        logger.warning(f'{name} retrying after validation error: {error}')
+        parsed, error = _resolve_structured_output(
+            (yield _retry_messages(messages, error)), schema, name
+        )
+    if parsed is None:
+        raise ValueError(f'{name} returned invalid output: {error}')
+
+    return parsed
+
+
+def invoke_structured(
+    llm, prompt, schema: type[BaseModel], inputs: dict, name: str
+):
+    """
+    Invokes `llm` with provider-native structured output for `schema`.
+    Invalid output is repaired locally when possible, otherwise the call is
+    retried once with the validation error.
+    """
+    structured_llm = llm.with_structured_output(schema, include_raw=True)
+    attempts = _structured_attempts(
+        prompt.format_messages(**inputs), schema, name
+    )
+    messages = next(attempts)
+    while True:
+        try:
+            messages = attempts.send(structured_llm.invoke(messages))
+        except StopIteration as done:
+            return done.value
+
+
+async def ainvoke_structured(
+    llm, prompt, schema: type[BaseModel], inputs: dict, name: str
+):
+    """
+    Async version of invoke_structured.
+    """
+    structured_llm = llm.with_structured_output(schema, include_raw=True)
+    attempts = _structured_attempts(
+        prompt.format_messages(**inputs), schema, name
+    )
+    messages = next(attempts)
+    while True:
+        try:
+            messages = attempts.send(await structured_llm.ainvoke(messages))
+        except StopIteration as done:
+            return done.value
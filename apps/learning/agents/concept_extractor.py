@@ -1,11 +1,11 @@
+from asgiref.sync import sync_to_async
 from django.utils import translation
-from langchain_core.output_parsers import PydanticOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 
 from apps.core.models import ProjectSettings
 from apps.learning.schemas import ConceptListSchema
 
-from .base import get_llm
+from .base import ainvoke_structured, get_llm, invoke_structured
 
 
 class ConceptExtractionAgent:
@@ -15,9 +15,8 @@ class ConceptExtractionAgent:
 
     def __init__(self):
         self.llm = get_llm(temperature=0.0)
-        self.parser = PydanticOutputParser(pydantic_object=ConceptListSchema)
 
-    def run(self, text: str, topic_context: str = '') -> ConceptListSchema:
+    def _build_prompt(self, topic_context: str = '') -> ChatPromptTemplate:
         settings = ProjectSettings.load()
         system_prompt = settings.concept_extraction_prompt
 
@@ -27,13 +26,12 @@ class ConceptExtractionAgent:
         current_language = translation.get_language()
         system_prompt += f"\n\nIMPORTANT: Provide all Output (Titles, Descriptions) in language: '{current_language}'."
 
-        prompt = ChatPromptTemplate.from_messages(
+        return ChatPromptTemplate.from_messages(
             [
                 (
                     'system',
                     system_prompt,
                 ),
-                ('system', '{format_instructions}'),
                 (
                     'user',
                     'Analyze the following text and extract the key concepts:\n\n{text}',
@@ -41,11 +39,24 @@ class ConceptExtractionAgent:
             ]
         )
 
-        chain = prompt | self.llm | self.parser
+    def run(self, text: str, topic_context: str = '') -> ConceptListSchema:
+        return invoke_structured(
+            self.llm,
+            self._build_prompt(topic_context),
+            ConceptListSchema,
+            {'text': text},
+            name=self.__class__.__name__,
+        )
 
-        return chain.invoke(
-            {
-                'text': text,
-                'format_instructions': self.parser.get_format_instructions(),
-            }
+    async def arun(
+        self, text: str, topic_context: str = ''
+    ) -> ConceptListSchema:
+        prompt = await sync_to_async(self._build_prompt)(topic_context)
+
+        return await ainvoke_structured(
+            self.llm,
+            prompt,
+            ConceptListSchema,
+            {'text': text},
+            name=self.__class__.__name__,
         )
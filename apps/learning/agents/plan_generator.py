@@ -1,11 +1,11 @@
+from asgiref.sync import sync_to_async
 from django.utils import translation
-from langchain_core.output_parsers import PydanticOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 
 from apps.core.models import ProjectSettings
 from apps.learning.schemas import ConceptSchema, StudyPlanSchema
 
-from .base import get_llm
+from .base import ainvoke_structured, get_llm, invoke_structured
 
 
 class PlanGenerationAgent:
@@ -15,14 +15,13 @@ class PlanGenerationAgent:
 
     def __init__(self):
         self.llm = get_llm(temperature=0.2)
-        self.parser = PydanticOutputParser(pydantic_object=StudyPlanSchema)
 
-    def run(
+    def _build_prompt(
         self,
         concepts: list[ConceptSchema],
         topic_name: str,
         topic_context: str = '',
-    ) -> StudyPlanSchema:
+    ) -> tuple[ChatPromptTemplate, dict]:
         concepts_text = '\n'.join(
             [
                 f'- {c.title}: {c.description} (Complexity: {c.complexity})'
@@ -42,7 +41,6 @@ class PlanGenerationAgent:
         prompt = ChatPromptTemplate.from_messages(
             [
                 ('system', '{system_prompt}'),
-                ('system', '{format_instructions}'),
                 (
                     'user',
                     "Create a study plan for the topic '{topic_name}' using these concepts:\n\n{concepts_text}",
@@ -50,13 +48,42 @@ class PlanGenerationAgent:
             ]
         )
 
-        chain = prompt | self.llm | self.parser
+        return prompt, {
+            'system_prompt': system_prompt,
+            'topic_name': topic_name,
+            'concepts_text': concepts_text,
+        }
+
+    def run(
+        self,
+        concepts: list[ConceptSchema],
+        topic_name: str,
+        topic_context: str = '',
+    ) -> StudyPlanSchema:
+        prompt, inputs = self._build_prompt(concepts, topic_name, topic_context)
+
+        return invoke_structured(
+            self.llm,
+            prompt,
+            StudyPlanSchema,
+            inputs,
+            name=self.__class__.__name__,
+        )
+
+    async def arun(
+        self,
+        concepts: list[ConceptSchema],
+        topic_name: str,
+        topic_context: str = '',
+    ) -> StudyPlanSchema:
+        prompt, inputs = await sync_to_async(self._build_prompt)(
+            concepts, topic_name, topic_context
+        )
 
-        return chain.invoke(
-            {
-                'system_prompt': system_prompt,
-                'format_instructions': self.parser.get_format_instructions(),
-                'topic_name': topic_name,
-                'concepts_text': concepts_text,
-            }
+        return await ainvoke_structured(
+            self.llm,
+            prompt,
+            StudyPlanSchema,
+            inputs,
+            name=self.__class__.__name__,
         )
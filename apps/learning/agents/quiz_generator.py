@@ -1,11 +1,39 @@
+import logging
+import re
+from difflib import SequenceMatcher
+
 from django.utils import translation
-from langchain_core.output_parsers import PydanticOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 
 from apps.core.models import ProjectSettings
-from apps.learning.schemas import QuizSchema
+from apps.learning.schemas import QuizBatchSchema, QuizSchema
+
+from .base import ainvoke_structured, get_llm, invoke_structured
+
+logger = logging.getLogger(__name__)
+
+# Similarity above which an echoed title is taken to name a concept
+TITLE_MATCH_RATIO = 0.8
+
 
-from .base import get_llm
+def _normalize_title(title: str) -> str:
+    return ' '.join(re.sub(r'[\W_]+', ' ', title.lower()).split())
+
+
+def _names_other_concept(title: str, index: int, titles: list[str]) -> bool:
+    """
+    Whether an echoed title clearly names another concept of the batch than
+    the one at its index (e.g. the model used 1-based indices). Paraphrased
+    or translated titles resemble no concept and are trusted by index.
+    """
+    scores = [
+        SequenceMatcher(
+            None, _normalize_title(title), _normalize_title(other)
+        ).ratio()
+        for other in titles
+    ]
+    best = max(range(len(titles)), key=scores.__getitem__)
+    return best != index and scores[best] >= TITLE_MATCH_RATIO
 
 
 class QuizGenerationAgent:
@@ -15,7 +43,6 @@ class QuizGenerationAgent:
 
     def __init__(self, llm=None):
         self.llm = llm or get_llm(temperature=0.2)
-        self.parser = PydanticOutputParser(pydantic_object=QuizSchema)
 
     def run(
         self,
@@ -36,7 +63,6 @@ class QuizGenerationAgent:
         prompt = ChatPromptTemplate.from_messages(
             [
                 ('system', '{system_prompt}'),
-                ('system', '{format_instructions}'),
                 (
                     'user',
                     'Concept: {concept_title}\nDefinition: {concept_description}\nContext: {context_text}\n\nGenerate 3 questions.',
@@ -44,16 +70,17 @@ class QuizGenerationAgent:
             ]
         )
 
-        chain = prompt | self.llm | self.parser
-
-        return chain.invoke(
+        return invoke_structured(
+            self.llm,
+            prompt,
+            QuizSchema,
             {
                 'system_prompt': system_prompt,
-                'format_instructions': self.parser.get_format_instructions(),
                 'concept_title': concept_title,
                 'concept_description': concept_description,
                 'context_text': context_text,
-            }
+            },
+            name=self.__class__.__name__,
         )
 
     async def arun(
@@ -73,7 +100,6 @@ class QuizGenerationAgent:
         prompt = ChatPromptTemplate.from_messages(
             [
                 ('system', '{system_prompt}'),
-                ('system', '{format_instructions}'),
                 (
                     'user',
                     'Concept: {concept_title}\nDefinition: {concept_description}\nContext: {context_text}\n\nGenerate 3 questions.',
@@ -81,14 +107,85 @@ class QuizGenerationAgent:
             ]
         )
 
-        chain = prompt | self.llm | self.parser
-
-        return await chain.ainvoke(
+        return await ainvoke_structured(
+            self.llm,
+            prompt,
+            QuizSchema,
             {
                 'system_prompt': system_prompt,
-                'format_instructions': self.parser.get_format_instructions(),
                 'concept_title': concept_title,
                 'concept_description': concept_description,
                 'context_text': context_text,
-            }
+            },
+            name=self.__class__.__name__,
+        )
+
+    async def arun_batch(
+        self,
+        concepts: list[tuple[str, str]],
+        system_prompt: str,
+        context_text: str = '',
+        topic_context: str = '',
+    ) -> dict[int, QuizSchema]:
+        """
+        Generates questions for several (title, description) concepts in one
+        call. Returns quizzes keyed by the concept's index in `concepts`.
+        The echoed title is a sanity check of the index: a quiz whose title
+        names another concept of the batch (e.g. 1-based indices) is
+        dropped, so the concept is missing from the result like one the
+        model skipped. For a repeated index the first quiz is kept.
+        """
+        if topic_context:
+            system_prompt += f'\n\nContext Topic: {topic_context}'
+
+        current_language = translation.get_language()
+        system_prompt += f"\n\nIMPORTANT: Provide all Output (Questions, Options, Explanations) in language: '{current_language}'."
+
+        concepts_text = '\n'.join(
+            [
+                f'[{index}] {title}: {description}'
+                for index, (title, description) in enumerate(concepts)
+            ]
+        )
+
+        prompt = ChatPromptTemplate.from_messages(
+            [
+                ('system', '{system_prompt}'),
+                (
+                    'user',
+                    'Context: {context_text}\n\nConcepts:\n{concepts_text}\n\nGenerate 3 questions for each concept. Set concept_index to the [number] of the concept and concept_title to its title.',
+                ),
+            ]
+        )
+
+        batch = await ainvoke_structured(
+            self.llm,
+            prompt,
+            QuizBatchSchema,
+            {
+                'system_prompt': system_prompt,
+                'concepts_text': concepts_text,
+                'context_text': context_text,
+            },
+            name=self.__class__.__name__,
         )
+
+        titles = [title for title, _ in concepts]
+        quizzes = {}
+        for quiz in batch.quizzes:
+            index = quiz.concept_index
+            if not quiz.questions:
+                continue
+            if not 0 <= index < len(concepts) or _names_other_concept(
+                quiz.concept_title, index, titles
+            ):
+                logger.warning(
+                    f'Dropping quiz for [{index}] {quiz.concept_title!r}: '
+                    'index does not match the concept it names'
+                )
+                continue
+            if index in quizzes:
+                logger.warning(f'Dropping repeated quiz for concept [{index}]')
+                continue
+            quizzes[index] = QuizSchema(questions=quiz.questions)
+        return quizzes
@@ -0,0 +1,43 @@
+from asgiref.sync import sync_to_async
+from django.utils import translation
+from langchain_core.prompts import ChatPromptTemplate
+
+from apps.core.models import ProjectSettings
+
+from .base import get_llm
+
+
+class SummarizationAgent:
+    """
+    Agent responsible for summarizing a transcription.
+    """
+
+    def __init__(self):
+        self.llm = get_llm(temperature=0.0)
+
+    def _build_prompt(self) -> ChatPromptTemplate:
+        settings = ProjectSettings.load()
+        system_prompt = settings.summarization_prompt
+
+        current_language = translation.get_language()
+        system_prompt += f"\n\nIMPORTANT: Provide all Output in language: '{current_language}'."
+
+        return ChatPromptTemplate.from_messages(
+            [
+                (
+                    'system',
+                    system_prompt,
+                ),
+                ('user', 'Summarize this text:\n\n{text}'),
+            ]
+        )
+
+    def run(self, text: str) -> str:
+        chain = self._build_prompt() | self.llm
+        return chain.invoke({'text': text}).content
+
+    async def arun(self, text: str) -> str:
+        prompt = await sync_to_async(self._build_prompt)()
+        chain = prompt | self.llm
+        response = await chain.ainvoke({'text': text})
+        return response.content
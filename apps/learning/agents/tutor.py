@@ -1,5 +1,7 @@
 import logging
 
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
 from django.utils import translation
 from langchain.agents import create_agent
 from langchain_core.messages import HumanMessage
@@ -8,9 +10,10 @@ from langchain_core.tools import tool
 from apps.core.models import ProjectSettings
 from apps.learning.history import DjangoChatMessageHistory
 from apps.learning.models import StudyPlan
+from apps.learning.services.hedging import LatencyTracker, hedged_call
 from apps.library.services.rag_service import RAGService
 
-from .base import get_llm
+from .base import get_llm, get_secondary_provider
 
 
 @tool
@@ -55,14 +58,17 @@ class TutorAgent:
     """
     Interactive Tutor Agent that can use tools to help the user.
     Uses langchain.agents.create_agent (v1.0) and DjangoChatMessageHistory.
+    With LLM_HEDGING_ENABLED, slow calls are hedged with a duplicate request.
     """
 
+    latency_tracker = LatencyTracker()
+
     def __init__(self):
         self.llm = get_llm(temperature=0.4)
         self.tools = [search_knowledge_base, get_study_plan]
 
-        settings = ProjectSettings.load()
-        self.system_prompt = settings.tutor_prompt
+        project_settings = ProjectSettings.load()
+        self.system_prompt = project_settings.tutor_prompt
 
         current_language = translation.get_language()
         self.system_prompt += f"\n\nIMPORTANT: Chat with the user in language code: '{current_language}'."
@@ -73,6 +79,40 @@ class TutorAgent:
             system_prompt=self.system_prompt,
         )
 
+        self.hedge_graph = None
+        if settings.LLM_HEDGING_ENABLED:
+            self.hedge_graph = self.graph
+            secondary_provider = (
+                get_secondary_provider()
+                if settings.LLM_HEDGE_SECONDARY_PROVIDER
+                else None
+            )
+            if secondary_provider:
+                self.hedge_graph = create_agent(
+                    model=get_llm(
+                        temperature=0.4, provider=secondary_provider
+                    ),
+                    tools=self.tools,
+                    system_prompt=self.system_prompt,
+                )
+
+    async def _ainvoke(self, messages):
+        if self.hedge_graph is None:
+            return await self.graph.ainvoke({'messages': messages})
+
+        return await hedged_call(
+            lambda: self.graph.ainvoke({'messages': messages}),
+            lambda: self.hedge_graph.ainvoke({'messages': messages}),
+            delay=self.latency_tracker.hedge_delay(),
+            tracker=self.latency_tracker,
+        )
+
+    def _invoke(self, messages):
+        if self.hedge_graph is None:
+            return self.graph.invoke({'messages': messages})
+
+        return async_to_sync(self._ainvoke)(messages)
+
     def run(self, user_input: str, session_id: str) -> str:
         history = DjangoChatMessageHistory(session_id=session_id)
 
@@ -84,7 +124,7 @@ class TutorAgent:
         logger = logging.getLogger(__name__)
         logger.info(f'TutorAgent Input Messages: {messages}')
 
-        result = self.graph.invoke({'messages': messages})
+        result = self._invoke(messages)
 
         final_messages = result.get('messages', [])
         if not final_messages:
@@ -95,3 +135,23 @@ class TutorAgent:
         history.add_message(last_message)
 
         return last_message.content
+
+    async def arun(self, user_input: str, session_id: str) -> str:
+        history = DjangoChatMessageHistory(session_id=session_id)
+
+        await sync_to_async(history.add_message)(
+            HumanMessage(content=user_input)
+        )
+        messages = await sync_to_async(lambda: history.messages)()
+
+        result = await self._ainvoke(messages)
+
+        final_messages = result.get('messages', [])
+        if not final_messages:
+            return 'Error: No response from agent.'
+
+        last_message = final_messages[-1]
+
+        await sync_to_async(history.add_message)(last_message)
+
+        return last_message.content
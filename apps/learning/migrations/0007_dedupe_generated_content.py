@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def merge_duplicates(apps, schema_editor):
+    """
+    Merges rows that would violate the unique constraints added in the next
+    migration. Dependent rows of a duplicate concept are moved to the
+    concept that is kept, so no flashcard progress, study unit or question
+    is lost through the delete cascade.
+    """
+    Concept = apps.get_model('learning', 'Concept')
+    Flashcard = apps.get_model('learning', 'Flashcard')
+    StudyUnit = apps.get_model('learning', 'StudyUnit')
+    QuizQuestion = apps.get_model('learning', 'QuizQuestion')
+
+    kept_concepts = {}
+    duplicate_concepts = {}
+    for concept in Concept.objects.order_by('id').only(
+        'id', 'media_item_id', 'title'
+    ):
+        key = (concept.media_item_id, concept.title)
+        if key in kept_concepts:
+            duplicate_concepts[concept.id] = kept_concepts[key]
+        else:
+            kept_concepts[key] = concept.id
+
+    for duplicate_id, kept_id in duplicate_concepts.items():
+        for model in (Flashcard, StudyUnit, QuizQuestion):
+            model.objects.filter(concept_id=duplicate_id).update(
+                concept_id=kept_id
+            )
+    Concept.objects.filter(id__in=duplicate_concepts).delete()
+
+    # Of several cards of one user for one concept keep the most reviewed
+    seen = set()
+    for card in Flashcard.objects.order_by('-reps', 'id').only(
+        'id', 'user_id', 'concept_id'
+    ):
+        key = (card.user_id, card.concept_id)
+        if key in seen:
+            card.delete()
+        seen.add(key)
+
+    # Of several units of one plan for one concept keep the first one,
+    # completed if any of them was
+    kept_units = {}
+    for unit in StudyUnit.objects.order_by('id').only(
+        'id', 'plan_id', 'concept_id', 'is_completed'
+    ):
+        key = (unit.plan_id, unit.concept_id)
+        kept = kept_units.get(key)
+        if kept is None:
+            kept_units[key] = unit
+            continue
+        if unit.is_completed and not kept.is_completed:
+            kept.is_completed = True
+            kept.save(update_fields=['is_completed'])
+        unit.delete()
+
+    positions = {}
+    for question in QuizQuestion.objects.order_by('id').only(
+        'id', 'concept_id'
+    ):
+        question.position = positions.get(question.concept_id, 0)
+        positions[question.concept_id] = question.position + 1
+        question.save(update_fields=['position'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0006_studyplan_title'),
+        ('library', '0004_mediaitem_processing_step'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizquestion',
+            name='position',
+            field=models.PositiveIntegerField(default=0, help_text='Order of the question within its concept', verbose_name='Position'),
+        ),
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
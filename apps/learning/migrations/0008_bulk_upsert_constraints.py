@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0007_dedupe_generated_content'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='concept',
+            constraint=models.UniqueConstraint(fields=('media_item', 'title'), name='unique_concept_title_per_media_item'),
+        ),
+        migrations.AddConstraint(
+            model_name='flashcard',
+            constraint=models.UniqueConstraint(fields=('user', 'concept'), name='unique_flashcard_per_user_concept'),
+        ),
+        migrations.AddConstraint(
+            model_name='quizquestion',
+            constraint=models.UniqueConstraint(fields=('concept', 'position'), name='unique_quiz_question_position_per_concept'),
+        ),
+        migrations.AddConstraint(
+            model_name='studyunit',
+            constraint=models.UniqueConstraint(fields=('plan', 'concept'), name='unique_study_unit_concept_per_plan'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0008_bulk_upsert_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='concept',
+            name='fingerprint',
+            field=models.CharField(blank=True, help_text='Hash of the prompt and input this was generated from.', max_length=64, verbose_name='Fingerprint'),
+        ),
+        migrations.AddField(
+            model_name='quizquestion',
+            name='fingerprint',
+            field=models.CharField(blank=True, help_text='Hash of the prompt and input this was generated from.', max_length=64, verbose_name='Fingerprint'),
+        ),
+        migrations.AddField(
+            model_name='studyplan',
+            name='fingerprint',
+            field=models.CharField(blank=True, help_text='Hash of the prompt and input this was generated from.', max_length=64, verbose_name='Fingerprint'),
+        ),
+    ]
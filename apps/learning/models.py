@@ -22,11 +22,23 @@ class Concept(models.Model):
     complexity = models.PositiveIntegerField(
         _('Complexity'), default=1, help_text=_('Complexity level (1-5)')
     )
+    fingerprint = models.CharField(
+        _('Fingerprint'),
+        max_length=64,
+        blank=True,
+        help_text=_('Hash of the prompt and input this was generated from.'),
+    )
     created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
 
     class Meta:
         verbose_name = _('Concept')
         verbose_name_plural = _('Concepts')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['media_item', 'title'],
+                name='unique_concept_title_per_media_item',
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -70,6 +82,12 @@ class Flashcard(models.Model):
     class Meta:
         verbose_name = _('Flashcard')
         verbose_name_plural = _('Flashcards')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'concept'],
+                name='unique_flashcard_per_user_concept',
+            ),
+        ]
 
     def __str__(self):
         return f'Flashcard: {self.front[:50]}...'
@@ -112,6 +130,12 @@ class StudyPlan(models.Model):
         default=Status.ACTIVE,
     )
     title = models.CharField(_('Title'), max_length=255, blank=True)
+    fingerprint = models.CharField(
+        _('Fingerprint'),
+        max_length=64,
+        blank=True,
+        help_text=_('Hash of the prompt and input this was generated from.'),
+    )
     created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
 
     class Meta:
@@ -146,6 +170,12 @@ class StudyUnit(models.Model):
         ordering = ['order']
         verbose_name = _('Study Unit')
         verbose_name_plural = _('Study Units')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['plan', 'concept'],
+                name='unique_study_unit_concept_per_plan',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.order}. {self.concept.title}'
@@ -178,11 +208,28 @@ class QuizQuestion(models.Model):
         choices=QuestionType.choices,
         default=QuestionType.MULTIPLE_CHOICE,
     )
+    position = models.PositiveIntegerField(
+        _('Position'),
+        default=0,
+        help_text=_('Order of the question within its concept'),
+    )
+    fingerprint = models.CharField(
+        _('Fingerprint'),
+        max_length=64,
+        blank=True,
+        help_text=_('Hash of the prompt and input this was generated from.'),
+    )
     created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
 
     class Meta:
         verbose_name = _('Quiz Question')
         verbose_name_plural = _('Quiz Questions')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['concept', 'position'],
+                name='unique_quiz_question_position_per_concept',
+            ),
+        ]
 
     def __str__(self):
         return f'Quiz for {self.concept.title}'
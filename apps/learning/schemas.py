@@ -71,3 +71,25 @@ class QuizSchema(BaseModel):
     questions: list[QuizQuestionSchema] = Field(
         ..., description='List of quiz questions.'
     )
+
+
+class ConceptQuizSchema(BaseModel):
+    """Schema for the quiz questions of one concept in a batch."""
+
+    concept_index: int = Field(
+        ..., description='The [number] of the concept in the provided list.'
+    )
+    concept_title: str = Field(
+        ..., description='The title of the concept, exactly as provided.'
+    )
+    questions: list[QuizQuestionSchema] = Field(
+        ..., description='List of quiz questions for this concept.'
+    )
+
+
+class QuizBatchSchema(BaseModel):
+    """Schema for quizzes generated for several concepts at once."""
+
+    quizzes: list[ConceptQuizSchema] = Field(
+        ..., description='One entry per concept in the provided list.'
+    )
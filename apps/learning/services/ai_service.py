@@ -1,12 +1,46 @@
+import asyncio
+import logging
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
 from apps.learning.agents.concept_extractor import ConceptExtractionAgent
 from apps.learning.agents.plan_generator import PlanGenerationAgent
 from apps.learning.agents.quiz_generator import QuizGenerationAgent
+from apps.learning.agents.summarizer import SummarizationAgent
 from apps.learning.schemas import (
     ConceptListSchema,
     ConceptSchema,
     QuizSchema,
     StudyPlanSchema,
 )
+from apps.learning.services.concept_merge import (
+    dedupe_by_title,
+    merge_similar_concepts,
+)
+from apps.learning.services.context_selection import PassageIndex
+from apps.learning.services.token_budget import (
+    CHARS_PER_TOKEN,
+    estimate_tokens,
+    pack_by_token_budget,
+)
+from apps.library.services.rag_service import RAGService
+
+logger = logging.getLogger(__name__)
+
+
+def get_topic_context(media_item) -> str:
+    """
+    Topic path of a MediaItem used as context in agent prompts.
+    """
+    if not media_item.topic:
+        return ''
+
+    topic_context = media_item.topic.title
+    if media_item.topic.parent:
+        topic_context = f'{media_item.topic.parent.title} -> {topic_context}'
+    return topic_context
 
 
 class AIService:
@@ -14,11 +48,90 @@ class AIService:
     Service layer to interact with AI Agents.
     """
 
+    def summarize(self, text: str) -> str:
+        agent = SummarizationAgent()
+        return agent.run(text)
+
+    async def summarize_async(self, text: str) -> str:
+        agent = await sync_to_async(SummarizationAgent)()
+        return await agent.arun(text)
+
     def extract_concepts(
         self, text: str, topic_context: str = ''
     ) -> ConceptListSchema:
         agent = ConceptExtractionAgent()
-        return agent.run(text, topic_context)
+        if estimate_tokens(text) <= settings.CONCEPT_EXTRACTION_CHUNK_TOKENS:
+            return agent.run(text, topic_context)
+
+        return async_to_sync(self.extract_concepts_chunked_async)(
+            text, topic_context, agent=agent
+        )
+
+    async def extract_concepts_async(
+        self, text: str, topic_context: str = ''
+    ) -> ConceptListSchema:
+        agent = await sync_to_async(ConceptExtractionAgent)()
+        if estimate_tokens(text) <= settings.CONCEPT_EXTRACTION_CHUNK_TOKENS:
+            return await agent.arun(text, topic_context)
+
+        return await self.extract_concepts_chunked_async(
+            text, topic_context, agent=agent
+        )
+
+    async def extract_concepts_chunked_async(
+        self,
+        text: str,
+        topic_context: str = '',
+        agent: ConceptExtractionAgent = None,
+    ) -> ConceptListSchema:
+        """
+        Extracts concepts from long text section by section, concurrently,
+        and merges near-duplicates across sections by embedding similarity.
+        """
+        agent = agent or await sync_to_async(ConceptExtractionAgent)()
+        semaphore = asyncio.Semaphore(settings.CONCEPT_EXTRACTION_CONCURRENCY)
+
+        chunk_size = settings.CONCEPT_EXTRACTION_CHUNK_TOKENS * CHARS_PER_TOKEN
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_size // 20,
+            length_function=len,
+        )
+        sections = splitter.split_text(text)
+
+        async def extract_section(section):
+            async with semaphore:
+                try:
+                    result = await agent.arun(section, topic_context)
+                    return result.concepts
+                except Exception as e:
+                    logger.error(f'Failed to extract concepts from section: {e}')
+                    return []
+
+        logger.info(f'Extracting concepts from {len(sections)} sections')
+        results = await asyncio.gather(*[extract_section(s) for s in sections])
+        if not any(results):
+            raise ValueError('Concept extraction failed for all sections.')
+
+        concepts = dedupe_by_title([c for r in results for c in r])
+
+        try:
+            # Creating the Chroma client blocks, keep it off the event loop
+            rag_service = await sync_to_async(RAGService)()
+            embeddings = await rag_service.embedding_function.aembed_documents(
+                [f'{c.title}: {c.description}' for c in concepts]
+            )
+        except Exception as e:
+            logger.warning(f'Skipping embedding-based concept merge: {e}')
+            return ConceptListSchema(concepts=concepts)
+
+        merged = merge_similar_concepts(
+            concepts, embeddings, settings.CONCEPT_MERGE_SIMILARITY
+        )
+        logger.info(
+            f'Merged {len(concepts)} section concepts into {len(merged)}'
+        )
+        return ConceptListSchema(concepts=merged)
 
     def generate_study_plan(
         self,
@@ -29,6 +142,15 @@ class AIService:
         agent = PlanGenerationAgent()
         return agent.run(concepts, topic_name, topic_context)
 
+    async def generate_study_plan_async(
+        self,
+        concepts: list[ConceptSchema],
+        topic_name: str,
+        topic_context: str = '',
+    ) -> StudyPlanSchema:
+        agent = await sync_to_async(PlanGenerationAgent)()
+        return await agent.arun(concepts, topic_name, topic_context)
+
     def generate_quiz(
         self,
         concept_title: str,
@@ -58,3 +180,102 @@ class AIService:
             context_text,
             topic_context,
         )
+
+    async def generate_quizzes_batched_async(
+        self,
+        concepts: list,
+        system_prompt: str,
+        context_text: str = '',
+        topic_context: str = '',
+        llm=None,
+        concurrency: int = 5,
+        passage_index: PassageIndex = None,
+    ) -> list[tuple]:
+        """
+        Generates quizzes for many concepts, packing several concepts into
+        one call up to QUIZ_BATCH_TOKEN_BUDGET. Concepts missing from a
+        batch response are retried individually.
+        With `passage_index`, each call gets the passages most relevant to
+        its concepts instead of `context_text`.
+        Returns (concept, QuizSchema or None) pairs in input order.
+        """
+        agent = QuizGenerationAgent(llm=llm)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        # The context passage counts against the budget too: a shared
+        # `context_text` once per call, selected passages per concept
+        budget = settings.QUIZ_BATCH_TOKEN_BUDGET
+        context_cost = 0
+        if passage_index is None:
+            budget -= estimate_tokens(context_text)
+        else:
+            context_cost = settings.QUIZ_CONTEXT_TOKENS_PER_CONCEPT
+
+        batches = pack_by_token_budget(
+            concepts,
+            cost=lambda c: (
+                estimate_tokens(f'{c.title}: {c.description}')
+                + settings.QUIZ_OUTPUT_TOKENS_PER_CONCEPT
+                + context_cost
+            ),
+            budget=budget,
+            max_items=settings.QUIZ_BATCH_MAX_CONCEPTS,
+        )
+
+        def context_for(batch) -> str:
+            if passage_index is None:
+                return context_text
+            return passage_index.select(
+                [f'{c.title} {c.description}' for c in batch],
+                token_budget=settings.QUIZ_CONTEXT_TOKENS_PER_CONCEPT
+                * len(batch),
+            )
+
+        async def generate_single(concept):
+            async with semaphore:
+                try:
+                    return await agent.arun(
+                        concept.title,
+                        concept.description,
+                        system_prompt,
+                        context_for([concept]),
+                        topic_context,
+                    )
+                except Exception as e:
+                    logger.error(
+                        f'Failed to generate quiz for concept {concept.title}: {e}'
+                    )
+                    return None
+
+        async def generate_batch(batch):
+            async with semaphore:
+                try:
+                    quizzes = await agent.arun_batch(
+                        [(c.title, c.description) for c in batch],
+                        system_prompt,
+                        context_for(batch),
+                        topic_context,
+                    )
+                except Exception as e:
+                    logger.error(
+                        f'Failed to generate quiz batch of {len(batch)} concepts: {e}'
+                    )
+                    quizzes = {}
+
+            missing = [i for i in range(len(batch)) if i not in quizzes]
+            if missing:
+                logger.warning(
+                    f'Retrying {len(missing)} concepts of a quiz batch individually'
+                )
+                retried = await asyncio.gather(
+                    *[generate_single(batch[i]) for i in missing]
+                )
+                quizzes.update(zip(missing, retried))
+
+            return [(c, quizzes[i]) for i, c in enumerate(batch)]
+
+        logger.info(
+            f'Generating quizzes for {len(concepts)} concepts in {len(batches)} batches'
+        )
+        results = await asyncio.gather(*[generate_batch(b) for b in batches])
+        return [pair for batch_results in results for pair in batch_results]
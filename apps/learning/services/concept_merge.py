@@ -0,0 +1,62 @@
+import numpy as np
+
+from apps.learning.schemas import ConceptSchema
+
+
+def _normalize_title(title: str) -> str:
+    return ' '.join(title.lower().split())
+
+
+def dedupe_by_title(concepts: list[ConceptSchema]) -> list[ConceptSchema]:
+    """
+    Drops concepts whose normalized title was already seen,
+    keeping the one with the longer description.
+    """
+    by_title = {}
+    for concept in concepts:
+        key = _normalize_title(concept.title)
+        current = by_title.get(key)
+        if current is None or len(concept.description) > len(
+            current.description
+        ):
+            by_title[key] = concept
+    return list(by_title.values())
+
+
+def merge_similar_concepts(
+    concepts: list[ConceptSchema],
+    embeddings: list[list[float]],
+    threshold: float,
+) -> list[ConceptSchema]:
+    """
+    Greedily clusters concepts whose embeddings have cosine similarity of at
+    least `threshold` and keeps one concept per cluster (the one with the
+    most detailed description, with the highest complexity of the cluster).
+    """
+    if len(concepts) < 2:
+        return list(concepts)
+
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.maximum(norms, 1e-12)
+    similarity = vectors @ vectors.T
+
+    merged = []
+    assigned = np.zeros(len(concepts), dtype=bool)
+
+    for i in range(len(concepts)):
+        if assigned[i]:
+            continue
+
+        cluster = np.flatnonzero((similarity[i] >= threshold) & ~assigned)
+        assigned[cluster] = True
+
+        members = [concepts[j] for j in cluster]
+        best = max(members, key=lambda c: len(c.description))
+        merged.append(
+            best.model_copy(
+                update={'complexity': max(c.complexity for c in members)}
+            )
+        )
+
+    return merged
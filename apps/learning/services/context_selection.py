@@ -0,0 +1,105 @@
+import math
+import re
+from collections import Counter
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from apps.learning.services.token_budget import estimate_tokens
+
+TOKEN_RE = re.compile(r'\w{3,}')
+
+
+def _tokenize(text: str) -> list[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+class PassageIndex:
+    """
+    Local BM25 index over the chunks of one MediaItem's text.
+    Used to give each quiz prompt the passages relevant to its concepts
+    instead of the same leading slice of the material.
+    """
+
+    k1 = 1.5
+    b = 0.75
+
+    def __init__(self, text: str, chunk_size: int = 1000, chunk_overlap=200):
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=len,
+        )
+        self.passages = splitter.split_text(text)
+        self.term_counts = [Counter(_tokenize(p)) for p in self.passages]
+        self.lengths = [sum(c.values()) for c in self.term_counts]
+        self.avg_length = (
+            sum(self.lengths) / len(self.lengths) if self.lengths else 0
+        )
+
+        doc_freq = Counter()
+        for counts in self.term_counts:
+            doc_freq.update(counts.keys())
+
+        total = len(self.passages)
+        self.idf = {
+            term: math.log(1 + (total - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+
+    def rank(self, query: str) -> list[int]:
+        """
+        Returns indices of passages matching the query, best first.
+        """
+        if not self.avg_length:
+            # No passage has a single indexable token
+            return []
+
+        terms = set(_tokenize(query))
+        scores = []
+
+        for index, counts in enumerate(self.term_counts):
+            length_norm = 1 - self.b + self.b * (
+                self.lengths[index] / self.avg_length
+            )
+            score = 0.0
+            for term in terms:
+                tf = counts.get(term)
+                if tf:
+                    score += (
+                        self.idf[term]
+                        * tf
+                        * (self.k1 + 1)
+                        / (tf + self.k1 * length_norm)
+                    )
+            if score > 0:
+                scores.append((score, index))
+
+        return [index for _, index in sorted(scores, reverse=True)]
+
+    def select(self, queries: list[str], token_budget: int) -> str:
+        """
+        Packs the best passages for all queries (taken in turns) into
+        `token_budget` and returns them in document order. Falls back to
+        the leading passages when nothing matches.
+        """
+        rankings = [self.rank(q) for q in queries]
+        if not any(rankings):
+            rankings = [list(range(len(self.passages)))]
+
+        selected = set()
+        used_tokens = 0
+        position = 0
+
+        while any(position < len(r) for r in rankings):
+            for ranking in rankings:
+                if position >= len(ranking) or ranking[position] in selected:
+                    continue
+
+                index = ranking[position]
+                tokens = estimate_tokens(self.passages[index])
+                if used_tokens + tokens <= token_budget:
+                    selected.add(index)
+                    used_tokens += tokens
+            position += 1
+
+        return '\n...\n'.join(self.passages[i] for i in sorted(selected))
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyTracker:
+    """
+    Rolling window of observed LLM call latencies.
+    The hedge delay is taken from a percentile of this window.
+    """
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+
+        if not samples:
+            return None
+
+        rank = max(0, math.ceil(pct / 100 * len(samples)) - 1)
+        return samples[rank]
+
+    def hedge_delay(self) -> float:
+        """
+        Seconds to wait for the primary call before sending a duplicate.
+        Falls back to LLM_HEDGE_DEFAULT_DELAY until enough samples are collected.
+        """
+        with self._lock:
+            sample_count = len(self._samples)
+
+        if sample_count < settings.LLM_HEDGE_MIN_SAMPLES:
+            return settings.LLM_HEDGE_DEFAULT_DELAY
+
+        return max(
+            settings.LLM_HEDGE_MIN_DELAY,
+            self.percentile(settings.LLM_HEDGE_PERCENTILE),
+        )
+
+
+async def hedged_call(
+    primary: Callable[[], Awaitable],
+    hedge: Callable[[], Awaitable],
+    delay: float,
+    tracker: Optional[LatencyTracker] = None,
+):
+    """
+    Awaits primary(). If it has not finished after `delay` seconds, or has
+    failed before that, hedge() is started as well; the first successful
+    result wins and the other call is cancelled. An error is raised only if
+    both calls fail.
+
+    Only the primary call's latency, measured from its start, is recorded:
+    a primary cancelled because the hedge won is recorded with the time it
+    had run so far, so that slow calls still pull the percentile up.
+    """
+    started_at = time.monotonic()
+    primary_task = asyncio.ensure_future(primary())
+
+    done, _ = await asyncio.wait({primary_task}, timeout=delay)
+    if done and primary_task.exception() is None:
+        if tracker:
+            tracker.record(time.monotonic() - started_at)
+        return primary_task.result()
+
+    errors = []
+    if done:
+        errors.append(primary_task.exception())
+        logger.info(f'LLM request failed ({errors[0]}), sending hedged request')
+        pending = set()
+    else:
+        logger.info(f'No LLM response after {delay:.2f}s, sending hedged request')
+        pending = {primary_task}
+
+    hedge_task = asyncio.ensure_future(hedge())
+    pending.add(hedge_task)
+
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is not None:
+                    errors.append(task.exception())
+                    continue
+
+                if tracker and task is primary_task:
+                    tracker.record(time.monotonic() - started_at)
+
+                logger.info(
+                    'Hedged LLM call won by '
+                    f'{"primary" if task is primary_task else "hedge"} request'
+                )
+                return task.result()
+    finally:
+        if tracker and primary_task in pending:
+            tracker.record(time.monotonic() - started_at)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    raise errors[0]
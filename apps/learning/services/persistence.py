@@ -0,0 +1,164 @@
+from typing import Dict, Optional
+
+from django.db import transaction
+from django.db.models import Q
+
+from apps.learning.models import (
+    Concept,
+    Flashcard,
+    QuizQuestion,
+    StudyPlan,
+    StudyUnit,
+)
+from apps.learning.schemas import ConceptSchema, StudyPlanSchema
+
+
+def save_concepts(
+    media_item, concept_schemas: list[ConceptSchema], fingerprint: str = ''
+) -> list[Concept]:
+    """
+    Replaces the concepts of a MediaItem, upserting them on
+    (media_item, title) together with the owner's flashcards. Existing
+    flashcards keep their SRS state; concepts no longer extracted are
+    deleted. Like the other functions here, it issues a constant number of
+    queries regardless of the number of rows.
+    """
+    by_title = {}
+    for schema in concept_schemas:
+        title = schema.title[:255]
+        by_title.setdefault(
+            title,
+            Concept(
+                media_item=media_item,
+                title=title,
+                description=schema.description,
+                complexity=schema.complexity,
+                fingerprint=fingerprint,
+            ),
+        )
+    concepts = list(by_title.values())
+
+    with transaction.atomic():
+        Concept.objects.bulk_create(
+            concepts,
+            update_conflicts=True,
+            unique_fields=['media_item', 'title'],
+            update_fields=['description', 'complexity', 'fingerprint'],
+        )
+        media_item.concepts.exclude(title__in=by_title).delete()
+        Flashcard.objects.bulk_create(
+            [
+                Flashcard(
+                    user_id=media_item.user_id,
+                    concept=concept,
+                    front=concept.title,
+                    back=concept.description,
+                )
+                for concept in concepts
+            ],
+            update_conflicts=True,
+            unique_fields=['user', 'concept'],
+            update_fields=['front', 'back'],
+        )
+
+    return concepts
+
+
+def save_study_plan(
+    media_item,
+    plan_schema: StudyPlanSchema,
+    concepts: list[Concept],
+    fingerprint: str = '',
+) -> StudyPlan:
+    """
+    Creates a StudyPlan and upserts its units on (plan, concept), replacing
+    the active plan of the MediaItem. Units referring to unknown concept
+    titles are skipped; completed units of the old plan stay completed.
+    The old plan is archived, not deleted, to keep the plan history.
+    """
+    concepts_by_title = {c.title: c for c in concepts}
+
+    units = {}
+    for unit_schema in plan_schema.units:
+        concept = concepts_by_title.get(unit_schema.concept_title)
+        if concept and concept.id not in units:
+            units[concept.id] = StudyUnit(
+                concept=concept,
+                order=unit_schema.order,
+                is_completed=False,
+            )
+
+    with transaction.atomic():
+        old_plans = StudyPlan.objects.filter(
+            media_item=media_item, status=StudyPlan.Status.ACTIVE
+        )
+        completed_concept_ids = set(
+            StudyUnit.objects.filter(
+                plan__in=old_plans, is_completed=True
+            ).values_list('concept_id', flat=True)
+        )
+        old_plans.update(status=StudyPlan.Status.ARCHIVED)
+
+        study_plan = StudyPlan.objects.create(
+            user_id=media_item.user_id,
+            topic_id=media_item.topic_id,
+            media_item=media_item,
+            status=StudyPlan.Status.ACTIVE,
+            title=plan_schema.title,
+            fingerprint=fingerprint,
+        )
+        for unit in units.values():
+            unit.plan = study_plan
+            unit.is_completed = unit.concept_id in completed_concept_ids
+
+        StudyUnit.objects.bulk_create(
+            list(units.values()),
+            update_conflicts=True,
+            unique_fields=['plan', 'concept'],
+            update_fields=['order'],
+        )
+
+    return study_plan
+
+
+def save_quiz_questions(
+    results: list[tuple], fingerprints: Optional[Dict[int, str]] = None
+) -> list[QuizQuestion]:
+    """
+    Upserts generated questions from (concept, QuizSchema or None) pairs
+    on (concept, position), dropping questions of a previous generation
+    beyond the new count. `fingerprints` maps concept ids to the
+    fingerprint of the prompt the questions were generated from.
+    """
+    fingerprints = fingerprints or {}
+    questions = [
+        QuizQuestion(
+            concept=concept,
+            position=position,
+            fingerprint=fingerprints.get(concept.id, ''),
+            question_data=question_schema.model_dump(),
+            question_type=QuizQuestion.QuestionType.MULTIPLE_CHOICE,
+        )
+        for concept, quiz_schema in results
+        if quiz_schema
+        for position, question_schema in enumerate(quiz_schema.questions)
+    ]
+
+    with transaction.atomic():
+        QuizQuestion.objects.bulk_create(
+            questions,
+            update_conflicts=True,
+            unique_fields=['concept', 'position'],
+            update_fields=['question_data', 'question_type', 'fingerprint'],
+        )
+        leftovers = Q()
+        for concept, quiz_schema in results:
+            if quiz_schema:
+                leftovers |= Q(
+                    concept=concept,
+                    position__gte=len(quiz_schema.questions),
+                )
+        if leftovers:
+            QuizQuestion.objects.filter(leftovers).delete()
+
+    return questions
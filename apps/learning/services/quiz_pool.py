@@ -0,0 +1,142 @@
+import logging
+from itertools import groupby
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+
+from apps.core.models import ProjectSettings
+from apps.learning.agents.base import get_llm
+from apps.learning.models import Concept, StudyUnit
+from apps.learning.services.ai_service import AIService, get_topic_context
+from apps.learning.services.context_selection import PassageIndex
+from apps.learning.services.persistence import save_quiz_questions
+from apps.learning.services.regeneration import quiz_fingerprint
+
+logger = logging.getLogger(__name__)
+
+QUIZ_LOCK_TIMEOUT = 600
+
+
+def upcoming_concept_ids(plan_id: int, after_order: int, count: int) -> list:
+    """
+    Concepts of the next `count` units of a plan (in plan order)
+    that have no quiz questions yet.
+    """
+    return list(
+        StudyUnit.objects.filter(
+            plan_id=plan_id,
+            order__gt=after_order,
+            concept__quiz_questions__isnull=True,
+        )
+        .order_by('order')
+        .values_list('concept_id', flat=True)[:count]
+    )
+
+
+def request_quiz_generation(concept_id: int) -> bool:
+    """
+    Marks the quiz of a concept as requested by a user, clearing an earlier
+    failure. Returns False if it is already requested, so that repeated
+    page loads enqueue a single generation task.
+    """
+    cache.delete(f'quiz-generation-failed:{concept_id}')
+    return cache.add(f'quiz-requested:{concept_id}', True, QUIZ_LOCK_TIMEOUT)
+
+
+def finish_quiz_request(concept_id: int, failed: bool):
+    """
+    Clears the request mark of a concept, remembering a failure so that
+    the quiz page offers a retry instead of requesting it again.
+    """
+    if failed:
+        cache.set(f'quiz-generation-failed:{concept_id}', True, QUIZ_LOCK_TIMEOUT)
+    cache.delete(f'quiz-requested:{concept_id}')
+
+
+def quiz_generation_failed(concept_id: int) -> bool:
+    return cache.get(f'quiz-generation-failed:{concept_id}') is not None
+
+
+def quiz_generation_in_progress(concept_id: int) -> bool:
+    """
+    Whether the quiz of a concept is requested or a worker currently holds
+    its generation lock.
+    """
+    return bool(
+        cache.get_many(
+            [f'quiz-requested:{concept_id}', f'quiz-generation:{concept_id}']
+        )
+    )
+
+
+def claim_prefetch(plan_id: int, after_order: int) -> bool:
+    """
+    Whether the quizzes following a unit of a plan still have to be
+    prefetched; each plan position is prefetched once per lock period.
+    """
+    return cache.add(
+        f'quiz-prefetch:{plan_id}:{after_order}', True, QUIZ_LOCK_TIMEOUT
+    )
+
+
+def generate_missing_quizzes(
+    concept_ids: list[int], regenerate: bool = False
+) -> int:
+    """
+    Generates and saves quiz questions for the given concepts that have
+    none yet, or for all of them if `regenerate`: existing questions are
+    then replaced only once new ones were generated. Concepts already
+    being generated by another worker (cache lock) are skipped. Returns
+    the number of concepts processed.
+    """
+    concepts = Concept.objects.filter(id__in=concept_ids)
+    if not regenerate:
+        concepts = concepts.filter(quiz_questions__isnull=True)
+    concepts = list(
+        concepts.select_related('media_item__topic__parent').order_by(
+            'media_item_id'
+        )
+    )
+    locked = [
+        c
+        for c in concepts
+        if cache.add(f'quiz-generation:{c.id}', True, QUIZ_LOCK_TIMEOUT)
+    ]
+    if not locked:
+        return 0
+
+    try:
+        project_settings = ProjectSettings.load()
+        llm = get_llm(temperature=0.0)
+        ai_service = AIService()
+
+        for _, item_concepts in groupby(locked, key=lambda c: c.media_item_id):
+            item_concepts = list(item_concepts)
+            media_item = item_concepts[0].media_item
+            passage_index = PassageIndex(
+                '\n\n'.join(
+                    part
+                    for part in (media_item.summary, media_item.transcription)
+                    if part
+                )
+            )
+
+            results = async_to_sync(ai_service.generate_quizzes_batched_async)(
+                item_concepts,
+                system_prompt=project_settings.quiz_generation_prompt,
+                topic_context=get_topic_context(media_item),
+                llm=llm,
+                passage_index=passage_index,
+            )
+            save_quiz_questions(
+                results,
+                {
+                    c.id: quiz_fingerprint(project_settings, c)
+                    for c in item_concepts
+                },
+            )
+
+        logger.info(f'Generated quizzes for {len(locked)} concepts on demand')
+        return len(locked)
+    finally:
+        cache.delete_many([f'quiz-generation:{c.id}' for c in locked])
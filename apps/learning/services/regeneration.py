@@ -0,0 +1,152 @@
+import hashlib
+
+from django.db.models import Count
+
+from apps.core.models import ProjectSettings
+from apps.learning.models import StudyPlan
+
+SUMMARY = 'summary'
+CONCEPTS = 'concepts'
+PLAN = 'plan'
+QUIZZES = 'quizzes'
+
+STAGES = [SUMMARY, CONCEPTS, PLAN, QUIZZES]
+
+
+def fingerprint(*parts) -> str:
+    """
+    Stable hash of the prompt and inputs an artifact is generated from.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\x1f')
+    return digest.hexdigest()
+
+
+def summary_fingerprint(project_settings: ProjectSettings, transcription):
+    return fingerprint(
+        SUMMARY, project_settings.summarization_prompt, transcription
+    )
+
+
+def concepts_fingerprint(project_settings: ProjectSettings, text_content):
+    return fingerprint(
+        CONCEPTS, project_settings.concept_extraction_prompt, text_content
+    )
+
+
+def plan_fingerprint(project_settings: ProjectSettings, concepts_fp: str):
+    return fingerprint(
+        PLAN, project_settings.plan_generation_prompt, concepts_fp
+    )
+
+
+def quiz_fingerprint(project_settings: ProjectSettings, concept) -> str:
+    return fingerprint(
+        QUIZZES,
+        project_settings.quiz_generation_prompt,
+        concept.title,
+        concept.description,
+    )
+
+
+def is_stale(stored: str, expected: str) -> bool:
+    """
+    Whether an artifact was generated from other inputs. A blank stored
+    fingerprint means the artifact predates fingerprints: its inputs are
+    unknown, so it is not treated as stale.
+    """
+    return bool(stored) and stored != expected
+
+
+def stale_quiz_concept_ids(media_item, project_settings) -> list[int]:
+    """
+    Concepts of a MediaItem whose existing questions were generated from
+    another quiz prompt or concept definition.
+    """
+    stale_ids = set()
+    for concept in media_item.concepts.prefetch_related('quiz_questions'):
+        expected = quiz_fingerprint(project_settings, concept)
+        questions = concept.quiz_questions.all()
+        if any(is_stale(q.fingerprint, expected) for q in questions):
+            stale_ids.add(concept.id)
+    return sorted(stale_ids)
+
+
+def stale_stages(media_item, project_settings=None) -> list[str]:
+    """
+    Computes the minimal list of generation stages to re-run for a
+    MediaItem. A stale stage implies all stages that consume its output.
+    Artifacts without a fingerprint are left alone until the item is
+    reanalyzed, so existing content is not regenerated wholesale.
+    """
+    project_settings = project_settings or ProjectSettings.load()
+
+    if not media_item.transcription:
+        return []
+
+    if is_stale(
+        media_item.summary_fingerprint,
+        summary_fingerprint(project_settings, media_item.transcription),
+    ):
+        return STAGES
+
+    concepts = list(media_item.concepts.only('fingerprint'))
+    if not concepts:
+        return []
+
+    concepts_fp = concepts_fingerprint(
+        project_settings, media_item.summary or media_item.transcription
+    )
+    if any(is_stale(c.fingerprint, concepts_fp) for c in concepts):
+        return [CONCEPTS, PLAN, QUIZZES]
+
+    stages = []
+
+    plan = media_item.study_plans.filter(status=StudyPlan.Status.ACTIVE).last()
+    if plan and is_stale(
+        plan.fingerprint, plan_fingerprint(project_settings, concepts_fp)
+    ):
+        stages.append(PLAN)
+
+    if stale_quiz_concept_ids(media_item, project_settings):
+        stages.append(QUIZZES)
+
+    return stages
+
+
+def content_is_current(media_item, project_settings) -> bool:
+    """
+    Whether concepts, an active study plan and (in eager quiz mode) quiz
+    questions of every concept exist and were all generated from the
+    current prompts and text of the MediaItem.
+    """
+    concepts = list(
+        media_item.concepts.annotate(question_count=Count('quiz_questions'))
+    )
+    if not concepts:
+        return False
+
+    concepts_fp = concepts_fingerprint(
+        project_settings, media_item.summary or media_item.transcription
+    )
+    if any(c.fingerprint != concepts_fp for c in concepts):
+        return False
+
+    plan = media_item.study_plans.filter(
+        status=StudyPlan.Status.ACTIVE
+    ).last()
+    if not plan or plan.fingerprint != plan_fingerprint(
+        project_settings, concepts_fp
+    ):
+        return False
+
+    if (
+        project_settings.quiz_generation_mode
+        == ProjectSettings.QuizGenerationMode.EAGER
+        and any(c.question_count == 0 for c in concepts)
+    ):
+        return False
+
+    return not stale_quiz_concept_ids(media_item, project_settings)
@@ -0,0 +1,46 @@
+from typing import Callable, Iterable, TypeVar
+
+T = TypeVar('T')
+
+# Rough average for OpenAI/DeepSeek tokenizers on mixed ru/en text.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap, provider-agnostic token estimate for budgeting prompts.
+    """
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def pack_by_token_budget(
+    items: Iterable[T],
+    cost: Callable[[T], int],
+    budget: int,
+    max_items: int = 0,
+) -> list[list[T]]:
+    """
+    Splits items into consecutive batches whose total cost fits the budget.
+    An item that exceeds the budget on its own gets a batch of its own.
+    """
+    batches = []
+    batch = []
+    batch_cost = 0
+
+    for item in items:
+        item_cost = cost(item)
+        if batch and (
+            batch_cost + item_cost > budget
+            or (max_items and len(batch) >= max_items)
+        ):
+            batches.append(batch)
+            batch = []
+            batch_cost = 0
+
+        batch.append(item)
+        batch_cost += item_cost
+
+    if batch:
+        batches.append(batch)
+
+    return batches
@@ -1,173 +1,311 @@
 import asyncio
 import logging
+import time
 import traceback
 
-from asgiref.sync import async_to_sync
+from asgiref.sync import async_to_sync, sync_to_async
 from celery import shared_task
 from django.conf import settings
-from django.db import transaction
+from django.core.cache import cache
 from django.utils import translation
 
 from apps.core.models import ProjectSettings
 from apps.learning.agents.base import get_llm
-from apps.learning.models import (
-    Concept,
-    Flashcard,
-    QuizQuestion,
-    StudyPlan,
-    StudyUnit,
+from apps.learning.models import QuizQuestion, StudyPlan
+from apps.learning.services.ai_service import AIService, get_topic_context
+from apps.learning.services.context_selection import PassageIndex
+from apps.learning.services.persistence import (
+    save_concepts,
+    save_quiz_questions,
+    save_study_plan,
+)
+from apps.learning.services.quiz_pool import (
+    finish_quiz_request,
+    generate_missing_quizzes,
+    upcoming_concept_ids,
+)
+from apps.learning.services.regeneration import (
+    concepts_fingerprint,
+    content_is_current,
+    plan_fingerprint,
+    quiz_fingerprint,
+    stale_quiz_concept_ids,
+)
+from apps.library.models import MediaItem, StageRun
+from apps.library.services.pipeline import (
+    aset_progress,
+    aset_status,
+    track_stage,
 )
-from apps.learning.services.ai_service import AIService
-from apps.library.models import MediaItem
 
 logger = logging.getLogger(__name__)
 
+PLAN_LOCK_TIMEOUT = 600
 
-@shared_task
-def generate_content_from_media(media_item_id):
+
+async def agenerate_content_from_media(media_item_id) -> bool:
     """
     Orchestrates the generation of learning content from a processed MediaItem.
     1. Extract Concepts
-    2. Generate Study Plan
-    3. Generate Quizzes
-    4. Generate Flashcards
+    2. Generate Flashcards
+    3. Generate Study Plan and Quizzes (concurrently)
+    In lazy quiz mode only the quizzes of the first plan units are
+    pre-generated, in the background, once the plan is saved.
+    Returns False if the content is up to date and nothing was done.
+    """
+    media_item = await MediaItem.objects.select_related(
+        'topic', 'topic__parent'
+    ).aget(id=media_item_id)
+    await sync_to_async(media_item.load_texts)()
+    logger.info(f'Starting content generation for {media_item.title}')
+
+    translation.activate(settings.LANGUAGE_CODE)
+
+    await aset_status(media_item.id, MediaItem.Status.PROCESSING)
+    await aset_progress(media_item.id, 'Extracting Concepts...')
+
+    ai_service = AIService()
+
+    text_content = media_item.summary or media_item.transcription
+    if not text_content:
+        logger.warning(f'No text content found for {media_item.title}')
+        return False
+
+    topic_context = get_topic_context(media_item)
+
+    project_settings = await sync_to_async(ProjectSettings.load)()
+    concepts_fp = concepts_fingerprint(project_settings, text_content)
+
+    if await sync_to_async(content_is_current)(media_item, project_settings):
+        logger.info(
+            f'Text and prompts of {media_item.title} unchanged, '
+            'skipping content generation'
+        )
+        return False
+
+    timings = {}
+    started_at = time.perf_counter()
+
+    logger.info('Extracting concepts...')
+    concept_list = await ai_service.extract_concepts_async(
+        text_content, topic_context
+    )
+    saved_concepts = await sync_to_async(save_concepts)(
+        media_item, concept_list.concepts, concepts_fp
+    )
+
+    timings['concepts'] = time.perf_counter() - started_at
+
+    logger.info('Generating study plan and quizzes...')
+    await aset_progress(
+        media_item.id, 'Generating Study Plan and Quizzes...'
+    )
+
+    quiz_system_prompt = project_settings.quiz_generation_prompt
+    lazy_quizzes = (
+        project_settings.quiz_generation_mode
+        == ProjectSettings.QuizGenerationMode.LAZY
+    )
+
+    llm = await sync_to_async(get_llm)(temperature=0.0)
+    passage_index = PassageIndex(
+        '\n\n'.join(
+            part
+            for part in (media_item.summary, media_item.transcription)
+            if part
+        )
+    )
+
+    async def _generate_plan():
+        stage_started_at = time.perf_counter()
+        plan_schema = await ai_service.generate_study_plan_async(
+            saved_concepts, media_item.title, topic_context
+        )
+        study_plan = await sync_to_async(save_study_plan)(
+            media_item,
+            plan_schema,
+            saved_concepts,
+            plan_fingerprint(project_settings, concepts_fp),
+        )
+        timings['plan'] = time.perf_counter() - stage_started_at
+
+        if lazy_quizzes:
+            prefetch_plan_quizzes.delay(study_plan.id)
+
+    async def _generate_quizzes():
+        stage_started_at = time.perf_counter()
+        results = await ai_service.generate_quizzes_batched_async(
+            saved_concepts,
+            system_prompt=quiz_system_prompt,
+            topic_context=topic_context,
+            llm=llm,
+            passage_index=passage_index,
+        )
+        await sync_to_async(save_quiz_questions)(
+            results,
+            {
+                c.id: quiz_fingerprint(project_settings, c)
+                for c in saved_concepts
+            },
+        )
+        timings['quizzes'] = time.perf_counter() - stage_started_at
+
+    stages = [_generate_plan()]
+    if not lazy_quizzes:
+        stages.append(_generate_quizzes())
+
+    errors = [
+        e
+        for e in await asyncio.gather(*stages, return_exceptions=True)
+        if isinstance(e, Exception)
+    ]
+
+    timings['total'] = time.perf_counter() - started_at
+    logger.info(
+        f'Content generation timings for {media_item.title}: '
+        + ', '.join(f'{k}={v:.1f}s' for k, v in timings.items())
+    )
+
+    if errors:
+        raise errors[0]
+
+    logger.info(f'Content generation completed for {media_item.title}')
+    return True
+
+
+@shared_task(bind=True)
+def generate_content_from_media(self, media_item_id, run_id=None):
+    with track_stage(run_id, StageRun.Stage.CONTENT, self.request.id) as stage:
+        try:
+            if not async_to_sync(agenerate_content_from_media)(media_item_id):
+                stage.status = StageRun.Status.SKIPPED
+        except MediaItem.DoesNotExist:
+            logger.error(f'MediaItem {media_item_id} not found')
+            stage.status = StageRun.Status.SKIPPED
+        except Exception as e:
+            logger.error(f'Error generating content for {media_item_id}: {e}')
+            traceback.print_exc()
+            raise e
+
+
+@shared_task
+def prefetch_plan_quizzes(plan_id, after_order=-1):
+    """
+    Pre-generates quizzes for the units following `after_order` in a plan,
+    so that in lazy quiz mode the user rarely waits for a quiz.
     """
     try:
-        media_item = MediaItem.objects.get(id=media_item_id)
-        logger.info(f'Starting content generation for {media_item.title}')
+        translation.activate(settings.LANGUAGE_CODE)
 
+        project_settings = ProjectSettings.load()
+        concept_ids = upcoming_concept_ids(
+            plan_id, after_order, project_settings.quiz_prefetch_units
+        )
+        if concept_ids:
+            generate_missing_quizzes(concept_ids)
+    except Exception as e:
+        logger.error(f'Error prefetching quizzes for plan {plan_id}: {e}')
+        traceback.print_exc()
+
+
+@shared_task
+def generate_concept_quiz(concept_id):
+    """
+    Generates the quiz of a concept a user opened before it had questions.
+    """
+    failed = False
+    try:
         translation.activate(settings.LANGUAGE_CODE)
 
-        media_item.processing_step = 'Extracting Concepts...'
-        media_item.status = MediaItem.Status.PROCESSING
-        media_item.save(update_fields=['processing_step', 'status'])
+        # Nothing is processed if a prefetch holds the lock; the page then
+        # waits for that prefetch instead
+        if generate_missing_quizzes([concept_id]):
+            failed = not QuizQuestion.objects.filter(
+                concept_id=concept_id
+            ).exists()
+    except Exception as e:
+        logger.error(f'Error generating quiz for concept {concept_id}: {e}')
+        traceback.print_exc()
+        failed = True
+    finally:
+        finish_quiz_request(concept_id, failed)
+
+
+@shared_task
+def regenerate_study_plan(media_item_id):
+    """
+    Replaces the active study plan of a MediaItem with one generated from
+    the current plan prompt. Runs for an item are serialized by a cache
+    lock; a run that finds the plan already current does nothing.
+    """
+    lock = f'plan-generation:{media_item_id}'
+    if not cache.add(lock, True, PLAN_LOCK_TIMEOUT):
+        logger.info(f'Study plan of {media_item_id} is already regenerating')
+        return
 
-        ai_service = AIService()
+    try:
+        translation.activate(settings.LANGUAGE_CODE)
 
-        text_content = media_item.summary or media_item.transcription
-        if not text_content:
-            logger.warning(f'No text content found for {media_item.title}')
+        media_item = MediaItem.objects.select_related(
+            'topic', 'topic__parent'
+        ).get(id=media_item_id)
+        concepts = list(media_item.concepts.all())
+        if not concepts:
             return
 
-        topic_context = ''
-        if media_item.topic:
-            topic_context = media_item.topic.title
-            if media_item.topic.parent:
-                topic_context = (
-                    f'{media_item.topic.parent.title} -> {topic_context}'
-                )
-
-        logger.info('Extracting concepts...')
-        concept_list = ai_service.extract_concepts(text_content, topic_context)
-
-        saved_concepts = []
-        with transaction.atomic():
-            for schema in concept_list.concepts:
-                concept, created = Concept.objects.get_or_create(
-                    title=schema.title,
-                    media_item=media_item,
-                    defaults={
-                        'description': schema.description,
-                        'complexity': schema.complexity,
-                    },
-                )
-                saved_concepts.append(concept)
-
-                Flashcard.objects.get_or_create(
-                    user=media_item.user,
-                    concept=concept,
-                    defaults={
-                        'front': concept.title,
-                        'back': concept.description,
-                    },
-                )
-
-        logger.info('Generating study plan...')
-        media_item.processing_step = 'Generating Study Plan...'
-        media_item.save(update_fields=['processing_step'])
-
-        plan_schema = ai_service.generate_study_plan(
-            saved_concepts, media_item.title, topic_context
+        project_settings = ProjectSettings.load(fresh=True)
+        concepts_fp = concepts_fingerprint(
+            project_settings, media_item.summary or media_item.transcription
         )
+        fingerprint = plan_fingerprint(project_settings, concepts_fp)
+        if media_item.study_plans.filter(
+            status=StudyPlan.Status.ACTIVE, fingerprint=fingerprint
+        ).exists():
+            return
 
-        with transaction.atomic():
-            study_plan = StudyPlan.objects.create(
-                user=media_item.user,
-                topic=media_item.topic,
-                media_item=media_item,
-                status=StudyPlan.Status.ACTIVE,
-                title=plan_schema.title,
-            )
-
-            for unit_schema in plan_schema.units:
-                concept = next(
-                    (
-                        c
-                        for c in saved_concepts
-                        if c.title == unit_schema.concept_title
-                    ),
-                    None,
-                )
-                if concept:
-                    StudyUnit.objects.create(
-                        plan=study_plan,
-                        concept=concept,
-                        order=unit_schema.order,
-                        is_completed=False,
-                    )
-
-        logger.info('Generating quizzes...')
-        media_item.processing_step = 'Generating Quizzes...'
-        media_item.save(update_fields=['processing_step'])
+        plan_schema = AIService().generate_study_plan(
+            concepts, media_item.title, get_topic_context(media_item)
+        )
 
-        project_settings = ProjectSettings.load()
-        quiz_system_prompt = project_settings.quiz_generation_prompt
-
-        llm = get_llm(temperature=0.0)
-
-        async def _generate_quizzes_concurrently():
-            semaphore = asyncio.Semaphore(5)
-
-            async def generate_with_limit(concept):
-                async with semaphore:
-                    try:
-                        quiz_schema = await ai_service.generate_quiz_async(
-                            concept_title=concept.title,
-                            concept_description=concept.description,
-                            system_prompt=quiz_system_prompt,
-                            context_text=text_content[:2000],
-                            topic_context=topic_context,
-                            llm=llm,
-                        )
-                        return concept, quiz_schema
-                    except Exception as e:
-                        logger.error(
-                            f'Failed to generate quiz for concept {concept.title}: {e}'
-                        )
-                        return concept, None
-
-            tasks = [generate_with_limit(c) for c in saved_concepts]
-            results = await asyncio.gather(*tasks)
-            return results
-
-        results = async_to_sync(_generate_quizzes_concurrently)()
-
-        with transaction.atomic():
-            for concept, quiz_schema in results:
-                if quiz_schema:
-                    for question_schema in quiz_schema.questions:
-                        QuizQuestion.objects.create(
-                            concept=concept,
-                            question_data=question_schema.model_dump(),
-                            question_type=QuizQuestion.QuestionType.MULTIPLE_CHOICE,
-                        )
-
-        media_item.processing_step = None
-        media_item.status = MediaItem.Status.COMPLETED
-        media_item.save(update_fields=['processing_step', 'status'])
-
-        logger.info(f'Content generation completed for {media_item.title}')
+        save_study_plan(
+            media_item,
+            plan_schema,
+            concepts,
+            fingerprint,
+        )
+
+        logger.info(f'Regenerated study plan for {media_item.title}')
+    except Exception as e:
+        logger.error(
+            f'Error regenerating study plan for {media_item_id}: {e}'
+        )
+        traceback.print_exc()
+    finally:
+        cache.delete(lock)
+
+
+@shared_task
+def regenerate_quizzes(media_item_id):
+    """
+    Regenerates only the quiz questions of a MediaItem that were generated
+    from another quiz prompt or concept definition. The stale questions
+    are kept until their replacements are saved.
+    """
+    try:
+        translation.activate(settings.LANGUAGE_CODE)
+
+        media_item = MediaItem.objects.get(id=media_item_id)
+        stale_ids = stale_quiz_concept_ids(
+            media_item, ProjectSettings.load(fresh=True)
+        )
+        if not stale_ids:
+            return
 
+        count = generate_missing_quizzes(stale_ids, regenerate=True)
+
+        logger.info(
+            f'Regenerated quizzes of {count} concepts for {media_item.title}'
+        )
     except Exception as e:
-        logger.error(f'Error generating content for {media_item_id}: {e}')
+        logger.error(f'Error regenerating quizzes for {media_item_id}: {e}')
         traceback.print_exc()
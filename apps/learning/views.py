@@ -9,6 +9,7 @@ from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
 from django.views.generic import DetailView, TemplateView, View
 
+from apps.core.models import ProjectSettings
 from apps.learning.agents.tutor import TutorAgent
 from apps.learning.models import (
     Concept,
@@ -17,7 +18,14 @@ from apps.learning.models import (
     StudyUnit,
     TutorChatSession,
 )
+from apps.learning.services.quiz_pool import (
+    claim_prefetch,
+    quiz_generation_failed,
+    quiz_generation_in_progress,
+    request_quiz_generation,
+)
 from apps.learning.services.srs import calculate_next_review
+from apps.learning.tasks import generate_concept_quiz, prefetch_plan_quizzes
 
 
 class LearningDashboardView(LoginRequiredMixin, TemplateView):
@@ -103,7 +111,32 @@ class QuizView(LoginRequiredMixin, DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['questions'] = self.object.concept.quiz_questions.all()
+        questions = self.object.concept.quiz_questions.all()
+        concept_id = self.object.concept_id
+
+        if not questions.exists():
+            # The quiz is generated in the background; the page shows that
+            # it is on its way, or a retry link once generation failed
+            if (
+                'retry' in self.request.GET
+                or not quiz_generation_failed(concept_id)
+            ) and request_quiz_generation(concept_id):
+                generate_concept_quiz.delay(concept_id)
+            context['quiz_generating'] = quiz_generation_in_progress(
+                concept_id
+            )
+
+        project_settings = ProjectSettings.load()
+        if (
+            project_settings.quiz_generation_mode
+            == ProjectSettings.QuizGenerationMode.LAZY
+            and claim_prefetch(self.object.plan_id, self.object.order)
+        ):
+            prefetch_plan_quizzes.delay(
+                self.object.plan_id, self.object.order
+            )
+
+        context['questions'] = questions
         return context
 
     def post(self, request, *args, **kwargs):
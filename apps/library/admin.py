@@ -1,7 +1,17 @@
+from celery import group
 from django.contrib import admin
+from django.db.models import Sum
+from django.template.defaultfilters import filesizeformat
 
-from .models import MediaItem, Topic
-from .tasks import analyze_media, summarize_media
+from .models import (
+    BulkJob,
+    MediaItem,
+    PipelineRun,
+    StageRun,
+    Topic,
+    UploadSession,
+)
+from .tasks import archive_media, cancel_pipelines, start_bulk_action
 
 
 @admin.register(Topic)
@@ -14,25 +24,193 @@ class TopicAdmin(admin.ModelAdmin):
 
 @admin.register(MediaItem)
 class MediaItemAdmin(admin.ModelAdmin):
-    list_display = ('title', 'media_type', 'status', 'created_at', 'topic')
+    list_display = (
+        'title',
+        'media_type',
+        'status',
+        'created_at',
+        'topic',
+        'reclaimed',
+    )
     list_filter = ('status', 'media_type', 'created_at', 'topic', 'tags')
-    search_fields = ('title', 'transcription', 'summary')
-    actions = ['analyze_selected', 'summarize_selected']
+    search_fields = ('title', 'summary_excerpt')
+    actions = [
+        'analyze_selected',
+        'summarize_selected',
+        'archive_selected',
+        'cancel_selected',
+    ]
+
+    @admin.display(description='Reclaimed')
+    def reclaimed(self, obj):
+        if obj.reclaimed_bytes is None:
+            return '-'
+        return filesizeformat(obj.reclaimed_bytes)
+
+    def start_bulk_action(self, request, queryset, action, verb):
+        bulk_job = start_bulk_action(request.user, queryset, action)
+        if bulk_job:
+            self.message_user(
+                request,
+                f'{verb} of {bulk_job.total} items is being scheduled in the '
+                f'background (bulk job #{bulk_job.id}).',
+            )
+        else:
+            self.message_user(
+                request, f'Started {verb.lower()} for {queryset.count()} items.'
+            )
 
     @admin.action(description='Analyze selected items')
     def analyze_selected(self, request, queryset):
-        for item in queryset:
-            analyze_media.delay(item.id)
-        self.message_user(
-            request, f'Started analysis for {queryset.count()} items.'
+        self.start_bulk_action(
+            request, queryset, BulkJob.Action.REANALYZE, 'Analysis'
         )
 
     @admin.action(description='Summarize selected items')
     def summarize_selected(self, request, queryset):
-        for item in queryset:
-            summarize_media.delay(item.id)
+        self.start_bulk_action(
+            request, queryset, BulkJob.Action.RESUMMARIZE, 'Summarization'
+        )
+
+    @admin.action(description='Archive selected audio/video items')
+    def archive_selected(self, request, queryset):
+        ids = list(
+            queryset.filter(
+                archived_at__isnull=True,
+                media_type__in=[
+                    MediaItem.MediaType.AUDIO,
+                    MediaItem.MediaType.VIDEO,
+                ],
+            ).values_list('id', flat=True)
+        )
+        if ids:
+            group(archive_media.si(item_id) for item_id in ids).apply_async()
+
+        archived = MediaItem.objects.filter(archived_at__isnull=False).aggregate(
+            original=Sum('original_size'), archived=Sum('archived_size')
+        )
+        reclaimed = (archived['original'] or 0) - (archived['archived'] or 0)
         self.message_user(
-            request, f'Started summarization for {queryset.count()} items.'
+            request,
+            f'Started archival for {len(ids)} items. '
+            f'Archival has reclaimed {filesizeformat(reclaimed)} so far.',
         )
 
-    readonly_fields = ('created_at', 'transcription', 'summary')
+    @admin.action(description='Cancel processing of selected items')
+    def cancel_selected(self, request, queryset):
+        count = cancel_pipelines(queryset.values_list('id', flat=True))
+        self.message_user(request, f'Cancelled {count} pipeline runs.')
+
+    def delete_model(self, request, obj):
+        cancel_pipelines([obj.id])
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        cancel_pipelines(queryset.values_list('id', flat=True))
+        super().delete_queryset(request, queryset)
+
+    readonly_fields = (
+        'created_at',
+        'transcription',
+        'summary',
+        'original_sha256',
+        'original_size',
+        'archived_size',
+        'archived_at',
+        'perceptual_hash',
+        'duplicate_of',
+    )
+
+
+class StageRunInline(admin.TabularInline):
+    model = StageRun
+    extra = 0
+    can_delete = False
+    fields = (
+        'stage',
+        'status',
+        'attempts',
+        'queued_at',
+        'started_at',
+        'finished_at',
+        'duration',
+        'task_id',
+        'error',
+    )
+    readonly_fields = fields
+
+
+@admin.register(PipelineRun)
+class PipelineRunAdmin(admin.ModelAdmin):
+    list_display = (
+        'media_item',
+        'status',
+        'current_step',
+        'queued_at',
+        'started_at',
+        'finished_at',
+    )
+    list_filter = ('status', 'queued_at')
+    search_fields = ('media_item__title',)
+    readonly_fields = (
+        'media_item',
+        'status',
+        'current_step',
+        'error',
+        'queued_at',
+        'started_at',
+        'finished_at',
+    )
+    inlines = [StageRunInline]
+
+
+@admin.register(BulkJob)
+class BulkJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'action',
+        'user',
+        'status',
+        'processed',
+        'total',
+        'created_at',
+        'finished_at',
+    )
+    list_filter = ('action', 'status', 'created_at')
+    readonly_fields = (
+        'user',
+        'action',
+        'status',
+        'total',
+        'processed',
+        'error',
+        'created_at',
+        'finished_at',
+    )
+    exclude = ('media_item_ids',)
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = (
+        'filename',
+        'user',
+        'status',
+        'offset',
+        'size',
+        'created_at',
+        'updated_at',
+    )
+    list_filter = ('status', 'created_at')
+    search_fields = ('filename',)
+    readonly_fields = (
+        'user',
+        'filename',
+        'size',
+        'offset',
+        'status',
+        'topic',
+        'tags',
+        'media_item',
+        'created_at',
+        'updated_at',
+    )
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0004_mediaitem_processing_step'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediaitem',
+            name='summary_fingerprint',
+            field=models.CharField(blank=True, help_text='Hash of the prompt and input the summary was made from.', max_length=64, verbose_name='Summary Fingerprint'),
+        ),
+    ]
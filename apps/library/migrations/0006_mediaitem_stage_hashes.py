@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0005_mediaitem_summary_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediaitem',
+            name='stage_hashes',
+            field=models.JSONField(blank=True, default=dict, help_text='Input and config hashes of the last run of each stage.', verbose_name='Stage Hashes'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0006_mediaitem_stage_hashes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PipelineRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='queued', max_length=20, verbose_name='Status')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('queued_at', models.DateTimeField(auto_now_add=True, verbose_name='Queued At')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Started At')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Finished At')),
+                ('media_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pipeline_runs', to='library.mediaitem', verbose_name='Media Item')),
+            ],
+            options={
+                'verbose_name': 'Pipeline Run',
+                'verbose_name_plural': 'Pipeline Runs',
+                'ordering': ['-queued_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StageRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stage', models.CharField(choices=[('analyze', 'Analyze'), ('summarize', 'Summarize'), ('content', 'Generate Content'), ('index', 'Index')], max_length=20, verbose_name='Stage')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('skipped', 'Skipped'), ('failed', 'Failed')], default='queued', max_length=20, verbose_name='Status')),
+                ('task_id', models.CharField(blank=True, max_length=255, verbose_name='Task ID')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Attempts')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('queued_at', models.DateTimeField(auto_now_add=True, verbose_name='Queued At')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Started At')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Finished At')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stages', to='library.pipelinerun', verbose_name='Pipeline Run')),
+            ],
+            options={
+                'verbose_name': 'Stage Run',
+                'verbose_name_plural': 'Stage Runs',
+                'ordering': ['queued_at', 'id'],
+                'constraints': [models.UniqueConstraint(fields=('run', 'stage'), name='unique_stage_per_pipeline_run')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0007_pipelinerun_stagerun'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='mediaitem',
+            name='processing_step',
+        ),
+        migrations.AddField(
+            model_name='pipelinerun',
+            name='current_step',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Current Step'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0008_pipelinerun_current_step'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediaitem',
+            name='summary_excerpt',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Summary Excerpt'),
+        ),
+        migrations.CreateModel(
+            name='MediaText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('transcription', 'Transcription'), ('summary', 'Summary')], max_length=20, verbose_name='Kind')),
+                ('data', models.BinaryField(verbose_name='Data')),
+                ('length', models.PositiveIntegerField(default=0, help_text='Length of the text in characters.', verbose_name='Length')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('media_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='texts', to='library.mediaitem', verbose_name='Media Item')),
+            ],
+            options={
+                'verbose_name': 'Media Text',
+                'verbose_name_plural': 'Media Texts',
+                'constraints': [models.UniqueConstraint(fields=('media_item', 'kind'), name='unique_text_per_media_item')],
+            },
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:07
+
+import zstandard
+from django.db import migrations
+
+
+def move_texts_to_media_text(apps, schema_editor):
+    MediaItem = apps.get_model('library', 'MediaItem')
+    MediaText = apps.get_model('library', 'MediaText')
+    compressor = zstandard.ZstdCompressor(level=10)
+
+    items = MediaItem.objects.only('id', 'transcription', 'summary')
+    # Transcriptions can be several MB each: stream them instead of
+    # filling the queryset cache
+    for item in items.iterator(chunk_size=100):
+        texts = [
+            MediaText(
+                media_item_id=item.id,
+                kind=kind,
+                data=compressor.compress(text.encode('utf-8')),
+                length=len(text),
+            )
+            for kind, text in (
+                ('transcription', item.transcription),
+                ('summary', item.summary),
+            )
+            if text
+        ]
+        MediaText.objects.bulk_create(texts)
+        MediaItem.objects.filter(id=item.id).update(
+            summary_excerpt=item.summary[:255]
+        )
+
+
+def move_texts_to_media_item(apps, schema_editor):
+    MediaItem = apps.get_model('library', 'MediaItem')
+    MediaText = apps.get_model('library', 'MediaText')
+    decompressor = zstandard.ZstdDecompressor()
+
+    for text in MediaText.objects.iterator(chunk_size=100):
+        MediaItem.objects.filter(id=text.media_item_id).update(
+            **{
+                text.kind: decompressor.decompressobj()
+                .decompress(bytes(text.data))
+                .decode('utf-8')
+            }
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0009_mediatext'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            move_texts_to_media_text, move_texts_to_media_item
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:07
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0010_move_texts_to_media_text'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='mediaitem',
+            name='summary',
+        ),
+        migrations.RemoveField(
+            model_name='mediaitem',
+            name='transcription',
+        ),
+    ]
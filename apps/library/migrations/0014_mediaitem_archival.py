@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0013_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediaitem',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Archived At'),
+        ),
+        migrations.AddField(
+            model_name='mediaitem',
+            name='archived_size',
+            field=models.PositiveBigIntegerField(blank=True, null=True, verbose_name='Archived Size'),
+        ),
+        migrations.AddField(
+            model_name='mediaitem',
+            name='original_sha256',
+            field=models.CharField(blank=True, help_text='Hash of the uploaded file before archival transcoding.', max_length=64, verbose_name='Original SHA-256'),
+        ),
+        migrations.AddField(
+            model_name='mediaitem',
+            name='original_size',
+            field=models.PositiveBigIntegerField(blank=True, null=True, verbose_name='Original Size'),
+        ),
+    ]
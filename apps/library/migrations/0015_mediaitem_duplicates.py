@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0014_mediaitem_archival'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediaitem',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, help_text='Processed item this upload is a near-duplicate of.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='library.mediaitem', verbose_name='Duplicate Of'),
+        ),
+        migrations.AddField(
+            model_name='mediaitem',
+            name='perceptual_hash',
+            field=models.CharField(blank=True, help_text='Image dHash or audio fingerprint, as 64-bit hex.', max_length=16, verbose_name='Perceptual Hash'),
+        ),
+        migrations.CreateModel(
+            name='FingerprintBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField(verbose_name='Band')),
+                ('value', models.PositiveIntegerField(verbose_name='Value')),
+                ('media_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fingerprint_bands', to='library.mediaitem', verbose_name='Media Item')),
+            ],
+            options={
+                'verbose_name': 'Fingerprint Band',
+                'verbose_name_plural': 'Fingerprint Bands',
+                'indexes': [models.Index(fields=['band', 'value'], name='library_fin_band_a14d7b_idx')],
+                'constraints': [models.UniqueConstraint(fields=('media_item', 'band'), name='unique_band_per_media_item')],
+            },
+        ),
+    ]
@@ -1,9 +1,22 @@
+import uuid
+from pathlib import Path
+from typing import Iterator
+
+import redis
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.utils.functional import cached_property
 from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 from taggit.managers import TaggableManager
 
+from apps.library.services.fair_scheduler import FairScheduler
+from apps.library.services.text_storage import (
+    compress_text,
+    decompress_text,
+    iter_text,
+)
+
 
 class Topic(models.Model):
     user = models.ForeignKey(
@@ -59,6 +72,7 @@ class MediaItem(models.Model):
         PROCESSING = 'processing', _('Processing')
         COMPLETED = 'completed', _('Completed')
         FAILED = 'failed', _('Failed')
+        CANCELLED = 'cancelled', _('Cancelled')
 
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -80,16 +94,54 @@ class MediaItem(models.Model):
         choices=Status.choices,
         default=Status.PENDING,
     )
-    processing_step = models.CharField(
-        _('Processing Step'), max_length=255, blank=True, null=True
+    summary_excerpt = models.CharField(
+        _('Summary Excerpt'), max_length=255, blank=True
+    )
+    summary_fingerprint = models.CharField(
+        _('Summary Fingerprint'),
+        max_length=64,
+        blank=True,
+        help_text=_('Hash of the prompt and input the summary was made from.'),
+    )
+    stage_hashes = models.JSONField(
+        _('Stage Hashes'),
+        default=dict,
+        blank=True,
+        help_text=_('Input and config hashes of the last run of each stage.'),
     )
-    transcription = models.TextField(_('Transcription'), blank=True)
-    summary = models.TextField(_('Summary'), blank=True)
     error_log = models.TextField(
         _('Error Log'),
         blank=True,
         help_text=_('Stores stack traces for failed tasks.'),
     )
+    original_sha256 = models.CharField(
+        _('Original SHA-256'),
+        max_length=64,
+        blank=True,
+        help_text=_('Hash of the uploaded file before archival transcoding.'),
+    )
+    original_size = models.PositiveBigIntegerField(
+        _('Original Size'), null=True, blank=True
+    )
+    archived_size = models.PositiveBigIntegerField(
+        _('Archived Size'), null=True, blank=True
+    )
+    archived_at = models.DateTimeField(_('Archived At'), null=True, blank=True)
+    perceptual_hash = models.CharField(
+        _('Perceptual Hash'),
+        max_length=16,
+        blank=True,
+        help_text=_('Image dHash or audio fingerprint, as 64-bit hex.'),
+    )
+    duplicate_of = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='duplicates',
+        verbose_name=_('Duplicate Of'),
+        help_text=_('Processed item this upload is a near-duplicate of.'),
+    )
     created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
     topic = models.ForeignKey(
         Topic,
@@ -107,3 +159,459 @@ class MediaItem(models.Model):
 
     def __str__(self):
         return self.title
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the row and writes changed texts to their MediaText rows.
+        `transcription` and `summary` are accepted in `update_fields`.
+        """
+        dirty = self.__dict__.setdefault('_dirty_texts', set())
+        texts = set(dirty)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            texts &= update_fields
+            if MediaText.Kind.SUMMARY in texts:
+                update_fields.add('summary_excerpt')
+            kwargs['update_fields'] = update_fields - set(MediaText.Kind)
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if texts:
+                MediaText.objects.bulk_create(
+                    [
+                        MediaText(
+                            media_item=self,
+                            kind=kind,
+                            data=compress_text(self._texts[kind]),
+                            length=len(self._texts[kind]),
+                        )
+                        for kind in texts
+                    ],
+                    update_conflicts=True,
+                    unique_fields=['media_item', 'kind'],
+                    update_fields=['data', 'length', 'updated_at'],
+                )
+
+        dirty -= texts
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        kinds = set(MediaText.Kind)
+        if fields is not None:
+            kinds &= set(fields)
+            fields = [f for f in fields if f not in kinds]
+
+        for kind in kinds:
+            self.__dict__.get('_texts', {}).pop(kind, None)
+            self.__dict__.get('_dirty_texts', set()).discard(kind)
+
+        if fields is None or fields:
+            super().refresh_from_db(using=using, fields=fields, **kwargs)
+
+    def load_texts(self):
+        """
+        Loads all texts with a single query. Call it (via sync_to_async)
+        before reading texts in async code.
+        """
+        texts = self.__dict__.setdefault('_texts', {})
+        rows = self.texts.all() if self.pk else []
+        loaded = {row.kind: row.read() for row in rows}
+        for kind in MediaText.Kind:
+            texts.setdefault(kind, loaded.get(kind, ''))
+
+    def _get_text(self, kind):
+        texts = self.__dict__.setdefault('_texts', {})
+        if kind not in texts:
+            prefetched = getattr(self, '_prefetched_objects_cache', {})
+            if 'texts' in prefetched:
+                row = next(
+                    (t for t in prefetched['texts'] if t.kind == kind), None
+                )
+            elif self.pk:
+                row = self.texts.filter(kind=kind).first()
+            else:
+                row = None
+            texts[kind] = row.read() if row else ''
+        return texts[kind]
+
+    def _set_text(self, kind, value):
+        value = value or ''
+        self.__dict__.setdefault('_texts', {})[kind] = value
+        self.__dict__.setdefault('_dirty_texts', set()).add(kind)
+        if kind == MediaText.Kind.SUMMARY:
+            self.summary_excerpt = value[:255]
+
+    transcription = property(
+        lambda self: self._get_text(MediaText.Kind.TRANSCRIPTION),
+        lambda self, value: self._set_text(
+            MediaText.Kind.TRANSCRIPTION, value
+        ),
+    )
+    summary = property(
+        lambda self: self._get_text(MediaText.Kind.SUMMARY),
+        lambda self, value: self._set_text(MediaText.Kind.SUMMARY, value),
+    )
+
+    @property
+    def processing_step(self):
+        """
+        Current step of the running pipeline. Progress is kept on the small
+        PipelineRun row so that it never rewrites the text columns here.
+        """
+        run = self.pipeline_runs.filter(finished_at__isnull=True).first()
+        return run.current_step if run else None
+
+    @property
+    def reclaimed_bytes(self):
+        """
+        Storage saved by archival transcoding, or None if not archived.
+        """
+        if self.original_size is None or self.archived_size is None:
+            return None
+        return self.original_size - self.archived_size
+
+    @cached_property
+    def _queue_info(self):
+        if (
+            self.status != self.Status.PENDING
+            or not settings.FAIR_SCHEDULING_ENABLED
+        ):
+            return None
+        try:
+            return FairScheduler().queue_info(self.id)
+        except redis.RedisError:
+            return None
+
+    @classmethod
+    def prefetch_queue_info(cls, media_items):
+        """
+        Loads queue_position and estimated_start of many items with a
+        single Redis round trip, for list pages.
+        """
+        pending = [
+            item for item in media_items if item.status == cls.Status.PENDING
+        ]
+        infos = {}
+        if pending and settings.FAIR_SCHEDULING_ENABLED:
+            try:
+                infos = FairScheduler().queue_infos(
+                    [item.id for item in pending]
+                )
+            except redis.RedisError:
+                pass
+        for item in pending:
+            item.__dict__['_queue_info'] = infos.get(item.id)
+
+    @property
+    def queue_position(self):
+        """
+        1-based position among all queued ingest jobs, or None if the item
+        is not waiting for an ingest slot.
+        """
+        return self._queue_info[0] if self._queue_info else None
+
+    @property
+    def estimated_start(self):
+        return self._queue_info[1] if self._queue_info else None
+
+
+class MediaText(models.Model):
+    """
+    Large text of a MediaItem, zstd-compressed and kept out of the
+    media item row so that list and admin queries stay small.
+    """
+
+    class Kind(models.TextChoices):
+        TRANSCRIPTION = 'transcription', _('Transcription')
+        SUMMARY = 'summary', _('Summary')
+
+    media_item = models.ForeignKey(
+        MediaItem,
+        on_delete=models.CASCADE,
+        related_name='texts',
+        verbose_name=_('Media Item'),
+    )
+    kind = models.CharField(_('Kind'), max_length=20, choices=Kind.choices)
+    data = models.BinaryField(_('Data'))
+    length = models.PositiveIntegerField(
+        _('Length'), default=0, help_text=_('Length of the text in characters.')
+    )
+    updated_at = models.DateTimeField(_('Updated At'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Media Text')
+        verbose_name_plural = _('Media Texts')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['media_item', 'kind'], name='unique_text_per_media_item'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.media_item} ({self.kind})'
+
+    def read(self) -> str:
+        return decompress_text(self.data)
+
+    def stream(self, chunk_size: int = 64 * 1024) -> Iterator[str]:
+        """
+        Yields the text in chunks, decompressing incrementally.
+        """
+        return iter_text(self.data, chunk_size)
+
+    def slice(self, start: int, stop: int) -> str:
+        """
+        Returns text[start:stop], decompressing only up to `stop`.
+        """
+        parts, size = [], 0
+        for chunk in self.stream():
+            parts.append(chunk)
+            size += len(chunk)
+            if size >= stop:
+                break
+        return ''.join(parts)[start:stop]
+
+
+class PipelineRun(models.Model):
+    """
+    One run of the processing pipeline of a MediaItem.
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued', _('Queued')
+        RUNNING = 'running', _('Running')
+        COMPLETED = 'completed', _('Completed')
+        FAILED = 'failed', _('Failed')
+        CANCELLED = 'cancelled', _('Cancelled')
+
+    media_item = models.ForeignKey(
+        MediaItem,
+        on_delete=models.CASCADE,
+        related_name='pipeline_runs',
+        verbose_name=_('Media Item'),
+    )
+    status = models.CharField(
+        _('Status'),
+        max_length=20,
+        choices=Status.choices,
+        default=Status.QUEUED,
+    )
+    current_step = models.CharField(
+        _('Current Step'), max_length=255, blank=True
+    )
+    error = models.TextField(_('Error'), blank=True)
+    queued_at = models.DateTimeField(_('Queued At'), auto_now_add=True)
+    started_at = models.DateTimeField(_('Started At'), null=True, blank=True)
+    finished_at = models.DateTimeField(_('Finished At'), null=True, blank=True)
+
+    class Meta:
+        ordering = ['-queued_at']
+        verbose_name = _('Pipeline Run')
+        verbose_name_plural = _('Pipeline Runs')
+
+    def __str__(self):
+        return f'{self.media_item} #{self.id} ({self.status})'
+
+
+class StageRun(models.Model):
+    """
+    Execution record of one stage of a PipelineRun.
+    """
+
+    class Stage(models.TextChoices):
+        ANALYZE = 'analyze', _('Analyze')
+        SUMMARIZE = 'summarize', _('Summarize')
+        CONTENT = 'content', _('Generate Content')
+        INDEX = 'index', _('Index')
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued', _('Queued')
+        RUNNING = 'running', _('Running')
+        COMPLETED = 'completed', _('Completed')
+        SKIPPED = 'skipped', _('Skipped')
+        FAILED = 'failed', _('Failed')
+        CANCELLED = 'cancelled', _('Cancelled')
+
+    run = models.ForeignKey(
+        PipelineRun,
+        on_delete=models.CASCADE,
+        related_name='stages',
+        verbose_name=_('Pipeline Run'),
+    )
+    stage = models.CharField(_('Stage'), max_length=20, choices=Stage.choices)
+    status = models.CharField(
+        _('Status'),
+        max_length=20,
+        choices=Status.choices,
+        default=Status.QUEUED,
+    )
+    task_id = models.CharField(_('Task ID'), max_length=255, blank=True)
+    attempts = models.PositiveIntegerField(_('Attempts'), default=0)
+    error = models.TextField(_('Error'), blank=True)
+    queued_at = models.DateTimeField(_('Queued At'), auto_now_add=True)
+    started_at = models.DateTimeField(_('Started At'), null=True, blank=True)
+    finished_at = models.DateTimeField(_('Finished At'), null=True, blank=True)
+
+    class Meta:
+        ordering = ['queued_at', 'id']
+        verbose_name = _('Stage Run')
+        verbose_name_plural = _('Stage Runs')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['run', 'stage'], name='unique_stage_per_pipeline_run'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.get_stage_display()} ({self.status})'
+
+    @property
+    def duration(self):
+        if self.started_at and self.finished_at:
+            return self.finished_at - self.started_at
+        return None
+
+
+class BulkJob(models.Model):
+    """
+    A bulk action over many MediaItems, dispatched in batches by a
+    background task so that the request that started it returns at once.
+    """
+
+    class Action(models.TextChoices):
+        REANALYZE = 'reanalyze', _('Re-analyze')
+        RESUMMARIZE = 'resummarize', _('Re-summarize')
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued', _('Queued')
+        RUNNING = 'running', _('Running')
+        COMPLETED = 'completed', _('Completed')
+        FAILED = 'failed', _('Failed')
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='bulk_jobs',
+        verbose_name=_('User'),
+    )
+    action = models.CharField(_('Action'), max_length=20, choices=Action.choices)
+    status = models.CharField(
+        _('Status'),
+        max_length=20,
+        choices=Status.choices,
+        default=Status.QUEUED,
+    )
+    media_item_ids = models.JSONField(_('Media Items'), default=list)
+    total = models.PositiveIntegerField(_('Total'), default=0)
+    processed = models.PositiveIntegerField(_('Processed'), default=0)
+    error = models.TextField(_('Error'), blank=True)
+    created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
+    finished_at = models.DateTimeField(_('Finished At'), null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = _('Bulk Job')
+        verbose_name_plural = _('Bulk Jobs')
+
+    def __str__(self):
+        return f'{self.get_action_display()} ({self.processed}/{self.total})'
+
+    @property
+    def progress(self) -> int:
+        """
+        Percentage of items dispatched so far.
+        """
+        if not self.total:
+            return 100
+        return self.processed * 100 // self.total
+
+
+class UploadSession(models.Model):
+    """
+    A resumable upload: the client sends the file in chunks, each at the
+    current offset with its sha256, and the MediaItem is created once the
+    last chunk has arrived.
+    """
+
+    class Status(models.TextChoices):
+        ACTIVE = 'active', _('Active')
+        COMPLETED = 'completed', _('Completed')
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions',
+        verbose_name=_('User'),
+    )
+    filename = models.CharField(_('Filename'), max_length=255)
+    size = models.PositiveBigIntegerField(_('Size'))
+    offset = models.PositiveBigIntegerField(
+        _('Offset'), default=0, help_text=_('Number of bytes received.')
+    )
+    status = models.CharField(
+        _('Status'),
+        max_length=20,
+        choices=Status.choices,
+        default=Status.ACTIVE,
+    )
+    topic = models.ForeignKey(
+        Topic,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name=_('Topic'),
+    )
+    tags = models.JSONField(_('Tags'), default=list, blank=True)
+    media_item = models.OneToOneField(
+        MediaItem,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='upload_session',
+        verbose_name=_('Media Item'),
+    )
+    created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
+    updated_at = models.DateTimeField(_('Updated At'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Upload Session')
+        verbose_name_plural = _('Upload Sessions')
+
+    def __str__(self):
+        return f'{self.filename} ({self.offset}/{self.size})'
+
+    @property
+    def partial_path(self) -> Path:
+        return Path(settings.UPLOAD_SESSION_DIR) / f'{self.id}.part'
+
+
+class FingerprintBand(models.Model):
+    """
+    One band of the perceptual hash of a MediaItem. Hashes within Hamming
+    distance d < number of bands share at least one band exactly, so the
+    (band, value) index finds near-duplicate candidates without a scan.
+    """
+
+    media_item = models.ForeignKey(
+        MediaItem,
+        on_delete=models.CASCADE,
+        related_name='fingerprint_bands',
+        verbose_name=_('Media Item'),
+    )
+    band = models.PositiveSmallIntegerField(_('Band'))
+    value = models.PositiveIntegerField(_('Value'))
+
+    class Meta:
+        verbose_name = _('Fingerprint Band')
+        verbose_name_plural = _('Fingerprint Bands')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['media_item', 'band'], name='unique_band_per_media_item'
+            ),
+        ]
+        indexes = [models.Index(fields=['band', 'value'])]
+
+    def __str__(self):
+        return f'{self.media_item} [{self.band}] {self.value:02x}'
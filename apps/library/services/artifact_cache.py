@@ -0,0 +1,137 @@
+import hashlib
+import logging
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Callable
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+
+class ArtifactCache:
+    """
+    Files derived from uploads (extracted audio, downscaled OCR images,
+    ...), kept outside MEDIA_ROOT/uploads and reused across reanalysis.
+
+    An artifact is keyed by the hash of its source file and by the
+    transform with its parameters. Using an artifact refreshes its mtime;
+    when the cache grows over ARTIFACT_CACHE_MAX_BYTES the least recently
+    used artifacts are removed, except those used within the last
+    ARTIFACT_CACHE_MIN_AGE seconds, which may still be read by a task.
+
+    With ARTIFACT_CACHE_REMOTE, artifacts are also written back to the
+    media storage under `artifacts/`, so workers on other nodes download
+    them instead of building them again. Eviction only applies locally.
+    """
+
+    def __init__(self, root=None, max_bytes=None, min_age=None, remote=None):
+        self.root = Path(root or settings.ARTIFACT_CACHE_DIR)
+        self.max_bytes = (
+            settings.ARTIFACT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        )
+        self.min_age = (
+            settings.ARTIFACT_CACHE_MIN_AGE if min_age is None else min_age
+        )
+        if remote is None and settings.ARTIFACT_CACHE_REMOTE:
+            remote = default_storage
+        self.remote = remote
+
+    @staticmethod
+    def key(source_hash: str, transform: str, **params) -> str:
+        parts = [source_hash, transform] + [
+            f'{name}={value}' for name, value in sorted(params.items())
+        ]
+        return hashlib.sha256('\x1f'.join(parts).encode()).hexdigest()
+
+    def path(self, key: str, suffix: str) -> Path:
+        return self.root / key[:2] / f'{key}{suffix}'
+
+    def get_or_create(
+        self,
+        source_hash: str,
+        transform: str,
+        suffix: str,
+        build: Callable[[Path], None],
+        share: bool = True,
+        **params,
+    ) -> Path:
+        """
+        Returns the cached artifact, calling `build(output_path)` to make
+        it on a miss. The artifact is built under a temporary name and
+        renamed, so concurrent tasks never see a partial file. `share`
+        controls the write-back to remote storage.
+        """
+        key = self.key(source_hash, transform, **params)
+        path = self.path(key, suffix)
+
+        if path.exists():
+            os.utime(path)
+            logger.info(f'Artifact cache hit for {transform}: {path.name}')
+            return path
+
+        remote_name = f'artifacts/{key}{suffix}'
+        share = share and self.remote is not None
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f'.{uuid.uuid4().hex}{suffix}')
+        try:
+            if share and self.remote.exists(remote_name):
+                self.download(remote_name, tmp_path)
+                share = False
+            else:
+                build(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+        if share:
+            with open(path, 'rb') as f:
+                self.remote.save(remote_name, File(f))
+
+        logger.info(f'Artifact cache stored {transform}: {path.name}')
+        self.evict()
+        return path
+
+    def download(self, name: str, output: Path):
+        with self.remote.open(name, 'rb') as src, open(output, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 8 * 1024 * 1024)
+
+    def evict(self) -> int:
+        """
+        Removes least recently used artifacts until the cache fits its
+        budget. Returns the number of freed bytes.
+        """
+        entries = []
+        total = 0
+        for path in self.root.glob('*/*'):
+            if path.name.startswith('.'):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        if total <= self.max_bytes:
+            return 0
+
+        freed = 0
+        cutoff = time.time() - self.min_age
+        for mtime, size, path in sorted(entries):
+            if total - freed <= self.max_bytes or mtime > cutoff:
+                break
+            path.unlink(missing_ok=True)
+            freed += size
+
+        logger.info(
+            f'Evicted {freed} bytes from the artifact cache '
+            f'({total - freed} of {self.max_bytes} bytes used)'
+        )
+        return freed
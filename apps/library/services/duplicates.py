@@ -0,0 +1,225 @@
+import logging
+import subprocess
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from PIL import Image
+
+from apps.library.models import FingerprintBand, MediaItem
+from apps.library.services.stage_hashes import ANALYZE
+
+logger = logging.getLogger(__name__)
+
+HASH_BITS = 64
+BANDS = 8
+BAND_BITS = HASH_BITS // BANDS
+
+# Sample rate of the decoded audio: enough for the loudness envelope
+AUDIO_SAMPLE_RATE = 2000
+
+# Media types whose fingerprints are comparable with each other
+FINGERPRINT_GROUPS = {
+    MediaItem.MediaType.IMAGE: [MediaItem.MediaType.IMAGE],
+    MediaItem.MediaType.AUDIO: [
+        MediaItem.MediaType.AUDIO,
+        MediaItem.MediaType.VIDEO,
+    ],
+    MediaItem.MediaType.VIDEO: [
+        MediaItem.MediaType.AUDIO,
+        MediaItem.MediaType.VIDEO,
+    ],
+}
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+def split_bands(value: int) -> List[int]:
+    mask = (1 << BAND_BITS) - 1
+    return [(value >> (band * BAND_BITS)) & mask for band in range(BANDS)]
+
+
+def gradient_bits(values) -> int:
+    """
+    Packs `values[i + 1] > values[i]` for HASH_BITS + 1 values into an int.
+    """
+    bits = np.asarray(values[1:]) > np.asarray(values[:-1])
+    return int(''.join('1' if bit else '0' for bit in bits), 2)
+
+
+def image_dhash(image_path: Path) -> int:
+    """
+    Difference hash: the image shrunk to 9x8 grey pixels, one bit per
+    horizontal gradient. Survives rescaling, recompression and small
+    changes of exposure, as with the same slide photographed twice.
+    """
+    with Image.open(image_path) as image:
+        pixels = np.asarray(
+            image.convert('L').resize((9, 8), Image.Resampling.LANCZOS),
+            dtype=np.int16,
+        )
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int(''.join('1' if bit else '0' for bit in bits), 2)
+
+
+def envelope_fingerprint(samples: np.ndarray) -> Optional[int]:
+    """
+    Fingerprint of decoded audio: whether the loudness rises or falls
+    between HASH_BITS + 1 equal segments of the recording. It depends on
+    the content, not on codec or bitrate. Returns None for recordings too
+    short to split.
+    """
+    if len(samples) < (HASH_BITS + 1) * 16:
+        return None
+    segments = np.array_split(samples.astype(np.float64), HASH_BITS + 1)
+    energy = [np.log1p(np.mean(segment**2)) for segment in segments]
+    return gradient_bits(energy)
+
+
+def audio_fingerprint(media_path: Path) -> Optional[int]:
+    result = subprocess.run(
+        [
+            'ffmpeg',
+            '-v',
+            'error',
+            '-i',
+            str(media_path),
+            '-vn',
+            '-ac',
+            '1',
+            '-ar',
+            str(AUDIO_SAMPLE_RATE),
+            '-f',
+            's16le',
+            '-',
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return envelope_fingerprint(np.frombuffer(result.stdout, dtype=np.int16))
+
+
+def perceptual_hash(media_item, source_path: Path) -> Optional[int]:
+    if media_item.media_type == MediaItem.MediaType.IMAGE:
+        return image_dhash(source_path)
+    if media_item.media_type in (
+        MediaItem.MediaType.AUDIO,
+        MediaItem.MediaType.VIDEO,
+    ):
+        return audio_fingerprint(source_path)
+    return None
+
+
+def index_perceptual_hash(media_item, value: int):
+    """
+    Stores the hash on the item and its bands in the lookup index.
+    """
+    media_item.perceptual_hash = f'{value:016x}'
+    with transaction.atomic():
+        media_item.save(update_fields=['perceptual_hash'])
+        FingerprintBand.objects.filter(media_item=media_item).delete()
+        FingerprintBand.objects.bulk_create(
+            FingerprintBand(media_item=media_item, band=band, value=band_value)
+            for band, band_value in enumerate(split_bands(value))
+        )
+
+
+def fingerprint_media(media_item, source_path: Path) -> Optional[int]:
+    """
+    Computes and indexes the perceptual hash of an item. Returns None for
+    items without one (text, very short audio) or undecodable files.
+    """
+    try:
+        value = perceptual_hash(media_item, source_path)
+    except (OSError, subprocess.CalledProcessError) as e:
+        logger.warning(f'Could not fingerprint {media_item.id}: {e}')
+        return None
+
+    if value is not None:
+        index_perceptual_hash(media_item, value)
+    return value
+
+
+def find_duplicate(media_item, value: Optional[int]) -> Optional[MediaItem]:
+    """
+    Returns a processed item of the same user with the same file (by
+    original_sha256) or, failing that, the nearest one whose perceptual
+    hash is within DUPLICATE_MAX_DISTANCE bits of `value`.
+    """
+    candidates = MediaItem.objects.filter(
+        user_id=media_item.user_id,
+        status=MediaItem.Status.COMPLETED,
+        duplicate_of__isnull=True,
+    ).exclude(id=media_item.id)
+
+    if media_item.original_sha256:
+        exact = candidates.filter(
+            original_sha256=media_item.original_sha256
+        ).first()
+        if exact:
+            return exact
+
+    if value is None or media_item.media_type not in FINGERPRINT_GROUPS:
+        return None
+
+    band_match = Q()
+    for band, band_value in enumerate(split_bands(value)):
+        band_match |= Q(
+            fingerprint_bands__band=band, fingerprint_bands__value=band_value
+        )
+    matches = (
+        candidates.filter(
+            band_match,
+            media_type__in=FINGERPRINT_GROUPS[media_item.media_type],
+        )
+        .exclude(perceptual_hash='')
+        .distinct()
+        .only('id', 'title', 'perceptual_hash')
+    )
+
+    best, best_distance = None, settings.DUPLICATE_MAX_DISTANCE + 1
+    for candidate in matches:
+        distance = hamming(value, int(candidate.perceptual_hash, 16))
+        if distance < best_distance:
+            best, best_distance = candidate, distance
+
+    if best:
+        logger.info(
+            f'{media_item.id} is {best_distance} bits from {best.id}, '
+            'flagging as near-duplicate'
+        )
+    return best
+
+
+def reuse_results(media_item):
+    """
+    Copies the transcription and summary of the item `media_item`
+    duplicates and clears the duplicate flag. For an identical file the
+    analysis stage hash is copied too, so that reanalysis keeps skipping
+    the transcription.
+    """
+    source = media_item.duplicate_of
+    media_item.duplicate_of = None
+    media_item.transcription = source.transcription
+    media_item.summary = source.summary
+    media_item.summary_fingerprint = source.summary_fingerprint
+    if (
+        media_item.original_sha256
+        and media_item.original_sha256 == source.original_sha256
+        and ANALYZE in source.stage_hashes
+    ):
+        media_item.stage_hashes[ANALYZE] = source.stage_hashes[ANALYZE]
+    media_item.save(
+        update_fields=[
+            'duplicate_of',
+            'transcription',
+            'summary',
+            'summary_fingerprint',
+            'stage_hashes',
+        ]
+    )
@@ -0,0 +1,406 @@
+import json
+import logging
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Callable, Optional
+
+import redis
+from celery import current_app
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+RING_KEY = 'fair:ring'
+QUEUE_KEY = 'fair:queue:{}'
+DEFICIT_KEY = 'fair:deficit'
+RUNNING_KEY = 'fair:running'
+JOBS_KEY = 'fair:jobs'
+POSITIONS_KEY = 'fair:positions'
+AVG_SECONDS_KEY = 'fair:avg-seconds'
+LOCK_KEY = 'fair:lock'
+
+_client = None
+
+
+def get_redis():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.FAIR_SCHEDULER_REDIS_URL, decode_responses=True
+        )
+    return _client
+
+
+def broker_queue_depth(queue: str) -> int:
+    """
+    Number of messages waiting in a Celery queue, read from the broker
+    itself (FAIR_SCHEDULER_REDIS_URL may point to another Redis).
+    """
+    with current_app.connection_for_read() as connection:
+        connection.ensure_connection(max_retries=1)
+        return connection.default_channel.client.llen(queue)
+
+
+def job_cost(file_size: int) -> float:
+    """
+    Cost of an ingest job in scheduler units, proportional to file size,
+    so that a user with many large files gets the same share of worker
+    time as a user with small ones.
+    """
+    unit = settings.FAIR_SCHEDULER_COST_UNIT_MB * 1024 * 1024
+    return max(1.0, file_size / unit)
+
+
+@dataclass
+class DRRState:
+    ring: list
+    queues: dict
+    deficits: dict = field(default_factory=dict)
+    running: dict = field(default_factory=dict)
+
+
+def drr_schedule(
+    state: DRRState,
+    quantum: float,
+    free_slots: float = math.inf,
+    caps: Optional[dict] = None,
+):
+    """
+    Deficit round-robin over per-user queues. Returns the jobs to start,
+    in order, and the resulting state. Users at their concurrency cap are
+    passed over without earning deficit. Without `free_slots` and `caps`
+    it returns the full start order of all queued jobs.
+    """
+    ring = deque(state.ring)
+    queues = {user: deque(jobs) for user, jobs in state.queues.items()}
+    deficits = dict(state.deficits)
+    running = dict(state.running)
+    caps = caps or {}
+    started = []
+
+    while ring and free_slots > 0:
+        progressed = False
+
+        for _ in range(len(ring)):
+            if free_slots <= 0:
+                break
+
+            user = ring.popleft()
+            queue = queues.get(user)
+            if not queue:
+                deficits.pop(user, None)
+                continue
+
+            cap = caps.get(user, math.inf)
+            if running.get(user, 0) >= cap:
+                ring.append(user)
+                continue
+
+            deficit = deficits.get(user, 0.0) + quantum
+            while (
+                queue
+                and queue[0]['cost'] <= deficit
+                and running.get(user, 0) < cap
+                and free_slots > 0
+            ):
+                job = queue.popleft()
+                deficit -= job['cost']
+                running[user] = running.get(user, 0) + 1
+                free_slots -= 1
+                started.append(job)
+
+            progressed = True
+            if queue:
+                deficits[user] = deficit
+                ring.append(user)
+            else:
+                deficits.pop(user, None)
+
+        if not progressed:
+            # Every user with queued work is at its cap
+            break
+
+    new_state = DRRState(
+        ring=list(ring),
+        queues={user: list(jobs) for user, jobs in queues.items() if jobs},
+        deficits=deficits,
+        running=running,
+    )
+    return started, new_state
+
+
+class FairScheduler:
+    """
+    Per-user virtual queues for ingest jobs, kept in the Redis broker.
+    Jobs are released into Celery by deficit round-robin across users,
+    only while fewer than FAIR_SCHEDULER_MAX_IN_FLIGHT jobs are running and
+    within each user's concurrency cap, so the Celery queue never holds a
+    long backlog of a single user.
+    """
+
+    def __init__(self, client=None):
+        self.redis = client or get_redis()
+
+    def _lock(self):
+        return self.redis.lock(LOCK_KEY, timeout=60, blocking_timeout=10)
+
+    def enqueue(self, user_id: int, media_item_id: int, run_id: int, cost):
+        self.enqueue_many([(user_id, media_item_id, run_id, cost)])
+
+    def enqueue_many(self, jobs):
+        """
+        Queues (user_id, media_item_id, run_id, cost) tuples in one round
+        trip per batch.
+        """
+        queued_at = time.time()
+        with self._lock():
+            ring = set(self.redis.lrange(RING_KEY, 0, -1))
+            pipe = self.redis.pipeline()
+            for user_id, media_item_id, run_id, cost in jobs:
+                job = {
+                    'user_id': user_id,
+                    'media_item_id': media_item_id,
+                    'run_id': run_id,
+                    'cost': cost,
+                    'queued_at': queued_at,
+                }
+                pipe.rpush(QUEUE_KEY.format(user_id), json.dumps(job))
+                if str(user_id) not in ring:
+                    ring.add(str(user_id))
+                    pipe.rpush(RING_KEY, user_id)
+            pipe.execute()
+            self._update_positions(self._load_state())
+
+    def _load_state(self) -> DRRState:
+        ring = self.redis.lrange(RING_KEY, 0, -1)
+        pipe = self.redis.pipeline()
+        for user in ring:
+            pipe.lrange(QUEUE_KEY.format(user), 0, -1)
+        queues = {
+            user: [json.loads(job) for job in jobs]
+            for user, jobs in zip(ring, pipe.execute())
+        }
+        return DRRState(
+            ring=ring,
+            queues=queues,
+            deficits={
+                user: float(value)
+                for user, value in self.redis.hgetall(DEFICIT_KEY).items()
+            },
+            running={
+                user: int(value)
+                for user, value in self.redis.hgetall(RUNNING_KEY).items()
+            },
+        )
+
+    def _user_caps(self, users) -> dict:
+        caps = dict(
+            get_user_model()
+            .objects.filter(id__in=users, ingest_concurrency__isnull=False)
+            .values_list('id', 'ingest_concurrency')
+        )
+        return {
+            user: caps.get(int(user), settings.FAIR_SCHEDULER_USER_CONCURRENCY)
+            for user in users
+        }
+
+    def _update_positions(self, state: DRRState):
+        order, _ = drr_schedule(state, settings.FAIR_SCHEDULER_QUANTUM)
+        pipe = self.redis.pipeline()
+        pipe.delete(POSITIONS_KEY)
+        if order:
+            pipe.hset(
+                POSITIONS_KEY,
+                mapping={
+                    job['media_item_id']: position
+                    for position, job in enumerate(order, start=1)
+                },
+            )
+        pipe.execute()
+
+    def dispatch(self, start_job: Callable[[dict], None]) -> int:
+        """
+        Starts as many queued jobs as free slots and caps allow, calling
+        `start_job` for each. Returns the number of started jobs.
+        """
+        with self._lock():
+            self._expire_stale_jobs()
+
+            state = self._load_state()
+            free_slots = settings.FAIR_SCHEDULER_MAX_IN_FLIGHT - sum(
+                state.running.values()
+            )
+            if not state.ring or free_slots <= 0:
+                return 0
+
+            started, new_state = drr_schedule(
+                state,
+                settings.FAIR_SCHEDULER_QUANTUM,
+                free_slots,
+                self._user_caps(state.ring),
+            )
+
+            pipe = self.redis.pipeline()
+            for job in started:
+                user = str(job['user_id'])
+                pipe.lpop(QUEUE_KEY.format(user))
+                pipe.hincrby(RUNNING_KEY, user, 1)
+                pipe.hset(
+                    JOBS_KEY,
+                    job['media_item_id'],
+                    json.dumps({'user_id': user, 'started_at': time.time()}),
+                )
+            pipe.delete(RING_KEY, DEFICIT_KEY)
+            if new_state.ring:
+                pipe.rpush(RING_KEY, *new_state.ring)
+            if new_state.deficits:
+                pipe.hset(DEFICIT_KEY, mapping=new_state.deficits)
+            pipe.execute()
+
+            self._update_positions(new_state)
+
+        for job in started:
+            try:
+                start_job(job)
+            except Exception as e:
+                logger.error(
+                    f'Failed to start ingest job {job["media_item_id"]}: {e}'
+                )
+                self.release(job['media_item_id'])
+
+        if started:
+            logger.info(f'Fair scheduler started {len(started)} ingest jobs')
+        return len(started)
+
+    def release(self, media_item_id: int) -> bool:
+        """
+        Frees the slot of a finished job. Returns False if the job was not
+        started by the scheduler (or was already released).
+        """
+        raw = self.redis.hget(JOBS_KEY, media_item_id)
+        if raw is None or not self.redis.hdel(JOBS_KEY, media_item_id):
+            return False
+
+        job = json.loads(raw)
+        if self.redis.hincrby(RUNNING_KEY, job['user_id'], -1) <= 0:
+            self.redis.hdel(RUNNING_KEY, job['user_id'])
+
+        seconds = time.time() - job['started_at']
+        self.redis.set(
+            AVG_SECONDS_KEY, 0.8 * self._average_seconds() + 0.2 * seconds
+        )
+        return True
+
+    def remove(self, media_item_ids) -> int:
+        """
+        Drops queued jobs of cancelled or deleted MediaItems. Returns the
+        number of removed jobs; started jobs are freed by `release`.
+        """
+        media_item_ids = {int(media_item_id) for media_item_id in media_item_ids}
+        removed = 0
+        with self._lock():
+            pipe = self.redis.pipeline()
+            for user in self.redis.lrange(RING_KEY, 0, -1):
+                key = QUEUE_KEY.format(user)
+                for raw in self.redis.lrange(key, 0, -1):
+                    if json.loads(raw)['media_item_id'] in media_item_ids:
+                        pipe.lrem(key, 1, raw)
+                        removed += 1
+            pipe.execute()
+            if removed:
+                self._update_positions(self._load_state())
+        return removed
+
+    def _expire_stale_jobs(self):
+        """
+        Releases slots of jobs whose worker died without reporting back.
+        """
+        deadline = (
+            time.time()
+            - settings.CELERY_BROKER_TRANSPORT_OPTIONS['visibility_timeout']
+        )
+        for media_item_id, raw in self.redis.hgetall(JOBS_KEY).items():
+            if json.loads(raw)['started_at'] < deadline:
+                logger.warning(f'Releasing stale ingest job {media_item_id}')
+                self.release(media_item_id)
+
+    def _average_seconds(self) -> float:
+        return float(
+            self.redis.get(AVG_SECONDS_KEY)
+            or settings.FAIR_SCHEDULER_DEFAULT_JOB_SECONDS
+        )
+
+    def backlog(self) -> int:
+        """
+        Number of ingest jobs waiting or running: jobs in the virtual
+        queues plus those already handed to Celery. The ingest queue depth
+        in the broker also covers jobs dispatched without the scheduler.
+        """
+        pipe = self.redis.pipeline()
+        for user in self.redis.lrange(RING_KEY, 0, -1):
+            pipe.llen(QUEUE_KEY.format(user))
+        queued = sum(pipe.execute())
+        running = sum(int(value) for value in self.redis.hvals(RUNNING_KEY))
+        broker_depth = broker_queue_depth(
+            settings.CELERY_TASK_ROUTES['apps.library.tasks.analyze_media'][
+                'queue'
+            ]
+        )
+        return queued + max(running, broker_depth)
+
+    def estimate_completion(self, new_jobs: int = 0):
+        """
+        Estimated time when the current backlog and `new_jobs` more jobs
+        will have been processed.
+        """
+        max_in_flight = settings.FAIR_SCHEDULER_MAX_IN_FLIGHT
+        waves = math.ceil((self.backlog() + new_jobs) / max_in_flight)
+        return timezone.now() + timedelta(
+            seconds=waves * self._average_seconds()
+        )
+
+    def queue_info(self, media_item_id: int):
+        """
+        Returns (position, estimated start time) of a queued job, or None
+        if it is not waiting in the scheduler.
+        """
+        return self.queue_infos([media_item_id]).get(media_item_id)
+
+    def queue_infos(self, media_item_ids) -> dict:
+        """
+        Maps each of `media_item_ids` waiting in the scheduler to its
+        (position, estimated start time), with one Redis round trip for
+        any number of items. The estimate assumes jobs take as long as the
+        moving average of recent ones.
+        """
+        media_item_ids = list(media_item_ids)
+        if not media_item_ids:
+            return {}
+
+        pipe = self.redis.pipeline()
+        pipe.hmget(POSITIONS_KEY, media_item_ids)
+        pipe.hvals(RUNNING_KEY)
+        pipe.get(AVG_SECONDS_KEY)
+        positions, running, average_seconds = pipe.execute()
+
+        max_in_flight = settings.FAIR_SCHEDULER_MAX_IN_FLIGHT
+        running = sum(int(value) for value in running)
+        average_seconds = float(
+            average_seconds or settings.FAIR_SCHEDULER_DEFAULT_JOB_SECONDS
+        )
+        now = timezone.now()
+
+        infos = {}
+        for media_item_id, position in zip(media_item_ids, positions):
+            if position is None:
+                continue
+            position = int(position)
+            waves = max(0, running + position - max_in_flight)
+            wait = math.ceil(waves / max_in_flight) * average_seconds
+            infos[media_item_id] = (position, now + timedelta(seconds=wait))
+        return infos
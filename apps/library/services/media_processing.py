@@ -8,14 +8,12 @@ from PIL import Image
 logger = logging.getLogger(__name__)
 
 
-def cut_audio_from_video(video_path: Path) -> Path:
+def cut_audio_from_video(video_path: Path, wav_path: Path) -> Path:
     """
     Extracts audio from video using ffmpeg and converts to wav using faad (if needed) or just ffmpeg.
     The user requested specific ffmpeg + faad pipeline.
     """
-    audio_dir = video_path.parent
-    m4a_path = audio_dir / video_path.with_suffix('.m4a').name
-    wav_path = audio_dir / video_path.with_suffix('.wav').name
+    m4a_path = wav_path.with_suffix('.m4a')
 
     logger.info(f'Extracting audio from {video_path} to {m4a_path}')
 
@@ -58,6 +56,17 @@ def cut_audio_from_video(video_path: Path) -> Path:
     return wav_path
 
 
+def downscale_image(image_path: Path, output_path: Path, max_side: int):
+    """
+    Writes a grayscale PNG copy of an image whose longer side is at most
+    `max_side` pixels, which is all OCR needs from large photos.
+    """
+    with Image.open(image_path) as image:
+        image = image.convert('L')
+        image.thumbnail((max_side, max_side))
+        image.save(output_path, format='PNG')
+
+
 def perform_ocr(image_path: Path) -> str:
     """
     Extracts text from image using pytesseract.
@@ -70,3 +79,67 @@ def perform_ocr(image_path: Path) -> str:
     except Exception as e:
         logger.error(f'OCR failed: {e}')
         raise e
+
+
+def transcode_audio(source_path: Path, output_path: Path, bitrate: str):
+    """
+    Transcodes audio to mono Opus tuned for speech.
+    """
+    subprocess.run(
+        [
+            'ffmpeg',
+            '-y',
+            '-i',
+            str(source_path),
+            '-vn',
+            '-ac',
+            '1',
+            '-c:a',
+            'libopus',
+            '-b:a',
+            bitrate,
+            '-application',
+            'voip',
+            str(output_path),
+        ],
+        check=True,
+        capture_output=True,
+    )
+
+
+def transcode_video(
+    source_path: Path,
+    output_path: Path,
+    max_height: int,
+    crf: int,
+    audio_bitrate: str,
+):
+    """
+    Transcodes video to a lower-bitrate H.264 rendition of at most
+    `max_height` lines, with Opus audio.
+    """
+    subprocess.run(
+        [
+            'ffmpeg',
+            '-y',
+            '-i',
+            str(source_path),
+            '-vf',
+            f"scale=-2:'min({max_height},ih)'",
+            '-c:v',
+            'libx264',
+            '-preset',
+            'veryfast',
+            '-crf',
+            str(crf),
+            '-c:a',
+            'libopus',
+            '-b:a',
+            audio_bitrate,
+            '-movflags',
+            '+faststart',
+            str(output_path),
+        ],
+        check=True,
+        capture_output=True,
+    )
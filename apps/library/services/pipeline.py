@@ -0,0 +1,249 @@
+import logging
+import traceback
+from contextlib import contextmanager
+from typing import Optional
+
+from celery.exceptions import Ignore
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.library.models import MediaItem, PipelineRun, StageRun
+
+logger = logging.getLogger(__name__)
+
+STAGE_ORDER = [
+    StageRun.Stage.ANALYZE,
+    StageRun.Stage.SUMMARIZE,
+    StageRun.Stage.CONTENT,
+    StageRun.Stage.INDEX,
+]
+
+
+class PipelineCancelled(Ignore):
+    """
+    Stops a stage of a cancelled pipeline run. As a Celery Ignore it ends
+    the task without marking it failed, and the rest of the chain is not
+    run.
+    """
+
+
+def pipeline_task_id(run_id: int, step: str) -> str:
+    """
+    Celery task id of a step of a pipeline run, known before dispatch so
+    that the queued tasks of a run can be revoked.
+    """
+    return f'pipeline-{run_id}-{step}'
+
+
+def check_cancelled(run_id: Optional[int]) -> None:
+    """
+    Raises PipelineCancelled if the run was cancelled or deleted with its
+    MediaItem. Long stages call it between units of work.
+    """
+    if run_id is None:
+        return
+    if (
+        not PipelineRun.objects.filter(id=run_id)
+        .exclude(status=PipelineRun.Status.CANCELLED)
+        .exists()
+    ):
+        raise PipelineCancelled(f'Pipeline run {run_id} was cancelled')
+
+
+def cancel_pipeline_runs(run_ids) -> list[int]:
+    """
+    Marks unfinished runs, their pending stages and their MediaItems as
+    cancelled. Returns the ids of the affected MediaItems.
+    """
+    runs = dict(
+        PipelineRun.objects.filter(
+            id__in=run_ids, finished_at__isnull=True
+        ).values_list('id', 'media_item_id')
+    )
+    media_item_ids = list(runs.values())
+    now = timezone.now()
+    with transaction.atomic():
+        PipelineRun.objects.filter(id__in=runs).update(
+            status=PipelineRun.Status.CANCELLED,
+            current_step='',
+            finished_at=now,
+        )
+        StageRun.objects.filter(
+            run_id__in=runs,
+            status__in=[StageRun.Status.QUEUED, StageRun.Status.RUNNING],
+        ).update(status=StageRun.Status.CANCELLED, finished_at=now)
+        MediaItem.objects.filter(id__in=media_item_ids).update(
+            status=MediaItem.Status.CANCELLED
+        )
+    return media_item_ids
+
+
+def set_status(media_item_id: int, status: str, **fields) -> None:
+    """
+    Updates the status of a MediaItem (and `fields`) with a targeted UPDATE
+    that leaves its large text columns untouched.
+    """
+    MediaItem.objects.filter(id=media_item_id).update(status=status, **fields)
+
+
+async def aset_status(media_item_id: int, status: str, **fields) -> None:
+    await MediaItem.objects.filter(id=media_item_id).aupdate(
+        status=status, **fields
+    )
+
+
+def set_progress(media_item_id: int, step: str) -> None:
+    """
+    Publishes the current step of the unfinished pipeline runs of a
+    MediaItem.
+    """
+    PipelineRun.objects.filter(
+        media_item_id=media_item_id, finished_at__isnull=True
+    ).update(current_step=step)
+
+
+async def aset_progress(media_item_id: int, step: str) -> None:
+    await PipelineRun.objects.filter(
+        media_item_id=media_item_id, finished_at__isnull=True
+    ).aupdate(current_step=step)
+
+
+def create_pipeline_runs(
+    media_items, first_stage: str = StageRun.Stage.ANALYZE
+) -> list[PipelineRun]:
+    """
+    Creates queued PipelineRuns (in the order of `media_items`) with a
+    StageRun for `first_stage` and every stage after it, and marks the
+    MediaItems as pending. Uses one statement per table for any number of
+    items.
+    """
+    stages = STAGE_ORDER[STAGE_ORDER.index(first_stage) :]
+
+    with transaction.atomic():
+        runs = PipelineRun.objects.bulk_create(
+            [PipelineRun(media_item=item) for item in media_items]
+        )
+        StageRun.objects.bulk_create(
+            [StageRun(run=run, stage=stage) for run in runs for stage in stages]
+        )
+        MediaItem.objects.filter(
+            id__in=[item.id for item in media_items]
+        ).update(status=MediaItem.Status.PENDING, error_log='')
+
+    return runs
+
+
+def create_pipeline_run(
+    media_item, first_stage: str = StageRun.Stage.ANALYZE
+) -> PipelineRun:
+    return create_pipeline_runs([media_item], first_stage)[0]
+
+
+def fail_pipeline_run(run_id: int, error: str) -> None:
+    """
+    Marks a run and its MediaItem as failed. Uses filtered updates, so a
+    run deleted together with its MediaItem does not mask `error`.
+    """
+    media_item_ids = list(
+        PipelineRun.objects.filter(id=run_id).values_list(
+            'media_item_id', flat=True
+        )
+    )
+    PipelineRun.objects.filter(id=run_id).update(
+        status=PipelineRun.Status.FAILED,
+        current_step='',
+        error=error,
+        finished_at=timezone.now(),
+    )
+    MediaItem.objects.filter(id__in=media_item_ids).update(
+        status=MediaItem.Status.FAILED, error_log=error
+    )
+
+
+@contextmanager
+def track_stage(
+    run_id: Optional[int], stage: str, task_id: Optional[str] = None
+):
+    """
+    Records start, end, attempts and errors of a pipeline stage.
+    Yields the StageRun; a stage that found nothing to do sets its status
+    to SKIPPED. Without a run the yielded StageRun is not persisted. The
+    stage is not started if its run has been cancelled.
+    """
+    if run_id is None:
+        yield StageRun(stage=stage)
+        return
+
+    check_cancelled(run_id)
+
+    now = timezone.now()
+    StageRun.objects.filter(run_id=run_id, stage=stage).update(
+        status=StageRun.Status.RUNNING,
+        started_at=now,
+        task_id=task_id or '',
+        attempts=F('attempts') + 1,
+    )
+    PipelineRun.objects.filter(id=run_id, started_at__isnull=True).update(
+        status=PipelineRun.Status.RUNNING, started_at=now
+    )
+    stage_run = StageRun.objects.filter(run_id=run_id, stage=stage).first()
+    if stage_run is None:
+        # The MediaItem and its runs were deleted meanwhile
+        yield StageRun(stage=stage)
+        return
+
+    try:
+        yield stage_run
+    except PipelineCancelled:
+        StageRun.objects.filter(id=stage_run.id).update(
+            status=StageRun.Status.CANCELLED, finished_at=timezone.now()
+        )
+        logger.info(f'Stage {stage} of pipeline run {run_id} cancelled')
+        raise
+    except Exception:
+        error = traceback.format_exc()
+        StageRun.objects.filter(id=stage_run.id).update(
+            status=StageRun.Status.FAILED,
+            error=error,
+            finished_at=timezone.now(),
+        )
+        fail_pipeline_run(run_id, error)
+        raise
+
+    if stage_run.status != StageRun.Status.SKIPPED:
+        stage_run.status = StageRun.Status.COMPLETED
+    stage_run.finished_at = timezone.now()
+    StageRun.objects.filter(id=stage_run.id).update(
+        status=stage_run.status, finished_at=stage_run.finished_at
+    )
+
+    logger.info(
+        f'Stage {stage} of pipeline run {run_id} {stage_run.status} '
+        f'in {stage_run.duration}'
+    )
+
+
+def finish_pipeline_run(run_id: int) -> Optional[PipelineRun]:
+    """
+    Marks a run and its MediaItem as completed once all stages finished.
+    Returns None if the run was deleted together with its MediaItem.
+    """
+    run = PipelineRun.objects.filter(id=run_id).first()
+    if run is None:
+        logger.info(f'Pipeline run {run_id} was deleted with its media item')
+        return None
+    if run.status == PipelineRun.Status.CANCELLED:
+        return run
+
+    run.status = PipelineRun.Status.COMPLETED
+    run.current_step = ''
+    run.finished_at = timezone.now()
+    run.save(update_fields=['status', 'current_step', 'finished_at'])
+
+    set_status(run.media_item_id, MediaItem.Status.COMPLETED)
+    logger.info(
+        f'Pipeline run {run_id} completed in '
+        f'{run.finished_at - (run.started_at or run.queued_at)}'
+    )
+    return run
@@ -17,6 +17,8 @@ class RAGService:
     """
 
     _instance = None
+    chunk_size = 1000
+    chunk_overlap = 200
 
     def __new__(cls):
         if cls._instance is None:
@@ -31,8 +33,8 @@ class RAGService:
                 collection_name='media_items',
             )
             cls._instance.text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200,
+                chunk_size=cls.chunk_size,
+                chunk_overlap=cls.chunk_overlap,
                 length_function=len,
             )
         return cls._instance
@@ -79,7 +81,15 @@ class RAGService:
                 [full_text], metadatas=[metadatas]
             )
 
-            self.vector_store.add_documents(chunks)
+            # Replace chunks of a previous indexing run instead of appending
+            self.remove_media_item(media_item.id)
+            self.vector_store.add_documents(
+                chunks,
+                ids=[
+                    f'media_item-{media_item.id}-{i}'
+                    for i in range(len(chunks))
+                ],
+            )
             logger.info(
                 f'Indexed MediaItem {media_item.id}: {len(chunks)} chunks.'
             )
@@ -88,6 +98,21 @@ class RAGService:
             logger.error(f'Error indexing MediaItem {media_item.id}: {e}')
             raise e
 
+    def remove_media_item(self, media_item_id: int):
+        """
+        Removes all chunks of a MediaItem from the vector store.
+        """
+        self.vector_store.delete(where={'media_item_id': media_item_id})
+
+    def has_media_item(self, media_item_id: int) -> bool:
+        """
+        Whether the vector store holds any chunk of a MediaItem.
+        """
+        result = self.vector_store.get(
+            where={'media_item_id': media_item_id}, limit=1, include=[]
+        )
+        return bool(result['ids'])
+
     def search(self, query: str, k: int = 3) -> List[Document]:
         """
         Searches for relevant documents.
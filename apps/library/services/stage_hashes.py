@@ -0,0 +1,62 @@
+import hashlib
+
+from django.conf import settings
+
+from apps.core.models import ProjectSettings
+from apps.learning.services.regeneration import fingerprint
+from apps.library.services.rag_service import RAGService
+from apps.library.services.storage import local_path
+
+ANALYZE = 'analyze'
+INDEX = 'index'
+
+
+def file_sha256(path, block_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def analyze_hash(
+    media_item, project_settings: ProjectSettings, file_hash: str = ''
+) -> str:
+    """
+    Hash of the uploaded file and of the config the transcription depends on.
+    Pass `file_hash` if the file's sha256 is already known.
+    """
+    config = [media_item.media_type]
+    if media_item.media_type in (
+        media_item.MediaType.AUDIO,
+        media_item.MediaType.VIDEO,
+    ):
+        config.append(project_settings.transcription_engine)
+        if (
+            project_settings.transcription_engine
+            == ProjectSettings.TranscriptionEngine.WHISPERX
+        ):
+            config.append(settings.WHISPER_MODEL)
+
+    # An archived item keeps the identity of its original upload
+    file_hash = file_hash or media_item.original_sha256
+    return fingerprint(
+        ANALYZE, file_hash or file_sha256(local_path(media_item.file)), *config
+    )
+
+
+def index_hash(media_item) -> str:
+    """
+    Hash of the indexed text and of the chunking config.
+    """
+    return fingerprint(
+        INDEX,
+        media_item.summary,
+        media_item.transcription,
+        RAGService.chunk_size,
+        RAGService.chunk_overlap,
+    )
+
+
+def is_unchanged(media_item, stage: str, input_hash: str) -> bool:
+    return media_item.stage_hashes.get(stage) == input_hash
@@ -0,0 +1,38 @@
+import shutil
+from pathlib import Path
+
+from django.core.files.storage import FileSystemStorage
+
+from apps.library.services.artifact_cache import ArtifactCache
+
+
+def is_local_storage(storage) -> bool:
+    """
+    Whether files of `storage` are on this node's disk (FileSystemStorage)
+    rather than in a remote object store.
+    """
+    return isinstance(storage, FileSystemStorage)
+
+
+def local_path(field_file) -> Path:
+    """
+    Path of a stored file on this node's disk. Files in remote storage
+    are streamed into the artifact cache, so a worker on any node can
+    process them and repeated runs do not download them again.
+    """
+    storage = field_file.storage
+    if is_local_storage(storage):
+        return Path(field_file.path)
+
+    def download(output: Path):
+        with storage.open(field_file.name, 'rb') as src, open(output, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 8 * 1024 * 1024)
+
+    return ArtifactCache().get_or_create(
+        field_file.name,
+        'source',
+        Path(field_file.name).suffix,
+        download,
+        share=False,
+        size=field_file.size,
+    )
@@ -0,0 +1,39 @@
+import codecs
+from typing import Iterator
+
+import zstandard
+from django.conf import settings
+
+
+def compress_text(text: str) -> bytes:
+    return zstandard.ZstdCompressor(
+        level=settings.TEXT_COMPRESSION_LEVEL
+    ).compress(text.encode('utf-8'))
+
+
+def decompress_text(data: bytes) -> str:
+    if not data:
+        return ''
+    return zstandard.ZstdDecompressor().decompressobj().decompress(
+        bytes(data)
+    ).decode('utf-8')
+
+
+def iter_text(data: bytes, chunk_size: int = 64 * 1024) -> Iterator[str]:
+    """
+    Decompresses `data` incrementally, yielding text chunks of about
+    `chunk_size` bytes without materializing the whole text.
+    """
+    if not data:
+        return
+
+    reader = zstandard.ZstdDecompressor().stream_reader(bytes(data))
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    while block := reader.read(chunk_size):
+        text = decoder.decode(block)
+        if text:
+            yield text
+
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
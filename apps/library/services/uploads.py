@@ -0,0 +1,162 @@
+import hashlib
+import logging
+import shutil
+from pathlib import Path
+from typing import Optional
+
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from apps.library.models import MediaItem, UploadSession
+from apps.library.services.storage import is_local_storage
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPES_BY_EXTENSION = {
+    'mp4': MediaItem.MediaType.VIDEO,
+    'mov': MediaItem.MediaType.VIDEO,
+    'avi': MediaItem.MediaType.VIDEO,
+    'mkv': MediaItem.MediaType.VIDEO,
+    'mp3': MediaItem.MediaType.AUDIO,
+    'wav': MediaItem.MediaType.AUDIO,
+    'flac': MediaItem.MediaType.AUDIO,
+    'm4a': MediaItem.MediaType.AUDIO,
+    'ogg': MediaItem.MediaType.AUDIO,
+    'jpg': MediaItem.MediaType.IMAGE,
+    'jpeg': MediaItem.MediaType.IMAGE,
+    'png': MediaItem.MediaType.IMAGE,
+    'webp': MediaItem.MediaType.IMAGE,
+    'txt': MediaItem.MediaType.TEXT,
+    'md': MediaItem.MediaType.TEXT,
+}
+
+
+def file_extension(filename: str) -> str:
+    return filename.lower().split('.')[-1]
+
+
+def media_type_for(filename: str) -> Optional[str]:
+    return MEDIA_TYPES_BY_EXTENSION.get(file_extension(filename))
+
+
+def write_chunk(
+    session: UploadSession, offset: int, stream, length: int
+) -> str:
+    """
+    Writes `length` bytes from `stream` at `offset` of the partial file,
+    reading in blocks so that large chunks are never held in memory.
+    Returns the sha256 of the written bytes. The session offset is not
+    advanced; see `commit_chunk`.
+    """
+    path = session.partial_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    digest = hashlib.sha256()
+    remaining = length
+    with open(path, 'r+b' if path.exists() else 'wb') as f:
+        f.seek(offset)
+        while remaining:
+            block = stream.read(min(remaining, 1024 * 1024))
+            if not block:
+                break
+            f.write(block)
+            digest.update(block)
+            remaining -= len(block)
+
+    if remaining:
+        raise ValueError('Chunk is shorter than its Content-Length')
+    return digest.hexdigest()
+
+
+def commit_chunk(session: UploadSession, offset: int, length: int) -> bool:
+    """
+    Advances the session past a verified chunk. Returns False if another
+    request already moved the offset.
+    """
+    updated = UploadSession.objects.filter(
+        id=session.id, offset=offset, status=UploadSession.Status.ACTIVE
+    ).update(offset=offset + length, updated_at=timezone.now())
+    if updated:
+        session.offset = offset + length
+    return bool(updated)
+
+
+def complete_upload(session: UploadSession) -> Optional[MediaItem]:
+    """
+    Moves the finished file into the media storage and creates its
+    MediaItem. On local storage the file is moved rather than copied.
+    Returns None if another request already completed the session. If
+    storing fails, the partial file is kept and the session stays active,
+    so the client can complete it again.
+    """
+    claimed = UploadSession.objects.filter(
+        id=session.id, status=UploadSession.Status.ACTIVE
+    ).update(status=UploadSession.Status.COMPLETED, updated_at=timezone.now())
+    if not claimed:
+        return None
+
+    try:
+        media_item = _store_upload(session)
+    except Exception:
+        UploadSession.objects.filter(id=session.id).update(
+            status=UploadSession.Status.ACTIVE
+        )
+        raise
+
+    logger.info(
+        f'Upload {session.id} completed as {media_item.id} '
+        f'({session.size} bytes)'
+    )
+    return media_item
+
+
+def _store_upload(session: UploadSession) -> MediaItem:
+    path = session.partial_path
+    with open(path, 'r+b') as f:
+        f.truncate(session.size)
+
+    media_item = MediaItem(
+        user_id=session.user_id,
+        title=session.filename,
+        media_type=media_type_for(session.filename),
+        topic_id=session.topic_id,
+    )
+    file_field = MediaItem._meta.get_field('file')
+    storage = file_field.storage
+    name = file_field.generate_filename(media_item, session.filename)
+    local = is_local_storage(storage)
+    if local:
+        name = storage.get_available_name(name)
+        target = Path(storage.path(name))
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # UPLOAD_SESSION_DIR may be on another filesystem than MEDIA_ROOT
+        shutil.move(path, target)
+    else:
+        with open(path, 'rb') as f:
+            name = storage.save(name, File(f))
+    media_item.file.name = name
+
+    try:
+        with transaction.atomic():
+            media_item.save()
+            if session.tags:
+                media_item.tags.set(session.tags)
+            session.media_item = media_item
+            session.status = UploadSession.Status.COMPLETED
+            session.save(update_fields=['media_item', 'status', 'updated_at'])
+    except Exception:
+        if local:
+            shutil.move(target, path)
+        else:
+            storage.delete(name)
+        raise
+
+    if not local:
+        path.unlink()
+    return media_item
+
+
+def discard_upload(session: UploadSession):
+    session.partial_path.unlink(missing_ok=True)
+    session.delete()
@@ -0,0 +1,32 @@
+from django.db import transaction
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from .models import MediaItem
+
+
+@receiver(pre_delete, sender=MediaItem)
+def recheck_orphaned_duplicates(sender, instance, **kwargs):
+    """
+    Uploads flagged as duplicates of a deleted item lose the flag and were
+    never processed. Once the deletion commits, they are checked again so
+    that they are processed or flagged against another original.
+    """
+    duplicate_ids = list(instance.duplicates.values_list('id', flat=True))
+    if not duplicate_ids:
+        return
+
+    def recheck():
+        # Imported here: the tasks module loads the ML stack
+        from .tasks import check_duplicates
+
+        orphaned_ids = MediaItem.objects.filter(
+            id__in=duplicate_ids,
+            status=MediaItem.Status.PENDING,
+            duplicate_of__isnull=True,
+            pipeline_runs__isnull=True,
+        ).values_list('id', flat=True)
+        for media_item_id in orphaned_ids:
+            check_duplicates.delay(media_item_id)
+
+    transaction.on_commit(recheck)
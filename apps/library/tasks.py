@@ -1,206 +1,828 @@
 import gc
 import logging
+import tempfile
 import traceback
+from datetime import timedelta
 from pathlib import Path
+from typing import Optional
 
+import redis
 import torch
 import whisperx
-from celery import shared_task
+from asgiref.sync import async_to_sync, sync_to_async
+from celery import chain, chord, current_app, group, shared_task
 from django.conf import settings
-from django.utils import translation
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_deepseek import ChatDeepSeek
-from langchain_openai import ChatOpenAI
+from django.core.cache import cache
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
 from openai import OpenAI
 
 from apps.core.models import ProjectSettings
-from apps.learning.tasks import generate_content_from_media
+from apps.learning.services.ai_service import AIService
+from apps.learning.services.regeneration import (
+    CONCEPTS,
+    PLAN,
+    QUIZZES,
+    SUMMARY,
+    stale_stages,
+    summary_fingerprint,
+)
+from apps.learning.tasks import (
+    generate_content_from_media,
+    regenerate_quizzes,
+    regenerate_study_plan,
+)
+from apps.library.services.artifact_cache import ArtifactCache
+from apps.library.services.duplicates import find_duplicate, fingerprint_media
+from apps.library.services.fair_scheduler import FairScheduler, job_cost
 from apps.library.services.media_processing import (
     cut_audio_from_video,
+    downscale_image,
     perform_ocr,
+    transcode_audio,
+    transcode_video,
+)
+from apps.library.services.pipeline import (
+    STAGE_ORDER,
+    PipelineCancelled,
+    aset_progress,
+    aset_status,
+    cancel_pipeline_runs,
+    check_cancelled,
+    create_pipeline_run,
+    create_pipeline_runs,
+    finish_pipeline_run,
+    pipeline_task_id,
+    set_progress,
+    set_status,
+    track_stage,
 )
 from apps.library.services.rag_service import RAGService
+from apps.library.services.stage_hashes import (
+    ANALYZE,
+    INDEX,
+    analyze_hash,
+    file_sha256,
+    index_hash,
+    is_unchanged,
+)
+from apps.library.services.storage import local_path
+from apps.library.services.uploads import discard_upload
 
-from .models import MediaItem
+from .models import BulkJob, MediaItem, PipelineRun, StageRun, UploadSession
 
 logger = logging.getLogger(__name__)
 
 
-@shared_task
-def analyze_media(media_item_id):
+def transcribe_media(
+    media_item,
+    engine,
+    source_path: Path,
+    source_hash: str,
+    run_id: Optional[int] = None,
+) -> str:
+    """
+    Extracts the text of a MediaItem from its file at `source_path`: OCR
+    for images, file contents for text, speech recognition for audio and
+    video. Intermediate files are kept in the artifact cache under
+    `source_hash`, the file's sha256.
+
+    Speech is transcribed in windows of TRANSCRIPTION_WINDOW_SECONDS; a
+    cancelled pipeline run stops at the next window boundary.
+    """
+    transcription_text = ''
+    audio_path = source_path
+    artifacts = ArtifactCache()
+
+    if media_item.media_type == MediaItem.MediaType.VIDEO:
+        audio_path = artifacts.get_or_create(
+            source_hash,
+            'audio',
+            '.wav',
+            lambda output: cut_audio_from_video(source_path, output),
+            channels=1,
+            sample_rate=16000,
+        )
+        logger.info(f'Extracted audio to {audio_path}')
+
+    if media_item.media_type == MediaItem.MediaType.IMAGE:
+        max_side = settings.OCR_MAX_IMAGE_SIDE
+        image_path = artifacts.get_or_create(
+            source_hash,
+            'ocr-image',
+            '.png',
+            lambda output: downscale_image(source_path, output, max_side),
+            max_side=max_side,
+        )
+        transcription_text = perform_ocr(image_path)
+
+    elif media_item.media_type == MediaItem.MediaType.TEXT:
+        with open(source_path, 'r', encoding='utf-8', errors='ignore') as f:
+            transcription_text = f.read()
+
+    elif media_item.media_type in [
+        MediaItem.MediaType.AUDIO,
+        MediaItem.MediaType.VIDEO,
+    ]:
+        logger.info(f'Transcribing audio from {audio_path} using {engine}')
+
+        if engine == ProjectSettings.TranscriptionEngine.WHISPERX:
+            device = settings.WHISPER_DEVICE
+            batch_size = 16
+            compute_type = settings.WHISPER_COMPUTE_TYPE
+
+            model = whisperx.load_model(
+                settings.WHISPER_MODEL,
+                device,
+                compute_type=compute_type,
+            )
+
+            audio = whisperx.load_audio(str(audio_path))
+            window = (
+                settings.TRANSCRIPTION_WINDOW_SECONDS
+                * whisperx.audio.SAMPLE_RATE
+            )
+            try:
+                for start in range(0, len(audio), window):
+                    check_cancelled(run_id)
+                    result = model.transcribe(
+                        audio[start : start + window], batch_size=batch_size
+                    )
+                    for segment in result['segments']:
+                        transcription_text += segment['text'] + '\n'
+            finally:
+                del model
+                gc.collect()
+                if device == 'cuda':
+                    torch.cuda.empty_cache()
+
+        elif engine == ProjectSettings.TranscriptionEngine.OPENAI:
+            check_cancelled(run_id)
+            client = OpenAI(api_key=settings.OPENAI_API_KEY)
+            with open(audio_path, 'rb') as audio_file:
+                transcript = client.audio.transcriptions.create(
+                    model='whisper-1', file=audio_file
+                )
+            transcription_text = transcript.text
+
+    return transcription_text.strip()
+
+
+@shared_task(bind=True, acks_late=True)
+def analyze_media(self, media_item_id, run_id=None):
     try:
-        media_item = MediaItem.objects.get(id=media_item_id)
-        media_item.status = MediaItem.Status.PROCESSING
-        media_item.processing_step = 'Transcribing/Processing Media...'
-        media_item.save()
+        _analyze_media(self, media_item_id, run_id)
+    finally:
+        release_ingest_slot(media_item_id)
+
+
+def _analyze_media(task, media_item_id, run_id):
+    with track_stage(run_id, StageRun.Stage.ANALYZE, task.request.id) as stage:
+        try:
+            media_item = MediaItem.objects.get(id=media_item_id)
+            set_status(media_item.id, MediaItem.Status.PROCESSING)
+            set_progress(media_item.id, 'Transcribing/Processing Media...')
+
+            project_settings = ProjectSettings.load()
+            source_path = local_path(media_item.file)
+            source_hash = media_item.original_sha256 or file_sha256(
+                source_path
+            )
+            if not media_item.perceptual_hash:
+                # Index items processed before duplicate detection existed
+                fingerprint_media(media_item, source_path)
+            input_hash = analyze_hash(
+                media_item, project_settings, source_hash
+            )
 
-        project_settings = ProjectSettings.load()
-        engine = project_settings.transcription_engine
-        transcription_text = ''
+            if media_item.transcription and is_unchanged(
+                media_item, ANALYZE, input_hash
+            ):
+                logger.info(
+                    f'File and transcription config of {media_item.id} '
+                    'unchanged, skipping analysis'
+                )
+                stage.status = StageRun.Status.SKIPPED
+                return
 
-        logger.info(
-            f'Starting processing for {media_item.id} ({media_item.media_type})'
+            logger.info(
+                f'Starting processing for {media_item.id} '
+                f'({media_item.media_type})'
+            )
+            media_item.transcription = transcribe_media(
+                media_item,
+                project_settings.transcription_engine,
+                source_path,
+                source_hash,
+                run_id,
+            )
+            check_cancelled(run_id)
+            media_item.stage_hashes[ANALYZE] = input_hash
+            media_item.save(update_fields=['transcription', 'stage_hashes'])
+
+            logger.info(f'Analysis completed for {media_item.id}')
+
+        except MediaItem.DoesNotExist:
+            logger.error(f'MediaItem {media_item_id} not found')
+            stage.status = StageRun.Status.SKIPPED
+        except PipelineCancelled:
+            logger.info(f'Analysis of {media_item_id} cancelled')
+            raise
+        except Exception as e:
+            logger.error(f'Error analyzing {media_item_id}: {e}')
+            traceback.print_exc()
+            set_status(
+                media_item_id,
+                MediaItem.Status.FAILED,
+                error_log=traceback.format_exc(),
+            )
+            raise e
+
+
+async def asummarize_media(media_item_id) -> bool:
+    """
+    Summarizes the transcription of a MediaItem.
+    Returns False if the summary is up to date and nothing was done.
+    """
+    media_item = await MediaItem.objects.aget(id=media_item_id)
+    await sync_to_async(media_item.load_texts)()
+    await aset_progress(media_item.id, 'Generating Summary...')
+
+    logger.info(f'Starting summarization for {media_item.id}')
+
+    if not media_item.transcription:
+        logger.warning(f'No transcription found for {media_item.id}')
+        return False
+
+    try:
+        project_settings = await sync_to_async(ProjectSettings.load)()
+        input_hash = summary_fingerprint(
+            project_settings, media_item.transcription
         )
 
-        audio_path = media_item.file.path
+        if media_item.summary and media_item.summary_fingerprint == input_hash:
+            logger.info(
+                f'Transcription and prompt of {media_item.id} unchanged, '
+                'skipping summarization'
+            )
+            return False
 
-        if media_item.media_type == MediaItem.MediaType.VIDEO:
-            audio_path = cut_audio_from_video(Path(media_item.file.path))
-            logger.info(f'Extracted audio to {audio_path}')
+        media_item.summary = await AIService().summarize_async(
+            media_item.transcription
+        )
+        media_item.summary_fingerprint = input_hash
+        await media_item.asave(update_fields=['summary', 'summary_fingerprint'])
+    except Exception as e:
+        logger.error(f'Error summarizing {media_item_id}: {e}')
+        traceback.print_exc()
+        await aset_status(
+            media_item.id,
+            MediaItem.Status.FAILED,
+            error_log=traceback.format_exc(),
+        )
+        raise e
 
-        if media_item.media_type == MediaItem.MediaType.IMAGE:
-            transcription_text = perform_ocr(Path(media_item.file.path))
+    logger.info(f'Summarization completed for {media_item.id}')
+    return True
 
-        elif media_item.media_type == MediaItem.MediaType.TEXT:
-            with open(
-                media_item.file.path, 'r', encoding='utf-8', errors='ignore'
-            ) as f:
-                transcription_text = f.read()
 
-        elif media_item.media_type in [
-            MediaItem.MediaType.AUDIO,
-            MediaItem.MediaType.VIDEO,
-        ]:
-            logger.info(f'Transcribing audio from {audio_path} using {engine}')
+@shared_task(bind=True)
+def summarize_media(self, media_item_id, run_id=None):
+    with track_stage(
+        run_id, StageRun.Stage.SUMMARIZE, self.request.id
+    ) as stage:
+        try:
+            if not async_to_sync(asummarize_media)(media_item_id):
+                stage.status = StageRun.Status.SKIPPED
+        except MediaItem.DoesNotExist:
+            stage.status = StageRun.Status.SKIPPED
 
-            if engine == ProjectSettings.TranscriptionEngine.WHISPERX:
-                device = settings.WHISPER_DEVICE
-                batch_size = 16
-                compute_type = settings.WHISPER_COMPUTE_TYPE
 
-                model = whisperx.load_model(
-                    settings.WHISPER_MODEL,
-                    device,
-                    compute_type=compute_type,
+@shared_task(bind=True)
+def index_media(self, media_item_id, run_id=None):
+    """
+    Task to index a media item in the RAG vector store.
+    """
+    with track_stage(run_id, StageRun.Stage.INDEX, self.request.id) as stage:
+        try:
+            media_item = MediaItem.objects.get(id=media_item_id)
+
+            rag_service = RAGService()
+
+            # The stage hash only says what was indexed last time; the
+            # collection may have been cleared since
+            input_hash = index_hash(media_item)
+            if is_unchanged(
+                media_item, INDEX, input_hash
+            ) and rag_service.has_media_item(media_item.id):
+                logger.info(
+                    f'Content of {media_item.id} unchanged, not indexing'
                 )
+                stage.status = StageRun.Status.SKIPPED
+                return
 
-                audio = whisperx.load_audio(str(audio_path))
-                result = model.transcribe(audio, batch_size=batch_size)
+            logger.info(f'Starting RAG indexing for {media_item.id}')
 
-                del model
-                gc.collect()
-                if device == 'cuda':
-                    torch.cuda.empty_cache()
+            rag_service.index_media_item(media_item)
 
-                for segment in result['segments']:
-                    transcription_text += segment['text'] + '\n'
+            media_item.stage_hashes[INDEX] = input_hash
+            media_item.save(update_fields=['stage_hashes'])
 
-            elif engine == ProjectSettings.TranscriptionEngine.OPENAI:
-                client = OpenAI(api_key=settings.OPENAI_API_KEY)
-                with open(audio_path, 'rb') as audio_file:
-                    transcript = client.audio.transcriptions.create(
-                        model='whisper-1', file=audio_file
-                    )
-                transcription_text = transcript.text
+            logger.info(f'RAG indexing completed for {media_item.id}')
 
-        media_item.transcription = transcription_text.strip()
-        media_item.save()
+        except MediaItem.DoesNotExist:
+            logger.error(
+                f'MediaItem {media_item_id} not found regarding indexing'
+            )
+            stage.status = StageRun.Status.SKIPPED
+        except Exception as e:
+            logger.error(f'Error indexing media item {media_item_id}: {e}')
+            traceback.print_exc()
+            raise e
 
-        logger.info(f'Analysis completed for {media_item.id}')
 
-        media_item.status = MediaItem.Status.COMPLETED
-        media_item.save()
+@shared_task
+def finalize_pipeline(results, run_id):
+    """
+    Chord callback: runs once every branch of the pipeline has finished.
+    """
+    run = finish_pipeline_run(run_id)
+    if run and settings.ARCHIVAL_ENABLED:
+        archive_media.delay(run.media_item_id)
 
-        summarize_media.delay(media_item.id)
 
+def _idle_for_archival(media_item_id, file_name) -> bool:
+    """
+    Whether a MediaItem is processed, still stores `file_name` and has no
+    unfinished pipeline run that could be reading its file.
+    """
+    return (
+        MediaItem.objects.filter(
+            id=media_item_id,
+            status=MediaItem.Status.COMPLETED,
+            file=file_name,
+        ).exists()
+        and not PipelineRun.objects.filter(
+            media_item_id=media_item_id, finished_at__isnull=True
+        ).exists()
+    )
+
+
+@shared_task(acks_late=True)
+def archive_media(media_item_id):
+    """
+    Replaces the original upload of a processed audio or video item with a
+    compact rendition (speech-optimized Opus, or lower-bitrate H.264),
+    keeping the hash and size of the original. The original is kept if
+    the rendition does not save at least ARCHIVAL_MIN_SAVINGS of it.
+
+    The transcode takes minutes, so the item is checked again with its row
+    locked right before the file is swapped: a pipeline started meanwhile
+    keeps the original, and the rendition is discarded.
+    """
+    try:
+        media_item = MediaItem.objects.get(id=media_item_id)
     except MediaItem.DoesNotExist:
-        logger.error(f'MediaItem {media_item_id} not found')
-    except Exception as e:
-        logger.error(f'Error analyzing {media_item_id}: {e}')
-        traceback.print_exc()
-        if 'media_item' in locals():
-            media_item.status = MediaItem.Status.FAILED
-            media_item.error_log = traceback.format_exc()
-            media_item.save()
-        raise e
+        logger.error(f'MediaItem {media_item_id} not found for archival')
+        return
+
+    if media_item.archived_at or media_item.media_type not in (
+        MediaItem.MediaType.AUDIO,
+        MediaItem.MediaType.VIDEO,
+    ):
+        return
+    old_name = media_item.file.name
+    if not _idle_for_archival(media_item.id, old_name):
+        logger.info(f'{media_item.id} is being processed, not archiving')
+        return
+
+    source_path = local_path(media_item.file)
+    media_item.original_size = source_path.stat().st_size
+    media_item.original_sha256 = file_sha256(source_path)
+    media_item.archived_at = timezone.now()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if media_item.media_type == MediaItem.MediaType.AUDIO:
+            output = Path(tmp_dir) / f'{source_path.stem}.ogg'
+            transcode_audio(
+                source_path, output, settings.ARCHIVAL_AUDIO_BITRATE
+            )
+        else:
+            output = Path(tmp_dir) / f'{source_path.stem}.mp4'
+            transcode_video(
+                source_path,
+                output,
+                settings.ARCHIVAL_VIDEO_MAX_HEIGHT,
+                settings.ARCHIVAL_VIDEO_CRF,
+                settings.ARCHIVAL_AUDIO_BITRATE,
+            )
+        media_item.archived_size = output.stat().st_size
 
+        min_savings = media_item.original_size * settings.ARCHIVAL_MIN_SAVINGS
+        if media_item.reclaimed_bytes < min_savings:
+            logger.info(
+                f'Archival of {media_item.id} would only save '
+                f'{media_item.reclaimed_bytes} bytes, keeping the original'
+            )
+            media_item.archived_size = media_item.original_size
+        else:
+            with open(output, 'rb') as f:
+                media_item.file.save(output.name, File(f), save=False)
+
+    with transaction.atomic():
+        # Serializes with create_pipeline_runs, which updates this row
+        list(
+            MediaItem.objects.select_for_update()
+            .filter(id=media_item.id)
+            .only('id')
+        )
+        idle = _idle_for_archival(media_item.id, old_name)
+        if idle:
+            media_item.save(
+                update_fields=[
+                    'file',
+                    'original_sha256',
+                    'original_size',
+                    'archived_size',
+                    'archived_at',
+                ]
+            )
 
-@shared_task
-def summarize_media(media_item_id):
+    if not idle:
+        if media_item.file.name != old_name:
+            media_item.file.storage.delete(media_item.file.name)
+        logger.info(
+            f'{media_item.id} was reprocessed or changed during archival, '
+            'keeping the original'
+        )
+        return
+
+    if media_item.file.name != old_name:
+        media_item.file.storage.delete(old_name)
+
+    logger.info(
+        f'Archived {media_item.id}: {media_item.original_size} -> '
+        f'{media_item.archived_size} bytes '
+        f'({media_item.reclaimed_bytes} reclaimed)'
+    )
+
+
+def pipeline_canvas(
+    media_item_id, run_id, first_stage: str = StageRun.Stage.ANALYZE
+):
+    """
+    Builds the Celery canvas of a pipeline run:
+
+        analyze -> summarize -> (generate content | index) -> finalize
+
+    starting at `first_stage`.
+    """
+    args = (media_item_id, run_id)
+
+    def step(task, name, *step_args):
+        return task.signature(
+            step_args or args,
+            immutable=not step_args,
+            task_id=pipeline_task_id(run_id, name),
+        )
+
+    stages = {
+        StageRun.Stage.ANALYZE: step(analyze_media, StageRun.Stage.ANALYZE),
+        StageRun.Stage.SUMMARIZE: step(
+            summarize_media, StageRun.Stage.SUMMARIZE
+        ),
+        StageRun.Stage.CONTENT: chord(
+            group(
+                step(generate_content_from_media, StageRun.Stage.CONTENT),
+                step(index_media, StageRun.Stage.INDEX),
+            ),
+            step(finalize_pipeline, 'finalize', run_id),
+        ),
+    }
+    signatures = [
+        signature
+        for stage, signature in stages.items()
+        if STAGE_ORDER.index(stage) >= STAGE_ORDER.index(first_stage)
+    ]
+    return chain(*signatures)
+
+
+def start_upload_processing(media_item):
+    """
+    Starts processing of a new upload, checking it for duplicates first
+    when DUPLICATE_DETECTION_ENABLED.
+    """
+    if settings.DUPLICATE_DETECTION_ENABLED:
+        check_duplicates.delay(media_item.id)
+    else:
+        start_pipeline(media_item)
+
+
+@shared_task(acks_late=True)
+def check_duplicates(media_item_id):
+    """
+    Hashes and fingerprints a new upload, then starts its pipeline unless
+    it duplicates a processed item of the same user. A duplicate is only
+    flagged; the user then reuses that item's results or processes it.
+    """
     try:
         media_item = MediaItem.objects.get(id=media_item_id)
-        media_item.error_log = ''
-        media_item.processing_step = 'Generating Summary...'
-        media_item.save()
+    except MediaItem.DoesNotExist:
+        logger.error(f'MediaItem {media_item_id} not found for duplicate check')
+        return
 
-        logger.info(f'Starting summarization for {media_item.id}')
+    try:
+        source_path = local_path(media_item.file)
+        media_item.original_sha256 = file_sha256(source_path)
+        media_item.save(update_fields=['original_sha256'])
+        duplicate = find_duplicate(
+            media_item, fingerprint_media(media_item, source_path)
+        )
+    except OSError as e:
+        logger.warning(f'Could not check {media_item.id} for duplicates: {e}')
+        duplicate = None
 
-        project_settings = ProjectSettings.load()
-        system_prompt = project_settings.summarization_prompt
+    if duplicate:
+        media_item.duplicate_of = duplicate
+        media_item.save(update_fields=['duplicate_of'])
+        return
 
-        current_language = translation.get_language()
-        system_prompt += f"\n\nIMPORTANT: Provide all Output in language: '{current_language}'."
+    start_pipeline(media_item)
 
-        if not media_item.transcription:
-            logger.warning(f'No transcription found for {media_item.id}')
-            return
 
-        provider = project_settings.llm_provider
+def start_pipeline(
+    media_item, first_stage: str = StageRun.Stage.ANALYZE
+) -> PipelineRun:
+    """
+    Records a PipelineRun and dispatches its stages. The MediaItem becomes
+    COMPLETED only when both branches have finished.
 
-        if provider == ProjectSettings.LLMProvider.DEEPSEEK:
-            llm = ChatDeepSeek(
-                api_key=settings.DEEPSEEK_API_KEY,
-                model=settings.DEEPSEEK_MODEL,
-                temperature=0,
-            )
+    Runs that start with analysis wait in the owner's fair-scheduler queue
+    until an ingest slot is free; later stages are dispatched directly.
+    """
+    run = create_pipeline_run(media_item, first_stage)
+    dispatch_pipelines([(media_item, run)], first_stage)
+    return run
+
+
+def start_pipelines(
+    media_items, first_stage: str = StageRun.Stage.ANALYZE
+) -> int:
+    """
+    Like start_pipeline for a batch of MediaItems, with one INSERT per
+    table, one status UPDATE and a single dispatch. Returns the number of
+    started pipelines.
+    """
+    media_items = list(media_items)
+    if not media_items:
+        return 0
+
+    runs = create_pipeline_runs(media_items, first_stage)
+    dispatch_pipelines(list(zip(media_items, runs)), first_stage)
+    return len(runs)
+
+
+PIPELINE_TASK_STEPS = [*STAGE_ORDER, 'finalize']
+
+
+def cancel_pipelines(media_item_ids) -> int:
+    """
+    Cancels the unfinished pipeline runs of MediaItems (e.g. before they
+    are deleted). Jobs waiting in the fair scheduler are dropped, queued
+    Celery tasks are revoked, and running stages stop at their next
+    check_cancelled(). Returns the number of cancelled runs.
+    """
+    runs = list(
+        PipelineRun.objects.filter(
+            media_item_id__in=list(media_item_ids), finished_at__isnull=True
+        ).values_list('id', 'media_item_id')
+    )
+    if not runs:
+        return 0
+
+    # Their analysis has not started, so no task will free their slots
+    not_started = set(
+        StageRun.objects.filter(
+            run_id__in=[run_id for run_id, _ in runs],
+            stage=StageRun.Stage.ANALYZE,
+            status=StageRun.Status.QUEUED,
+        ).values_list('run__media_item_id', flat=True)
+    )
+    cancel_pipeline_runs([run_id for run_id, _ in runs])
+
+    try:
+        current_app.control.revoke(
+            [
+                pipeline_task_id(run_id, step)
+                for run_id, _ in runs
+                for step in PIPELINE_TASK_STEPS
+            ]
+        )
+    except Exception as e:
+        logger.warning(f'Could not revoke pipeline tasks: {e}')
+
+    if settings.FAIR_SCHEDULING_ENABLED:
+        try:
+            scheduler = FairScheduler()
+            scheduler.remove([media_item_id for _, media_item_id in runs])
+            released = [scheduler.release(item_id) for item_id in not_started]
+        except redis.RedisError as e:
+            logger.warning(f'Could not remove cancelled ingest jobs: {e}')
         else:
-            llm = ChatOpenAI(
-                api_key=settings.OPENAI_API_KEY,
-                model=settings.OPENAI_MODEL,
-                temperature=0,
-            )
+            if any(released):
+                dispatch_ingest.delay()
+
+    logger.info(f'Cancelled {len(runs)} pipeline runs')
+    return len(runs)
 
-        prompt = ChatPromptTemplate.from_messages(
+
+def ingest_cost(media_item) -> float:
+    try:
+        size = media_item.file.size
+    except (OSError, ValueError):
+        size = 0
+    return job_cost(size)
+
+
+def dispatch_pipelines(runs, first_stage: str = StageRun.Stage.ANALYZE):
+    """
+    Dispatches (media_item, run) pairs: into the fair scheduler when they
+    start with analysis, otherwise as one Celery group.
+    """
+    if (
+        first_stage == StageRun.Stage.ANALYZE
+        and settings.FAIR_SCHEDULING_ENABLED
+    ):
+        FairScheduler().enqueue_many(
             [
-                (
-                    'system',
-                    system_prompt,
-                ),
-                ('user', 'Summarize this text:\n\n{text}'),
+                (item.user_id, item.id, run.id, ingest_cost(item))
+                for item, run in runs
             ]
         )
+        dispatch_ingest.delay()
+    else:
+        group(
+            pipeline_canvas(item.id, run.id, first_stage) for item, run in runs
+        ).apply_async()
 
-        chain = prompt | llm
 
-        response = chain.invoke({'text': media_item.transcription})
+def _start_ingest_job(job):
+    pipeline_canvas(job['media_item_id'], job['run_id']).apply_async()
 
-        media_item.summary = response.content
-        media_item.status = MediaItem.Status.COMPLETED
-        media_item.save()
 
-        logger.info(f'Summarization completed for {media_item.id}')
+@shared_task
+def dispatch_ingest():
+    """
+    Moves queued ingest jobs into Celery by deficit round-robin across
+    users. Runs after every enqueue and release, and periodically to pick
+    up slots of jobs whose workers died.
+    """
+    FairScheduler().dispatch(_start_ingest_job)
 
-        generate_content_from_media.delay(media_item.id)
-        index_media.delay(media_item.id)
 
-    except MediaItem.DoesNotExist:
-        pass
-    except Exception as e:
-        logger.error(f'Error summarizing {media_item_id}: {e}')
-        traceback.print_exc()
-        if 'media_item' in locals():
-            media_item.status = MediaItem.Status.FAILED
-            media_item.error_log = traceback.format_exc()
-            media_item.save()
-        raise e
+def release_ingest_slot(media_item_id):
+    if not settings.FAIR_SCHEDULING_ENABLED:
+        return
+
+    try:
+        released = FairScheduler().release(media_item_id)
+    except redis.RedisError as e:
+        logger.warning(f'Could not release ingest slot of {media_item_id}: {e}')
+        return
+
+    if released:
+        dispatch_ingest.delay()
 
 
 @shared_task
-def index_media(media_item_id):
+def regenerate_stale_content(media_item_id):
     """
-    Task to index a media item in the RAG vector store.
+    Re-runs only the generation stages of a MediaItem whose prompt or input
+    changed since its artifacts were generated.
     """
     try:
         media_item = MediaItem.objects.get(id=media_item_id)
-        logger.info(f'Starting RAG indexing for {media_item.id}')
+        stages = stale_stages(media_item, ProjectSettings.load(fresh=True))
+        if not stages:
+            return
 
-        rag_service = RAGService()
-        rag_service.index_media_item(media_item)
+        logger.info(f'Regenerating {stages} for {media_item.id}')
 
-        logger.info(f'RAG indexing completed for {media_item.id}')
+        if SUMMARY in stages:
+            start_pipeline(media_item, StageRun.Stage.SUMMARIZE)
+        elif CONCEPTS in stages:
+            start_pipeline(media_item, StageRun.Stage.CONTENT)
+        else:
+            if PLAN in stages:
+                regenerate_study_plan.delay(media_item.id)
+            if QUIZZES in stages:
+                regenerate_quizzes.delay(media_item.id)
 
     except MediaItem.DoesNotExist:
-        logger.error(f'MediaItem {media_item_id} not found regarding indexing')
+        logger.error(f'MediaItem {media_item_id} not found for regeneration')
+
+
+@shared_task
+def sweep_stale_content():
+    """
+    Periodically schedules regeneration for a batch of completed media
+    items. The position is kept in the shared cache so consecutive runs
+    walk through the whole library at a bounded rate.
+    """
+    cursor = cache.get('regeneration-sweep-cursor', 0)
+    ids = list(
+        MediaItem.objects.filter(
+            status=MediaItem.Status.COMPLETED, id__gt=cursor
+        )
+        .order_by('id')
+        .values_list('id', flat=True)[: settings.REGENERATION_SWEEP_BATCH_SIZE]
+    )
+
+    for media_item_id in ids:
+        regenerate_stale_content.delay(media_item_id)
+
+    cache.set('regeneration-sweep-cursor', ids[-1] if ids else 0, None)
+
+
+BULK_ACTION_STAGES = {
+    BulkJob.Action.REANALYZE: StageRun.Stage.ANALYZE,
+    BulkJob.Action.RESUMMARIZE: StageRun.Stage.SUMMARIZE,
+}
+
+
+def start_bulk_action(user, queryset, action: str):
+    """
+    Starts pipelines for every item of `queryset` in batches. Selections
+    above BULK_ACTION_INLINE_LIMIT are handed to a BulkJob that runs in
+    the background; it is returned, otherwise None.
+    """
+    ids = list(queryset.order_by('id').values_list('id', flat=True))
+
+    if len(ids) > settings.BULK_ACTION_INLINE_LIMIT:
+        bulk_job = BulkJob.objects.create(
+            user=user, action=action, media_item_ids=ids, total=len(ids)
+        )
+        run_bulk_job.delay(bulk_job.id)
+        return bulk_job
+
+    batch_size = settings.BULK_DISPATCH_BATCH_SIZE
+    for start in range(0, len(ids), batch_size):
+        start_pipelines(
+            MediaItem.objects.filter(
+                id__in=ids[start : start + batch_size]
+            ).only('id', 'user', 'file'),
+            BULK_ACTION_STAGES[action],
+        )
+    return None
+
+
+@shared_task(acks_late=True)
+def run_bulk_job(bulk_job_id):
+    """
+    Dispatches the items of a BulkJob batch by batch, recording progress.
+    The task is acknowledged only when it finishes, so a job lost with its
+    worker is redelivered and continues after the last recorded batch.
+    Items that got a pipeline run since the job was created are skipped,
+    so a batch dispatched before the crash is not started twice.
+    """
+    bulk_job = BulkJob.objects.get(id=bulk_job_id)
+    jobs = BulkJob.objects.filter(id=bulk_job_id)
+    jobs.update(status=BulkJob.Status.RUNNING)
+
+    ids = bulk_job.media_item_ids
+    batch_size = settings.BULK_DISPATCH_BATCH_SIZE
+    try:
+        for start in range(bulk_job.processed, len(ids), batch_size):
+            batch = ids[start : start + batch_size]
+            start_pipelines(
+                MediaItem.objects.filter(id__in=batch)
+                .exclude(pipeline_runs__queued_at__gte=bulk_job.created_at)
+                .only('id', 'user', 'file'),
+                BULK_ACTION_STAGES[bulk_job.action],
+            )
+            jobs.update(processed=start + len(batch))
     except Exception as e:
-        logger.error(f'Error indexing media item {media_item_id}: {e}')
-        traceback.print_exc()
+        logger.error(f'Bulk job {bulk_job_id} failed: {e}')
+        jobs.update(
+            status=BulkJob.Status.FAILED,
+            error=traceback.format_exc(),
+            finished_at=timezone.now(),
+        )
+        raise e
+
+    jobs.update(status=BulkJob.Status.COMPLETED, finished_at=timezone.now())
+    logger.info(f'Bulk job {bulk_job_id} dispatched {len(ids)} items')
+
+
+@shared_task
+def cleanup_upload_sessions():
+    """
+    Deletes upload sessions (and partial files of unfinished ones) that
+    have not been touched for UPLOAD_SESSION_TTL_HOURS.
+    """
+    cutoff = timezone.now() - timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+    sessions = UploadSession.objects.filter(updated_at__lt=cutoff)
+    for session in sessions:
+        discard_upload(session)
+    logger.info(f'Removed {len(sessions)} expired upload sessions')
@@ -2,8 +2,10 @@ from django.urls import path
 
 from .views import (
     MediaBulkActionView,
+    MediaCancelView,
     MediaDeleteView,
     MediaDetailView,
+    MediaDuplicateView,
     MediaListView,
     MediaUpdateView,
     MediaUploadView,
@@ -11,6 +13,8 @@ from .views import (
     TopicDeleteView,
     TopicListView,
     TopicUpdateView,
+    UploadSessionCreateView,
+    UploadSessionView,
 )
 
 app_name = 'library'
@@ -18,7 +22,23 @@ app_name = 'library'
 urlpatterns = [
     path('', MediaListView.as_view(), name='list'),
     path('upload/', MediaUploadView.as_view(), name='upload'),
+    path(
+        'uploads/',
+        UploadSessionCreateView.as_view(),
+        name='upload_session_create',
+    ),
+    path(
+        'uploads/<uuid:pk>/',
+        UploadSessionView.as_view(),
+        name='upload_session',
+    ),
     path('detail/<int:pk>/', MediaDetailView.as_view(), name='detail'),
+    path(
+        'detail/<int:pk>/duplicate/',
+        MediaDuplicateView.as_view(),
+        name='duplicate',
+    ),
+    path('cancel/<int:pk>/', MediaCancelView.as_view(), name='cancel'),
     path('update/<int:pk>/', MediaUpdateView.as_view(), name='update'),
     path('delete/<int:pk>/', MediaDeleteView.as_view(), name='delete'),
     path('bulk-action/', MediaBulkActionView.as_view(), name='bulk_action'),
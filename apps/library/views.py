@@ -1,10 +1,16 @@
+import json
 import logging
+from datetime import timedelta
 
+import redis
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import HttpResponseRedirect
-from django.shortcuts import redirect
-from django.urls import reverse_lazy
+from django.core.cache import cache
+from django.http import HttpResponseRedirect, JsonResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.urls import reverse, reverse_lazy
+from django.utils import formats, timezone
 from django.utils.translation import gettext as _
 from django.views.generic import (
     CreateView,
@@ -14,9 +20,28 @@ from django.views.generic import (
     UpdateView,
     View,
 )
-
-from .models import MediaItem, Topic
-from .tasks import analyze_media
+from kombu.exceptions import OperationalError
+from taggit.utils import parse_tags
+
+from .models import BulkJob, MediaItem, StageRun, Topic, UploadSession
+from .services.duplicates import reuse_results
+from .services.fair_scheduler import FairScheduler
+from .services.uploads import (
+    MEDIA_TYPES_BY_EXTENSION,
+    commit_chunk,
+    complete_upload,
+    discard_upload,
+    file_extension,
+    media_type_for,
+    write_chunk,
+)
+from .tasks import (
+    cancel_pipelines,
+    regenerate_stale_content,
+    start_bulk_action,
+    start_pipeline,
+    start_upload_processing,
+)
 
 
 class MediaListView(ListView):
@@ -29,6 +54,15 @@ class MediaListView(ListView):
             '-created_at'
         )
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        MediaItem.prefetch_queue_info(context['media_items'])
+        context['bulk_jobs'] = BulkJob.objects.filter(
+            user=self.request.user,
+            status__in=[BulkJob.Status.QUEUED, BulkJob.Status.RUNNING],
+        ).only('action', 'total', 'processed')
+        return context
+
 
 class MediaUploadView(CreateView):
     model = MediaItem
@@ -36,32 +70,44 @@ class MediaUploadView(CreateView):
     template_name = 'library/upload.html'
     success_url = reverse_lazy('library:list')
 
+    def estimate_completion(self, new_jobs=0):
+        """
+        Estimated time when the ingest backlog and `new_jobs` uploads not
+        queued yet will have been processed, or None if the broker is
+        unavailable.
+        """
+        try:
+            return FairScheduler().estimate_completion(new_jobs)
+        except (redis.RedisError, OperationalError) as e:
+            logging.getLogger(__name__).warning(
+                f'Could not estimate processing backlog: {e}'
+            )
+            return None
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['queue_busy_until'] = self.backlog_warning(
+            self.estimate_completion()
+        )
+        return context
+
+    def backlog_warning(self, finish):
+        """
+        Returns `finish` if the backlog is long enough to warn about it.
+        """
+        threshold = timedelta(minutes=settings.UPLOAD_BACKLOG_WARNING_MINUTES)
+        if finish and finish - timezone.now() > threshold:
+            return finish
+        return None
+
     def form_valid(self, form):
         files = self.request.FILES.getlist('file')
         topic = form.cleaned_data.get('topic')
         tags = form.cleaned_data.get('tags')
 
-        supported_extensions = [
-            'mp4',
-            'mov',
-            'avi',
-            'mkv',
-            'mp3',
-            'wav',
-            'flac',
-            'm4a',
-            'ogg',
-            'jpg',
-            'jpeg',
-            'png',
-            'webp',
-            'txt',
-            'md',
-        ]
-
         for f in files:
-            ext = f.name.lower().split('.')[-1]
-            if ext not in supported_extensions:
+            ext = file_extension(f.name)
+            if ext not in MEDIA_TYPES_BY_EXTENSION:
                 messages.error(
                     self.request,
                     _(
@@ -73,18 +119,7 @@ class MediaUploadView(CreateView):
 
         for f in files:
             title = f.name
-            ext = f.name.lower().split('.')[-1]
-
-            if ext in ['mp4', 'mov', 'avi', 'mkv']:
-                media_type = MediaItem.MediaType.VIDEO
-            elif ext in ['mp3', 'wav', 'flac', 'm4a', 'ogg']:
-                media_type = MediaItem.MediaType.AUDIO
-            elif ext in ['jpg', 'jpeg', 'png', 'webp']:
-                media_type = MediaItem.MediaType.IMAGE
-            elif ext in ['txt', 'md']:
-                media_type = MediaItem.MediaType.TEXT
-            else:
-                continue
+            media_type = media_type_for(f.name)
 
             instance = MediaItem.objects.create(
                 user=self.request.user,
@@ -97,7 +132,7 @@ class MediaUploadView(CreateView):
                 instance.tags.set(tags)
 
             try:
-                analyze_media.delay(instance.id)
+                start_upload_processing(instance)
             except Exception as e:
                 logger = logging.getLogger(__name__)
                 logger.error(
@@ -111,15 +146,244 @@ class MediaUploadView(CreateView):
                     % {'filename': f.name},
                 )
 
-        messages.success(self.request, _('Files uploaded successfully.'))
+        # Files being checked for duplicates are not in the queue yet
+        finish = self.estimate_completion(
+            len(files) if settings.DUPLICATE_DETECTION_ENABLED else 0
+        )
+        if finish is None:
+            messages.success(self.request, _('Files uploaded successfully.'))
+            return HttpResponseRedirect(self.success_url)
+
+        finish_display = formats.date_format(
+            timezone.localtime(finish), 'SHORT_DATETIME_FORMAT'
+        )
+        if self.backlog_warning(finish):
+            messages.warning(
+                self.request,
+                _(
+                    'Files uploaded. The processing queue is busy, so they will '
+                    'wait their turn and should be processed by %(time)s.'
+                )
+                % {'time': finish_display},
+            )
+        else:
+            messages.success(
+                self.request,
+                _('Files uploaded. Processing should finish by %(time)s.')
+                % {'time': finish_display},
+            )
         return HttpResponseRedirect(self.success_url)
 
 
+class UploadSessionCreateView(LoginRequiredMixin, View):
+    """
+    Starts a resumable upload. Expects JSON with `filename`, `size` and
+    optionally `topic` and `tags` (as typed in the tags field); returns
+    the session and chunk size.
+    """
+
+    def post(self, request):
+        try:
+            data = json.loads(request.body)
+            filename = str(data.get('filename', ''))[:255]
+            size = int(data.get('size', 0))
+        except (ValueError, TypeError):
+            return JsonResponse({'error': 'Invalid data'}, status=400)
+
+        if not media_type_for(filename):
+            return JsonResponse(
+                {
+                    'error': _(
+                        'File "%(filename)s" has an unsupported extension: .%(ext)s'
+                    )
+                    % {'filename': filename, 'ext': file_extension(filename)}
+                },
+                status=400,
+            )
+        if size <= 0:
+            return JsonResponse({'error': 'Empty file'}, status=400)
+
+        topic = None
+        if data.get('topic'):
+            topic = get_object_or_404(
+                Topic, id=data['topic'], user=request.user
+            )
+
+        session = UploadSession.objects.create(
+            user=request.user,
+            filename=filename,
+            size=size,
+            topic=topic,
+            tags=parse_tags(str(data.get('tags') or '')),
+        )
+        return JsonResponse(
+            {
+                'id': str(session.id),
+                'offset': session.offset,
+                'chunk_size': settings.UPLOAD_CHUNK_SIZE,
+                'url': reverse('library:upload_session', args=[session.id]),
+            },
+            status=201,
+        )
+
+
+class UploadSessionView(LoginRequiredMixin, View):
+    """
+    GET returns the offset to resume from, PUT appends a chunk, DELETE
+    cancels the upload.
+
+    A chunk is the raw request body, sent with `Upload-Offset` (must equal
+    the current offset) and `Upload-Checksum: sha256 <hex digest>`.
+    """
+
+    def get_session(self, request, pk):
+        return get_object_or_404(UploadSession, id=pk, user=request.user)
+
+    def session_state(self, session):
+        state = {
+            'id': str(session.id),
+            'offset': session.offset,
+            'size': session.size,
+            'complete': session.status == UploadSession.Status.COMPLETED,
+            'chunk_size': settings.UPLOAD_CHUNK_SIZE,
+        }
+        if session.media_item_id:
+            state['media_item_id'] = session.media_item_id
+            state['detail_url'] = reverse(
+                'library:detail', args=[session.media_item_id]
+            )
+        return state
+
+    def get(self, request, pk):
+        return JsonResponse(self.session_state(self.get_session(request, pk)))
+
+    def delete(self, request, pk):
+        discard_upload(self.get_session(request, pk))
+        return JsonResponse({'status': 'success'})
+
+    def put(self, request, pk):
+        session = self.get_session(request, pk)
+        if session.status == UploadSession.Status.COMPLETED:
+            return JsonResponse(self.session_state(session))
+
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+            algorithm, expected = request.headers['Upload-Checksum'].split()
+        except (KeyError, ValueError):
+            return JsonResponse(
+                {'error': 'Upload-Offset and Upload-Checksum are required'},
+                status=400,
+            )
+
+        if algorithm.lower() != 'sha256':
+            return JsonResponse(
+                {'error': 'Unsupported checksum algorithm'}, status=400
+            )
+        if offset != session.offset:
+            return JsonResponse(
+                {'error': 'Offset mismatch', 'offset': session.offset},
+                status=409,
+            )
+        if length > settings.UPLOAD_CHUNK_SIZE or offset + length > session.size:
+            return JsonResponse({'error': 'Chunk too large'}, status=413)
+
+        if length:
+            try:
+                digest = write_chunk(session, offset, request, length)
+            except ValueError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+
+            if digest != expected.lower():
+                return JsonResponse(
+                    {'error': 'Checksum mismatch', 'offset': session.offset},
+                    status=400,
+                )
+            if not commit_chunk(session, offset, length):
+                session.refresh_from_db()
+                return JsonResponse(
+                    {'error': 'Offset mismatch', 'offset': session.offset},
+                    status=409,
+                )
+
+        if session.offset == session.size:
+            media_item = complete_upload(session)
+            if media_item is None:
+                # A concurrent or retried request completed it
+                session.refresh_from_db()
+                return JsonResponse(self.session_state(session))
+            try:
+                start_upload_processing(media_item)
+            except Exception as e:
+                logger = logging.getLogger(__name__)
+                logger.error(
+                    f'Failed to schedule analysis for {media_item.id}: {e}'
+                )
+            messages.success(
+                request,
+                _('File "%(filename)s" uploaded.')
+                % {'filename': session.filename},
+            )
+
+        return JsonResponse(self.session_state(session))
+
+
 class MediaDetailView(DetailView):
     model = MediaItem
     template_name = 'library/detail.html'
     context_object_name = 'item'
 
+    def get_object(self, queryset=None):
+        media_item = super().get_object(queryset)
+
+        # Lazily refresh content generated with outdated prompts
+        if media_item.status == MediaItem.Status.COMPLETED and cache.add(
+            f'regeneration-check:{media_item.id}',
+            True,
+            settings.REGENERATION_SWEEP_INTERVAL,
+        ):
+            regenerate_stale_content.delay(media_item.id)
+
+        return media_item
+
+
+class MediaDuplicateView(LoginRequiredMixin, View):
+    """
+    Resolves an upload flagged as a duplicate: `reuse` copies the results
+    of the processed item and only generates learning content and the
+    index, `process` runs the full pipeline.
+    """
+
+    def post(self, request, pk):
+        media_item = get_object_or_404(
+            MediaItem,
+            id=pk,
+            user=request.user,
+            duplicate_of__isnull=False,
+        )
+
+        # Clearing the flag claims the item, so a repeated submit does not
+        # start a second pipeline
+        if not MediaItem.objects.filter(
+            id=media_item.id, duplicate_of__isnull=False
+        ).update(duplicate_of=None):
+            return redirect('library:detail', pk=media_item.pk)
+
+        if request.POST.get('action') == 'reuse':
+            original = media_item.duplicate_of
+            reuse_results(media_item)
+            start_pipeline(media_item, StageRun.Stage.CONTENT)
+            messages.success(
+                request,
+                _('Results of "%(title)s" reused.')
+                % {'title': original.title},
+            )
+        else:
+            start_pipeline(media_item)
+            messages.success(request, _('Processing started.'))
+
+        return redirect('library:detail', pk=media_item.pk)
+
 
 class MediaUpdateView(UpdateView):
     model = MediaItem
@@ -136,45 +400,77 @@ class MediaBulkActionView(LoginRequiredMixin, View):
         if not media_ids:
             return redirect('library:list')
 
-        queryset = MediaItem.objects.filter(id__in=media_ids)
+        queryset = MediaItem.objects.filter(
+            id__in=media_ids, user=request.user
+        )
 
         if action == 'delete':
+            cancel_pipelines(queryset.values_list('id', flat=True))
             queryset.delete()
 
+        elif action == 'cancel':
+            count = cancel_pipelines(queryset.values_list('id', flat=True))
+            messages.success(
+                request,
+                _('Processing cancelled for %(count)d items.')
+                % {'count': count},
+            )
+
         elif action == 'reanalyze':
-            error_count = 0
-            for item in queryset:
-                item.status = MediaItem.Status.PENDING
-                item.transcription = ''
-                item.summary = ''
-                item.error_log = ''
-                item.save()
-                try:
-                    analyze_media.delay(item.id)
-                except Exception:
-                    error_count += 1
-
-            if error_count > 0:
+            # Outputs are kept: stages with unchanged inputs are skipped
+            try:
+                bulk_job = start_bulk_action(
+                    request.user, queryset, BulkJob.Action.REANALYZE
+                )
+            except Exception as e:
+                logger = logging.getLogger(__name__)
+                logger.error(f'Failed to schedule bulk re-analysis: {e}')
                 messages.warning(
                     request,
-                    _(
-                        'Analysis re-started, but %(count)d items failed to schedule due to API error.'
-                    )
-                    % {'count': error_count},
+                    _('Analysis could not be re-started due to an API error.'),
                 )
             else:
-                messages.success(
-                    request, _('Analysis re-started for selected items.')
-                )
+                if bulk_job:
+                    messages.success(
+                        request,
+                        _(
+                            'Re-analysis of %(count)d items is being scheduled '
+                            'in the background.'
+                        )
+                        % {'count': bulk_job.total},
+                    )
+                else:
+                    messages.success(
+                        request, _('Analysis re-started for selected items.')
+                    )
 
         return redirect('library:list')
 
 
+class MediaCancelView(LoginRequiredMixin, View):
+    """
+    Cancels the running or queued processing of a MediaItem.
+    """
+
+    def post(self, request, pk):
+        media_item = get_object_or_404(MediaItem, id=pk, user=request.user)
+        if cancel_pipelines([media_item.id]):
+            messages.success(request, _('Processing cancelled.'))
+        else:
+            messages.info(request, _('Nothing to cancel.'))
+        return redirect('library:detail', pk=media_item.pk)
+
+
 class MediaDeleteView(DeleteView):
     model = MediaItem
     template_name = 'library/delete.html'
     success_url = reverse_lazy('library:list')
 
+    def form_valid(self, form):
+        # Stop workers from processing a file that is about to disappear
+        cancel_pipelines([self.object.id])
+        return super().form_valid(form)
+
 
 class TopicListView(LoginRequiredMixin, ListView):
     model = Topic
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='ingest_concurrency',
+            field=models.PositiveIntegerField(blank=True, help_text='Maximum number of files of this user processed at once. Leave empty for the default.', null=True, verbose_name='Ingest Concurrency'),
+        ),
+    ]
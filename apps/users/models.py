@@ -1,5 +1,15 @@
 from django.contrib.auth.models import AbstractUser
+from django.db import models
+from django.utils.translation import gettext_lazy as _
 
 
 class CustomUser(AbstractUser):
-    pass
+    ingest_concurrency = models.PositiveIntegerField(
+        _('Ingest Concurrency'),
+        null=True,
+        blank=True,
+        help_text=_(
+            'Maximum number of files of this user processed at once. '
+            'Leave empty for the default.'
+        ),
+    )
@@ -9,3 +9,6 @@ app = Celery('config')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 
 app.autodiscover_tasks()
+
+# Registers the per-task RSS logging of workers
+import config.worker_memory  # noqa: E402,F401
@@ -79,6 +79,12 @@ DATABASES = {
     'default': env.db(),
 }
 
+# Cache shared by the web process and the workers: generation locks,
+# throttles and the regeneration sweep cursor have to be seen by all of them
+CACHES = {
+    'default': env.cache('CACHE_URL', default='redis://localhost:6379/1'),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -147,6 +153,32 @@ CELERY_RESULT_BACKEND = env(
     'CELERY_RESULT_BACKEND', default='redis://localhost:6379/0'
 )
 
+# Queues per workload, see the worker profiles in docker-compose.yaml:
+# ingest - transcription/OCR (CPU/GPU-heavy), released by the fair scheduler,
+# media - duplicate fingerprints and archival transcoding (ffmpeg, CPU-bound),
+# llm - LLM calls (I/O-bound), embed - embeddings and vector store writes
+# (I/O-bound), default - the rest
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_ROUTES = {
+    'apps.library.tasks.analyze_media': {'queue': 'ingest'},
+    'apps.library.tasks.archive_media': {'queue': 'media'},
+    'apps.library.tasks.check_duplicates': {'queue': 'media'},
+    'apps.library.tasks.summarize_media': {'queue': 'llm'},
+    'apps.learning.tasks.generate_content_from_media': {'queue': 'llm'},
+    'apps.learning.tasks.generate_concept_quiz': {'queue': 'llm'},
+    'apps.learning.tasks.prefetch_plan_quizzes': {'queue': 'llm'},
+    'apps.learning.tasks.regenerate_study_plan': {'queue': 'llm'},
+    'apps.learning.tasks.regenerate_quizzes': {'queue': 'llm'},
+    'apps.library.tasks.index_media': {'queue': 'embed'},
+}
+# Long ingest tasks are acknowledged late; keep them from being redelivered
+# by Redis while they are still running
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'visibility_timeout': env.int(
+        'CELERY_VISIBILITY_TIMEOUT', default=6 * 60 * 60
+    ),
+}
+
 # WhisperX
 WHISPER_MODEL = env('WHISPER_MODEL_SIZE', default='large-v2')
 WHISPER_DEVICE = env('WHISPER_DEVICE', default='cuda')
@@ -158,3 +190,172 @@ OPENAI_MODEL = env('OPENAI_MODEL', default='gpt-4o-mini')
 
 DEEPSEEK_API_KEY = env('DEEPSEEK_API_KEY', default='')
 DEEPSEEK_MODEL = env('DEEPSEEK_MODEL', default='deepseek-chat')
+
+# Hedged LLM requests for interactive calls (Tutor)
+LLM_HEDGING_ENABLED = env.bool('LLM_HEDGING_ENABLED', default=False)
+LLM_HEDGE_PERCENTILE = env.float('LLM_HEDGE_PERCENTILE', default=95.0)
+LLM_HEDGE_MIN_SAMPLES = env.int('LLM_HEDGE_MIN_SAMPLES', default=20)
+LLM_HEDGE_DEFAULT_DELAY = env.float('LLM_HEDGE_DEFAULT_DELAY', default=8.0)
+LLM_HEDGE_MIN_DELAY = env.float('LLM_HEDGE_MIN_DELAY', default=1.0)
+LLM_HEDGE_SECONDARY_PROVIDER = env.bool(
+    'LLM_HEDGE_SECONDARY_PROVIDER', default=False
+)
+
+# Quiz generation
+QUIZ_BATCH_TOKEN_BUDGET = env.int('QUIZ_BATCH_TOKEN_BUDGET', default=6000)
+QUIZ_BATCH_MAX_CONCEPTS = env.int('QUIZ_BATCH_MAX_CONCEPTS', default=8)
+QUIZ_OUTPUT_TOKENS_PER_CONCEPT = env.int(
+    'QUIZ_OUTPUT_TOKENS_PER_CONCEPT', default=600
+)
+QUIZ_CONTEXT_TOKENS_PER_CONCEPT = env.int(
+    'QUIZ_CONTEXT_TOKENS_PER_CONCEPT', default=500
+)
+
+# Concept extraction
+CONCEPT_EXTRACTION_CHUNK_TOKENS = env.int(
+    'CONCEPT_EXTRACTION_CHUNK_TOKENS', default=6000
+)
+CONCEPT_EXTRACTION_CONCURRENCY = env.int(
+    'CONCEPT_EXTRACTION_CONCURRENCY', default=4
+)
+CONCEPT_MERGE_SIMILARITY = env.float('CONCEPT_MERGE_SIMILARITY', default=0.9)
+
+# Regeneration of content made with outdated prompts
+REGENERATION_SWEEP_INTERVAL = env.int(
+    'REGENERATION_SWEEP_INTERVAL', default=15 * 60
+)
+REGENERATION_SWEEP_BATCH_SIZE = env.int(
+    'REGENERATION_SWEEP_BATCH_SIZE', default=20
+)
+CELERY_BEAT_SCHEDULE = {
+    'sweep-stale-content': {
+        'task': 'apps.library.tasks.sweep_stale_content',
+        'schedule': REGENERATION_SWEEP_INTERVAL,
+    },
+}
+
+# Compressed storage of transcriptions and summaries
+TEXT_COMPRESSION_LEVEL = env.int('TEXT_COMPRESSION_LEVEL', default=10)
+
+# Per-user fair scheduling of ingest work
+FAIR_SCHEDULING_ENABLED = env.bool('FAIR_SCHEDULING_ENABLED', default=True)
+FAIR_SCHEDULER_REDIS_URL = env(
+    'FAIR_SCHEDULER_REDIS_URL', default=CELERY_BROKER_URL
+)
+FAIR_SCHEDULER_MAX_IN_FLIGHT = env.int(
+    'FAIR_SCHEDULER_MAX_IN_FLIGHT', default=2
+)
+FAIR_SCHEDULER_USER_CONCURRENCY = env.int(
+    'FAIR_SCHEDULER_USER_CONCURRENCY', default=1
+)
+FAIR_SCHEDULER_COST_UNIT_MB = env.float(
+    'FAIR_SCHEDULER_COST_UNIT_MB', default=50.0
+)
+FAIR_SCHEDULER_QUANTUM = env.float('FAIR_SCHEDULER_QUANTUM', default=1.0)
+FAIR_SCHEDULER_DEFAULT_JOB_SECONDS = env.int(
+    'FAIR_SCHEDULER_DEFAULT_JOB_SECONDS', default=5 * 60
+)
+CELERY_BEAT_SCHEDULE['dispatch-ingest'] = {
+    'task': 'apps.library.tasks.dispatch_ingest',
+    'schedule': env.int('FAIR_SCHEDULER_TICK', default=60),
+}
+# Warn on upload when the ingest backlog takes longer than this to clear
+UPLOAD_BACKLOG_WARNING_MINUTES = env.int(
+    'UPLOAD_BACKLOG_WARNING_MINUTES', default=30
+)
+
+# Bulk actions: larger selections run as a background BulkJob
+BULK_ACTION_INLINE_LIMIT = env.int('BULK_ACTION_INLINE_LIMIT', default=200)
+BULK_DISPATCH_BATCH_SIZE = env.int('BULK_DISPATCH_BATCH_SIZE', default=500)
+
+# Resumable chunked uploads
+UPLOAD_CHUNK_SIZE = env.int('UPLOAD_CHUNK_SIZE', default=8 * 1024 * 1024)
+UPLOAD_SESSION_DIR = env('UPLOAD_SESSION_DIR', default=MEDIA_ROOT / 'partial')
+UPLOAD_SESSION_TTL_HOURS = env.int('UPLOAD_SESSION_TTL_HOURS', default=24)
+CELERY_BEAT_SCHEDULE['cleanup-upload-sessions'] = {
+    'task': 'apps.library.tasks.cleanup_upload_sessions',
+    'schedule': 60 * 60,
+}
+
+# Cache of files derived from uploads (extracted audio, OCR images)
+ARTIFACT_CACHE_DIR = env('ARTIFACT_CACHE_DIR', default=BASE_DIR / 'artifact_cache')
+ARTIFACT_CACHE_MAX_BYTES = env.int(
+    'ARTIFACT_CACHE_MAX_BYTES', default=10 * 1024 * 1024 * 1024
+)
+ARTIFACT_CACHE_MIN_AGE = env.int('ARTIFACT_CACHE_MIN_AGE', default=60 * 60)
+OCR_MAX_IMAGE_SIDE = env.int('OCR_MAX_IMAGE_SIDE', default=4000)
+
+# Media storage: local disk, or an S3-compatible bucket (AWS, MinIO, ...)
+# so that workers on other nodes can process uploads. Requires the `s3`
+# extra (django-storages).
+MEDIA_STORAGE = env('MEDIA_STORAGE', default='local')
+if MEDIA_STORAGE == 's3':
+    STORAGES = {
+        'default': {
+            'BACKEND': 'storages.backends.s3.S3Storage',
+            'OPTIONS': {
+                'bucket_name': env('S3_BUCKET_NAME'),
+                'endpoint_url': env('S3_ENDPOINT_URL', default=None),
+                'access_key': env('S3_ACCESS_KEY_ID', default=None),
+                'secret_key': env('S3_SECRET_ACCESS_KEY', default=None),
+                'region_name': env('S3_REGION_NAME', default=None),
+                'file_overwrite': False,
+            },
+        },
+        'staticfiles': {
+            'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+        },
+    }
+# Write derived artifacts back to the media storage for other nodes
+ARTIFACT_CACHE_REMOTE = env.bool(
+    'ARTIFACT_CACHE_REMOTE', default=MEDIA_STORAGE == 's3'
+)
+
+# Archival transcoding of processed audio/video originals
+ARCHIVAL_ENABLED = env.bool('ARCHIVAL_ENABLED', default=False)
+ARCHIVAL_AUDIO_BITRATE = env('ARCHIVAL_AUDIO_BITRATE', default='32k')
+ARCHIVAL_VIDEO_MAX_HEIGHT = env.int('ARCHIVAL_VIDEO_MAX_HEIGHT', default=720)
+ARCHIVAL_VIDEO_CRF = env.int('ARCHIVAL_VIDEO_CRF', default=28)
+# Keep the original unless the rendition is at least this much smaller
+ARCHIVAL_MIN_SAVINGS = env.float('ARCHIVAL_MIN_SAVINGS', default=0.2)
+
+# Flag uploads that duplicate an already processed item
+DUPLICATE_DETECTION_ENABLED = env.bool(
+    'DUPLICATE_DETECTION_ENABLED', default=True
+)
+# Max differing bits of perceptual hashes (at most 7 are found via the index)
+DUPLICATE_MAX_DISTANCE = env.int('DUPLICATE_MAX_DISTANCE', default=6)
+
+# Worker memory: RSS is logged after every task, and prefork children (the
+# ingest worker) are replaced once it exceeds this, see config/worker_memory.py
+WORKER_MAX_MEMORY_MB = env.int('WORKER_MAX_MEMORY_MB', default=8192)
+CELERY_WORKER_MAX_MEMORY_PER_CHILD = WORKER_MAX_MEMORY_MB * 1024 or None  # KiB
+
+# Per-stage time limits in seconds. At the soft limit the stage fails and
+# its pipeline stops; the hard limit kills the worker process if the task
+# does not stop within STAGE_TIME_LIMIT_GRACE. Enforced by prefork pools
+# (the ingest worker); thread pools rely on the API clients' timeouts.
+STAGE_SOFT_TIME_LIMITS = {
+    'analyze': env.int('ANALYZE_SOFT_TIME_LIMIT', default=4 * 60 * 60),
+    'summarize': env.int('SUMMARIZE_SOFT_TIME_LIMIT', default=15 * 60),
+    'content': env.int('CONTENT_SOFT_TIME_LIMIT', default=30 * 60),
+    'index': env.int('INDEX_SOFT_TIME_LIMIT', default=15 * 60),
+}
+STAGE_TIME_LIMIT_GRACE = env.int('STAGE_TIME_LIMIT_GRACE', default=120)
+STAGE_TASKS = {
+    'analyze': 'apps.library.tasks.analyze_media',
+    'summarize': 'apps.library.tasks.summarize_media',
+    'content': 'apps.learning.tasks.generate_content_from_media',
+    'index': 'apps.library.tasks.index_media',
+}
+CELERY_TASK_ANNOTATIONS = {
+    task: {
+        'soft_time_limit': STAGE_SOFT_TIME_LIMITS[stage],
+        'time_limit': STAGE_SOFT_TIME_LIMITS[stage] + STAGE_TIME_LIMIT_GRACE,
+    }
+    for stage, task in STAGE_TASKS.items()
+}
+# Cancelled runs stop transcribing at the next window boundary
+TRANSCRIPTION_WINDOW_SECONDS = env.int(
+    'TRANSCRIPTION_WINDOW_SECONDS', default=10 * 60
+)
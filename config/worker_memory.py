@@ -0,0 +1,65 @@
+"""
+Memory watchdog for Celery workers.
+
+Logs the resident set size of the worker process after every task, so
+that workers can be sized from real numbers. Torch and the allocator keep
+memory after a transcription even with gc.collect() and empty_cache(), so
+prefork children (the ingest worker) are replaced once they cross
+WORKER_MAX_MEMORY_MB: Celery checks CELERY_WORKER_MAX_MEMORY_PER_CHILD after
+the child has reported the result, so no task is interrupted.
+"""
+
+import logging
+import os
+from typing import Optional
+
+from celery.signals import task_postrun, task_prerun
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+_rss_before = {}
+
+
+def current_rss() -> Optional[int]:
+    """
+    Current RSS of this process in bytes, or None where /proc is missing.
+    Unlike ru_maxrss it goes down when memory is returned to the system.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE')
+
+
+@task_prerun.connect
+def sample_rss_before_task(task_id=None, **kwargs):
+    rss = current_rss()
+    if rss is not None:
+        _rss_before[task_id] = rss
+
+
+@task_postrun.connect
+def check_rss_after_task(task_id=None, task=None, **kwargs):
+    before = _rss_before.pop(task_id, None)
+    rss = current_rss()
+    if rss is None:
+        return
+
+    growth = f' ({(rss - before) / MB:+.0f} MB)' if before is not None else ''
+    logger.info(
+        f'Worker {os.getpid()} RSS after {task.name}[{task_id}]: '
+        f'{rss / MB:.0f} MB{growth}'
+    )
+
+    limit = settings.WORKER_MAX_MEMORY_MB
+    if limit and rss > limit * MB:
+        logger.warning(
+            f'Worker {os.getpid()} RSS {rss / MB:.0f} MB exceeds '
+            f'WORKER_MAX_MEMORY_MB={limit}, recycling the process '
+            'after this task (prefork pools only)'
+        )
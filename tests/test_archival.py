@@ -0,0 +1,80 @@
+import hashlib
+from pathlib import Path
+
+import pytest
+from django.core.files.base import ContentFile
+
+from apps.library import tasks
+from apps.library.models import MediaItem
+from apps.library.services.pipeline import create_pipeline_run
+
+ORIGINAL = b"\x00" * 10_000
+
+
+@pytest.fixture
+def media_item(create_user, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    item = MediaItem(
+        user=create_user(),
+        title="Lecture",
+        media_type=MediaItem.MediaType.AUDIO,
+        status=MediaItem.Status.COMPLETED,
+    )
+    item.file.save("lecture.wav", ContentFile(ORIGINAL))
+    return item
+
+
+def fake_transcode(size, before_write=None):
+    def transcode(source_path, output, bitrate):
+        if before_write:
+            before_write()
+        output.write_bytes(b"\x01" * size)
+
+    return transcode
+
+
+def test_compact_rendition_replaces_original(media_item, monkeypatch):
+    monkeypatch.setattr(tasks, "transcode_audio", fake_transcode(1_000))
+    original_path = media_item.file.path
+
+    tasks.archive_media(media_item.id)
+
+    media_item.refresh_from_db()
+    assert media_item.file.name.endswith(".ogg")
+    assert media_item.file.read() == b"\x01" * 1_000
+    assert media_item.original_sha256 == hashlib.sha256(ORIGINAL).hexdigest()
+    assert media_item.reclaimed_bytes == 9_000
+    assert media_item.archived_at
+    assert not Path(original_path).exists()
+
+
+def test_original_is_kept_without_enough_savings(media_item, monkeypatch):
+    monkeypatch.setattr(tasks, "transcode_audio", fake_transcode(9_500))
+    name = media_item.file.name
+
+    tasks.archive_media(media_item.id)
+
+    media_item.refresh_from_db()
+    assert media_item.file.name == name
+    assert media_item.file.read() == ORIGINAL
+    assert media_item.reclaimed_bytes == 0
+    assert media_item.archived_at
+
+
+def test_reanalysis_during_transcode_keeps_original(
+    media_item, monkeypatch, tmp_path
+):
+    monkeypatch.setattr(
+        tasks,
+        "transcode_audio",
+        fake_transcode(1_000, lambda: create_pipeline_run(media_item)),
+    )
+    name = media_item.file.name
+
+    tasks.archive_media(media_item.id)
+
+    media_item.refresh_from_db()
+    assert media_item.file.name == name
+    assert media_item.file.read() == ORIGINAL
+    assert media_item.archived_at is None
+    assert not list(tmp_path.rglob("*.ogg"))
@@ -0,0 +1,57 @@
+import os
+import time
+
+from apps.library.services.artifact_cache import ArtifactCache
+
+
+def build_with(content: bytes, calls: list):
+    def build(output):
+        calls.append(output)
+        output.write_bytes(content)
+
+    return build
+
+
+def test_artifacts_are_reused_by_source_and_params(tmp_path):
+    cache = ArtifactCache(tmp_path, max_bytes=1000, min_age=0)
+    calls = []
+
+    def get(content, rate):
+        return cache.get_or_create(
+            "abc", "audio", ".wav", build_with(content, calls), rate=rate
+        )
+
+    first = get(b"1", 16000)
+    again = get(b"2", 16000)
+    other = get(b"3", 8000)
+
+    assert first == again != other
+    assert len(calls) == 2
+    assert first.read_bytes() == b"1"
+    assert not [p for p in tmp_path.glob("*/.*")]
+
+
+def test_least_recently_used_artifacts_are_evicted(tmp_path):
+    cache = ArtifactCache(tmp_path, max_bytes=250, min_age=0)
+    paths = [
+        cache.get_or_create(str(i), "audio", ".wav", build_with(b"x" * 100, []))
+        for i in range(2)
+    ]
+    old = time.time() - 100
+    os.utime(paths[0], (old, old - 10))
+    os.utime(paths[1], (old, old))
+
+    # Using the older artifact makes the other one least recently used
+    cache.get_or_create("0", "audio", ".wav", build_with(b"", []))
+    cache.get_or_create("2", "audio", ".wav", build_with(b"x" * 100, []))
+
+    assert paths[0].exists()
+    assert not paths[1].exists()
+
+
+def test_recently_used_artifacts_are_kept_over_budget(tmp_path):
+    cache = ArtifactCache(tmp_path, max_bytes=50, min_age=60)
+    path = cache.get_or_create("0", "audio", ".wav", build_with(b"x" * 100, []))
+
+    assert cache.evict() == 0
+    assert path.exists()
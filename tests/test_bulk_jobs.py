@@ -0,0 +1,67 @@
+from django.urls import reverse
+
+from apps.library import tasks, views
+from apps.library.models import BulkJob, MediaItem, PipelineRun
+from apps.library.services.pipeline import create_pipeline_run
+
+
+def test_redelivered_bulk_job_does_not_restart_dispatched_items(
+    create_user, settings, monkeypatch
+):
+    dispatched = []
+    monkeypatch.setattr(
+        tasks,
+        "dispatch_pipelines",
+        lambda pairs, first_stage: dispatched.extend(i.id for i, _ in pairs),
+    )
+    settings.BULK_DISPATCH_BATCH_SIZE = 2
+    user = create_user()
+    items = [
+        MediaItem.objects.create(user=user, title=f"Item {i}", file="a.txt")
+        for i in range(3)
+    ]
+    bulk_job = BulkJob.objects.create(
+        user=user,
+        action=BulkJob.Action.REANALYZE,
+        media_item_ids=[item.id for item in items],
+        total=3,
+    )
+    # The worker died after dispatching the first item's pipeline, before
+    # the batch was recorded as processed
+    create_pipeline_run(items[0])
+
+    assert tasks.run_bulk_job.acks_late
+    tasks.run_bulk_job(bulk_job.id)
+
+    assert dispatched == [items[1].id, items[2].id]
+    assert PipelineRun.objects.filter(media_item=items[0]).count() == 1
+    bulk_job.refresh_from_db()
+    assert bulk_job.status == BulkJob.Status.COMPLETED
+    assert bulk_job.processed == 3
+
+
+def test_bulk_actions_only_touch_own_items(
+    create_user, api_client, monkeypatch
+):
+    owner = create_user()
+    other = create_user(username="other", email="other@example.com")
+    own_item = MediaItem.objects.create(user=owner, title="Own", file="a.txt")
+    foreign_item = MediaItem.objects.create(
+        user=other, title="Foreign", file="b.txt"
+    )
+    cancelled = []
+    monkeypatch.setattr(
+        views,
+        "cancel_pipelines",
+        lambda ids: cancelled.extend(ids) or len(cancelled),
+    )
+    api_client.force_login(owner)
+
+    for action in ("cancel", "delete"):
+        api_client.post(
+            reverse("library:bulk_action"),
+            {"action": action, "media_ids": [own_item.id, foreign_item.id]},
+        )
+
+    assert cancelled == [own_item.id, own_item.id]
+    assert list(MediaItem.objects.all()) == [foreign_item]
@@ -0,0 +1,120 @@
+import hashlib
+import json
+
+import pytest
+from django.urls import reverse
+
+from apps.library import views
+from apps.library.models import MediaItem, UploadSession
+from apps.library.services.uploads import complete_upload
+
+CONTENT = b"Lecture notes. " * 100
+
+
+@pytest.fixture
+def client(api_client, create_user, settings, tmp_path, monkeypatch):
+    settings.MEDIA_ROOT = tmp_path
+    settings.UPLOAD_SESSION_DIR = tmp_path / "partial"
+    settings.UPLOAD_CHUNK_SIZE = 512
+    monkeypatch.setattr(views, "start_upload_processing", lambda item: None)
+    api_client.force_login(create_user())
+    return api_client
+
+
+def create_session(client) -> dict:
+    response = client.post(
+        reverse("library:upload_session_create"),
+        json.dumps({"filename": "notes.txt", "size": len(CONTENT), "tags": "a, b"}),
+        content_type="application/json",
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+def put_chunk(client, url, offset, chunk, checksum=None):
+    checksum = checksum or hashlib.sha256(chunk).hexdigest()
+    return client.put(
+        url,
+        chunk,
+        content_type="application/octet-stream",
+        HTTP_UPLOAD_OFFSET=str(offset),
+        HTTP_UPLOAD_CHECKSUM=f"sha256 {checksum}",
+    )
+
+
+def test_chunked_upload_resumes_and_creates_item(client):
+    session = create_session(client)
+    url = session["url"]
+
+    assert put_chunk(client, url, 0, CONTENT[:512]).json()["offset"] == 512
+
+    # A chunk with a wrong checksum is rejected and the offset stays
+    response = put_chunk(client, url, 512, CONTENT[512:1024], checksum="0" * 64)
+    assert response.status_code == 400
+    assert response.json()["offset"] == 512
+
+    # A retried chunk at a stale offset tells the client where to resume
+    response = put_chunk(client, url, 0, CONTENT[:512])
+    assert response.status_code == 409
+    assert response.json()["offset"] == 512
+
+    offset = client.get(url).json()["offset"]
+    while offset < len(CONTENT):
+        state = put_chunk(client, url, offset, CONTENT[offset : offset + 512])
+        offset = state.json()["offset"]
+
+    state = state.json()
+    assert state["complete"]
+
+    media_item = MediaItem.objects.get(id=state["media_item_id"])
+    assert media_item.file.read() == CONTENT
+    assert media_item.media_type == MediaItem.MediaType.TEXT
+    assert set(media_item.tags.names()) == {"a", "b"}
+
+    upload = UploadSession.objects.get(id=session["id"])
+    assert not upload.partial_path.exists()
+
+    # A request that read the session before it was completed does not
+    # complete it again
+    upload.status = UploadSession.Status.ACTIVE
+    assert complete_upload(upload) is None
+    assert MediaItem.objects.count() == 1
+
+
+def test_failed_completion_keeps_the_upload_resumable(client, monkeypatch):
+    session = create_session(client)
+    url = session["url"]
+    offset = 0
+    while offset + 512 < len(CONTENT):
+        state = put_chunk(client, url, offset, CONTENT[offset : offset + 512])
+        offset = state.json()["offset"]
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("database unavailable")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(UploadSession, "save", fail)
+        with pytest.raises(RuntimeError):
+            put_chunk(client, url, offset, CONTENT[offset:])
+
+    upload = UploadSession.objects.get(id=session["id"])
+    assert upload.status == UploadSession.Status.ACTIVE
+    assert upload.partial_path.exists()
+    assert not MediaItem.objects.exists()
+
+    # The whole file was received: an empty chunk completes it again
+    state = client.get(url).json()
+    assert state["offset"] == len(CONTENT) and not state["complete"]
+    state = put_chunk(client, url, len(CONTENT), b"").json()
+    assert state["complete"]
+    media_item = MediaItem.objects.get(id=state["media_item_id"])
+    assert media_item.file.read() == CONTENT
+
+
+def test_unsupported_extension_is_rejected(client):
+    response = client.post(
+        reverse("library:upload_session_create"),
+        json.dumps({"filename": "archive.zip", "size": 10}),
+        content_type="application/json",
+    )
+    assert response.status_code == 400
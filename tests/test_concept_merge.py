@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from apps.learning.schemas import ConceptListSchema, ConceptSchema
+from apps.learning.services import ai_service
+from apps.learning.services.ai_service import AIService
+from apps.learning.services.concept_merge import merge_similar_concepts
+
+
+def concept(title, description="Desc", complexity=2):
+    return ConceptSchema(
+        title=title, description=description, complexity=complexity
+    )
+
+
+def test_merge_clusters_concepts_above_threshold():
+    concepts = [
+        concept("Entropy", "Disorder", complexity=2),
+        concept("Thermodynamic entropy", "Measure of disorder", complexity=4),
+        concept("Enthalpy", "Heat content", complexity=3),
+    ]
+    embeddings = [[1.0, 0.0], [0.95, 0.31], [0.0, 1.0]]
+
+    merged = merge_similar_concepts(concepts, embeddings, threshold=0.9)
+
+    # The longest description is kept, with the highest complexity
+    assert merged == [
+        concept("Thermodynamic entropy", "Measure of disorder", complexity=4),
+        concept("Enthalpy", "Heat content", complexity=3),
+    ]
+    assert len(merge_similar_concepts(concepts, embeddings, 0.99)) == 3
+
+
+def test_chunked_extraction_dedupes_and_merges(settings, monkeypatch):
+    settings.CONCEPT_EXTRACTION_CHUNK_TOKENS = 10
+    settings.CONCEPT_MERGE_SIMILARITY = 0.9
+
+    class StubAgent:
+        async def arun(self, section, topic_context):
+            return ConceptListSchema(
+                concepts=[
+                    concept("Entropy"),
+                    concept("entropy ", "Measure of disorder"),
+                    concept("Disorder", complexity=5),
+                ]
+            )
+
+    class StubEmbeddings:
+        async def aembed_documents(self, texts):
+            self.texts = texts
+            return [[1.0, 0.0]] * len(texts)
+
+    class StubRAGService:
+        embedding_function = StubEmbeddings()
+
+    monkeypatch.setattr(ai_service, "RAGService", StubRAGService)
+    text = "Entropy is disorder. " * 20
+
+    result = asyncio.run(
+        AIService().extract_concepts_chunked_async(text, agent=StubAgent())
+    )
+
+    # Titles are deduped before embedding, then the rest is merged
+    assert StubRAGService.embedding_function.texts == [
+        "entropy : Measure of disorder",
+        "Disorder: Desc",
+    ]
+    assert result.concepts == [
+        concept("entropy ", "Measure of disorder", complexity=5)
+    ]
+
+
+def test_chunked_extraction_fails_if_every_section_fails(settings):
+    settings.CONCEPT_EXTRACTION_CHUNK_TOKENS = 10
+
+    class FailingAgent:
+        async def arun(self, section, topic_context):
+            raise RuntimeError("LLM unavailable")
+
+    with pytest.raises(ValueError, match="failed for all sections"):
+        asyncio.run(
+            AIService().extract_concepts_chunked_async(
+                "Entropy is disorder. " * 20, agent=FailingAgent()
+            )
+        )
@@ -0,0 +1,19 @@
+from apps.learning.services.context_selection import PassageIndex
+
+
+def test_rank_prefers_passages_with_query_terms():
+    index = PassageIndex(
+        "Photosynthesis converts light into chemical energy.\n\n"
+        "Mitochondria produce energy by respiration.",
+        chunk_size=60,
+        chunk_overlap=0,
+    )
+
+    assert index.rank("photosynthesis light") == [0]
+
+
+def test_passages_without_tokens_match_nothing():
+    index = PassageIndex("1 2 3 ок да")
+
+    assert index.rank("test") == []
+    assert index.select(["test"], token_budget=100) == "1 2 3 ок да"
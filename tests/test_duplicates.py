@@ -0,0 +1,141 @@
+import io
+
+import numpy as np
+import pytest
+from django.core.files.base import ContentFile
+from PIL import Image, ImageDraw
+
+from apps.library import tasks
+from apps.library.models import MediaItem
+from apps.library.services.duplicates import (
+    envelope_fingerprint,
+    find_duplicate,
+    hamming,
+    image_dhash,
+    index_perceptual_hash,
+)
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.ARTIFACT_CACHE_DIR = tmp_path / "artifacts"
+
+
+def slide(size, quality):
+    image = Image.new("RGB", (800, 600), "white")
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((50, 50, 750, 150), fill="navy")
+    draw.ellipse((300, 250, 500, 450), fill="darkred")
+    buffer = io.BytesIO()
+    image.resize(size).save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def test_recompressed_image_is_near_duplicate(tmp_path):
+    original = tmp_path / "a.jpg"
+    original.write_bytes(slide((800, 600), 95))
+    copy = tmp_path / "b.jpg"
+    copy.write_bytes(slide((400, 300), 40))
+
+    assert hamming(image_dhash(original), image_dhash(copy)) <= 6
+
+
+def test_audio_fingerprint_ignores_encoding_differences():
+    rng = np.random.default_rng(0)
+    envelope = np.repeat(rng.uniform(0.1, 1.0, 200), 500)
+    speech = (rng.standard_normal(len(envelope)) * envelope * 8000).astype(
+        np.int16
+    )
+    reencoded = (speech * 0.9 + rng.normal(0, 50, len(speech))).astype(np.int16)
+
+    value = envelope_fingerprint(speech)
+    assert hamming(value, envelope_fingerprint(reencoded)) <= 6
+    assert envelope_fingerprint(speech[:100]) is None
+
+
+def test_find_duplicate_uses_band_index(create_user):
+    user = create_user()
+    original = MediaItem.objects.create(
+        user=user,
+        title="Lecture",
+        media_type=MediaItem.MediaType.AUDIO,
+        status=MediaItem.Status.COMPLETED,
+    )
+    index_perceptual_hash(original, 0x0123456789ABCDEF)
+    upload = MediaItem.objects.create(
+        user=user, title="Lecture (copy)", media_type=MediaItem.MediaType.VIDEO
+    )
+
+    assert find_duplicate(upload, 0x0123456789ABCDEF ^ 0b10110) == original
+    assert find_duplicate(upload, ~0x0123456789ABCDEF & (2**64 - 1)) is None
+
+
+def test_duplicate_upload_is_flagged_and_reuses_results(
+    create_user, api_client, monkeypatch
+):
+    started = []
+    monkeypatch.setattr(
+        tasks, "start_pipeline", lambda item, *args: started.append(item.id)
+    )
+
+    user = create_user()
+    original = MediaItem(
+        user=user,
+        title="Slide",
+        media_type=MediaItem.MediaType.IMAGE,
+        status=MediaItem.Status.COMPLETED,
+    )
+    original.file.save("slide.jpg", ContentFile(slide((800, 600), 95)))
+    tasks.check_duplicates(original.id)
+    original.refresh_from_db()
+    original.transcription = "Slide text"
+    original.summary = "Slide summary"
+    original.save()
+    assert started == [original.id]
+
+    upload = MediaItem(
+        user=user, title="Slide photo", media_type=MediaItem.MediaType.IMAGE
+    )
+    upload.file.save("photo.jpg", ContentFile(slide((640, 480), 50)))
+    tasks.check_duplicates(upload.id)
+
+    upload.refresh_from_db()
+    assert upload.duplicate_of == original
+    assert started == [original.id]
+
+    monkeypatch.setattr(
+        "apps.library.views.start_pipeline",
+        lambda item, *args: started.append((item.id, *args)),
+    )
+    api_client.force_login(user)
+    api_client.post(f"/library/detail/{upload.id}/duplicate/", {"action": "reuse"})
+
+    upload = MediaItem.objects.get(id=upload.id)
+    assert upload.transcription == "Slide text"
+    assert upload.summary == "Slide summary"
+    assert started[-1] == (upload.id, "content")
+    assert upload.duplicate_of is None
+
+    # A repeated submit does not start a second pipeline
+    api_client.post(f"/library/detail/{upload.id}/duplicate/", {"action": "reuse"})
+    assert len(started) == 2
+
+
+def test_deleting_original_rechecks_flagged_uploads(
+    create_user, monkeypatch, django_capture_on_commit_callbacks
+):
+    user = create_user()
+    original = MediaItem.objects.create(
+        user=user, title="Lecture", status=MediaItem.Status.COMPLETED
+    )
+    upload = MediaItem.objects.create(
+        user=user, title="Lecture (copy)", duplicate_of=original
+    )
+    checked = []
+    monkeypatch.setattr(tasks.check_duplicates, "delay", checked.append)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        original.delete()
+
+    assert checked == [upload.id]
@@ -0,0 +1,60 @@
+from unittest import mock
+
+from apps.library.services.fair_scheduler import (
+    DRRState,
+    FairScheduler,
+    drr_schedule,
+)
+
+
+def jobs(prefix: str, count: int, cost: float = 1.0) -> list[dict]:
+    return [{"media_item_id": f"{prefix}{i}", "cost": cost} for i in range(count)]
+
+
+def ids(started) -> list[str]:
+    return [job["media_item_id"] for job in started]
+
+
+def test_users_take_turns_by_cost():
+    state = DRRState(
+        ring=["a", "b"],
+        queues={"a": jobs("a", 6), "b": jobs("b", 2, cost=3.0)},
+    )
+
+    started, new_state = drr_schedule(state, quantum=1.0)
+
+    assert ids(started) == ["a0", "a1", "a2", "b0", "a3", "a4", "a5", "b1"]
+    assert new_state.ring == []
+
+
+def test_caps_and_free_slots_limit_dispatch():
+    state = DRRState(
+        ring=["a", "b"],
+        queues={"a": jobs("a", 3), "b": jobs("b", 3)},
+        running={"a": 1},
+    )
+
+    started, new_state = drr_schedule(
+        state, quantum=1.0, free_slots=2, caps={"a": 1, "b": 5}
+    )
+
+    assert ids(started) == ["b0", "b1"]
+    assert new_state.queues["a"] == jobs("a", 3)
+    assert set(new_state.ring) == {"a", "b"}
+
+
+def test_queue_infos_use_one_round_trip(settings):
+    settings.FAIR_SCHEDULER_MAX_IN_FLIGHT = 2
+    client = mock.MagicMock()
+    client.pipeline.return_value.execute.return_value = [
+        ["1", None, "4"],
+        ["2"],
+        "60",
+    ]
+
+    infos = FairScheduler(client).queue_infos([10, 11, 12])
+
+    assert client.pipeline.return_value.execute.call_count == 1
+    assert set(infos) == {10, 12}
+    assert infos[10][0] == 1
+    assert (infos[12][1] - infos[10][1]).total_seconds() == 60
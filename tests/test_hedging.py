@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+import pytest
+
+from apps.learning.services.hedging import LatencyTracker, hedged_call
+
+
+def make_stub(latency: float, result: str, calls: dict, fail: bool = False):
+    """Builds an LLM call stub that injects `latency` seconds of delay."""
+
+    async def _call():
+        calls[result] = "started"
+        try:
+            await asyncio.sleep(latency)
+        except asyncio.CancelledError:
+            calls[result] = "cancelled"
+            raise
+        calls[result] = "finished"
+        if fail:
+            raise RuntimeError(f"{result} failed")
+        return result
+
+    return _call
+
+
+def test_fast_primary_is_not_hedged():
+    calls = {}
+
+    result = asyncio.run(
+        hedged_call(
+            make_stub(0.01, "primary", calls),
+            make_stub(0.01, "hedge", calls),
+            delay=0.5,
+        )
+    )
+
+    assert result == "primary"
+    assert "hedge" not in calls
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    calls = {}
+    tracker = LatencyTracker()
+
+    started_at = time.monotonic()
+    result = asyncio.run(
+        hedged_call(
+            make_stub(5.0, "primary", calls),
+            make_stub(0.05, "hedge", calls),
+            delay=0.1,
+            tracker=tracker,
+        )
+    )
+    elapsed = time.monotonic() - started_at
+
+    assert result == "hedge"
+    assert calls["primary"] == "cancelled"
+    assert elapsed < 1.0
+    # The cancelled primary is recorded with the time it had run, not the
+    # hedge's own latency
+    assert tracker.percentile(50) == pytest.approx(0.15, abs=0.05)
+
+
+def test_early_primary_failure_fires_hedge():
+    calls = {}
+    tracker = LatencyTracker()
+
+    result = asyncio.run(
+        hedged_call(
+            make_stub(0.01, "primary", calls, fail=True),
+            make_stub(0.01, "hedge", calls),
+            delay=5.0,
+            tracker=tracker,
+        )
+    )
+
+    assert result == "hedge"
+    assert tracker.percentile(50) is None
+
+
+def test_failed_hedge_falls_back_to_primary():
+    calls = {}
+
+    result = asyncio.run(
+        hedged_call(
+            make_stub(0.3, "primary", calls),
+            make_stub(0.01, "hedge", calls, fail=True),
+            delay=0.05,
+        )
+    )
+
+    assert result == "primary"
+
+
+def test_both_failed_raises():
+    calls = {}
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(
+            hedged_call(
+                make_stub(0.1, "primary", calls, fail=True),
+                make_stub(0.01, "hedge", calls, fail=True),
+                delay=0.05,
+            )
+        )
+
+
+def test_hedge_delay_uses_percentile(settings):
+    settings.LLM_HEDGE_MIN_SAMPLES = 10
+    settings.LLM_HEDGE_PERCENTILE = 90
+    settings.LLM_HEDGE_MIN_DELAY = 0.0
+    settings.LLM_HEDGE_DEFAULT_DELAY = 8.0
+    tracker = LatencyTracker()
+
+    assert tracker.hedge_delay() == 8.0
+
+    for seconds in range(1, 11):
+        tracker.record(float(seconds))
+
+    assert tracker.hedge_delay() == 9.0
@@ -0,0 +1,132 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.learning.models import (
+    Concept,
+    Flashcard,
+    QuizQuestion,
+    StudyPlan,
+    StudyUnit,
+)
+from apps.learning.schemas import (
+    ConceptSchema,
+    QuizQuestionSchema,
+    QuizSchema,
+    StudyPlanSchema,
+    StudyUnitSchema,
+)
+from apps.learning.services.persistence import (
+    save_concepts,
+    save_quiz_questions,
+    save_study_plan,
+)
+from apps.library.models import MediaItem
+
+
+@pytest.fixture
+def media_item(create_user):
+    return MediaItem.objects.create(
+        user=create_user(), title="Lecture", file="uploads/lecture.txt"
+    )
+
+
+def persist_generated_content(media_item, concept_count: int):
+    concept_schemas = [
+        ConceptSchema(title=f"Concept {i}", description="Desc", complexity=2)
+        for i in range(concept_count)
+    ]
+    plan_schema = StudyPlanSchema(
+        title="Plan",
+        units=[
+            StudyUnitSchema(
+                concept_title=f"Concept {i}", order=i, description=""
+            )
+            for i in range(concept_count)
+        ],
+    )
+    question = QuizQuestionSchema(
+        question="Q?", options=["A", "B"], correct_index=0, explanation="E"
+    )
+
+    concepts = save_concepts(media_item, concept_schemas)
+    save_study_plan(media_item, plan_schema, concepts)
+    save_quiz_questions(
+        [(c, QuizSchema(questions=[question] * 3)) for c in concepts]
+    )
+
+
+@pytest.mark.parametrize("concept_count", [3, 30])
+def test_persistence_query_count_is_constant(media_item, concept_count):
+    with CaptureQueriesContext(connection) as small:
+        persist_generated_content(media_item, 1)
+
+    media_item.concepts.all().delete()
+    media_item.study_plans.all().delete()
+
+    with CaptureQueriesContext(connection) as large:
+        persist_generated_content(media_item, concept_count)
+
+    assert len(large) == len(small)
+    assert Concept.objects.filter(media_item=media_item).count() == (
+        concept_count
+    )
+    assert Flashcard.objects.count() == concept_count
+    assert StudyUnit.objects.count() == concept_count
+    assert QuizQuestion.objects.count() == concept_count * 3
+
+
+def test_save_concepts_upserts_and_keeps_srs_state(media_item):
+    schema = ConceptSchema(title="Concept", description="Old", complexity=1)
+    (concept,) = save_concepts(media_item, [schema])
+    Flashcard.objects.filter(concept=concept).update(reps=4)
+
+    updated = schema.model_copy(update={"description": "New"})
+    (same_concept,) = save_concepts(media_item, [updated])
+
+    assert same_concept.id == concept.id
+    card = Flashcard.objects.get(concept=concept)
+    assert card.back == "New"
+    assert card.reps == 4
+
+
+def test_rerun_replaces_previous_outputs(media_item):
+    persist_generated_content(media_item, 3)
+    StudyUnit.objects.filter(concept__title="Concept 0").update(
+        is_completed=True
+    )
+
+    persist_generated_content(media_item, 2)
+
+    assert list(
+        media_item.concepts.order_by("title").values_list("title", flat=True)
+    ) == ["Concept 0", "Concept 1"]
+    plan = StudyPlan.objects.get(
+        media_item=media_item, status=StudyPlan.Status.ACTIVE
+    )
+    assert media_item.study_plans.filter(
+        status=StudyPlan.Status.ARCHIVED
+    ).count() == 1
+    assert list(
+        plan.units.order_by("order").values_list("is_completed", flat=True)
+    ) == [True, False]
+    assert QuizQuestion.objects.count() == 2 * 3
+
+
+def test_save_quiz_questions_drops_leftover_positions(media_item):
+    (concept,) = save_concepts(
+        media_item,
+        [ConceptSchema(title="Concept", description="Desc", complexity=1)],
+    )
+    question = QuizQuestionSchema(
+        question="Q?", options=["A", "B"], correct_index=0, explanation="E"
+    )
+
+    save_quiz_questions([(concept, QuizSchema(questions=[question] * 5))])
+    save_quiz_questions([(concept, QuizSchema(questions=[question] * 2))])
+
+    assert list(
+        concept.quiz_questions.order_by("position").values_list(
+            "position", flat=True
+        )
+    ) == [0, 1]
@@ -0,0 +1,92 @@
+import pytest
+from django.core.files.base import ContentFile
+
+from apps.library import tasks
+from apps.library.models import MediaItem, PipelineRun, StageRun
+from apps.library.services.pipeline import (
+    PipelineCancelled,
+    create_pipeline_run,
+    fail_pipeline_run,
+    track_stage,
+)
+
+
+@pytest.fixture
+def revoked(settings, monkeypatch):
+    settings.FAIR_SCHEDULING_ENABLED = False
+    task_ids = []
+    monkeypatch.setattr(
+        tasks.current_app.control, "revoke", lambda ids: task_ids.extend(ids)
+    )
+    return task_ids
+
+
+@pytest.fixture
+def media_item(create_user, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    item = MediaItem(
+        user=create_user(), title="Notes", media_type=MediaItem.MediaType.TEXT
+    )
+    item.file.save("notes.txt", ContentFile(b"Some lecture notes."))
+    return item
+
+
+def test_cancel_revokes_tasks_and_stops_stages(media_item, revoked):
+    run = create_pipeline_run(media_item)
+
+    assert tasks.cancel_pipelines([media_item.id]) == 1
+    assert f"pipeline-{run.id}-analyze" in revoked
+    assert f"pipeline-{run.id}-finalize" in revoked
+
+    run.refresh_from_db()
+    media_item.refresh_from_db()
+    assert run.status == PipelineRun.Status.CANCELLED
+    assert media_item.status == MediaItem.Status.CANCELLED
+    assert set(run.stages.values_list("status", flat=True)) == {
+        StageRun.Status.CANCELLED
+    }
+
+    # A task that was already taken from the queue does no work
+    with pytest.raises(PipelineCancelled):
+        tasks.analyze_media(media_item.id, run.id)
+    assert media_item.transcription == ""
+    assert tasks.cancel_pipelines([media_item.id]) == 0
+
+
+def test_deleting_an_item_cancels_its_pipeline(
+    media_item, revoked, api_client
+):
+    run = create_pipeline_run(media_item)
+    api_client.force_login(media_item.user)
+
+    api_client.post(f"/library/delete/{media_item.id}/")
+
+    assert not MediaItem.objects.filter(id=media_item.id).exists()
+    assert f"pipeline-{run.id}-analyze" in revoked
+    with pytest.raises(PipelineCancelled):
+        tasks.analyze_media(media_item.id, run.id)
+
+
+def test_stage_error_after_item_deletion_is_not_masked(media_item, revoked):
+    run = create_pipeline_run(media_item)
+
+    with pytest.raises(RuntimeError, match="transcription failed"):
+        with track_stage(run.id, StageRun.Stage.ANALYZE):
+            media_item.delete()
+            raise RuntimeError("transcription failed")
+
+    fail_pipeline_run(run.id, "late failure")
+
+
+def test_finalizing_a_run_of_a_deleted_item_is_a_no_op(
+    media_item, revoked, settings, monkeypatch
+):
+    settings.ARCHIVAL_ENABLED = True
+    archived = []
+    monkeypatch.setattr(tasks.archive_media, "delay", archived.append)
+    run = create_pipeline_run(media_item)
+    media_item.delete()
+
+    tasks.finalize_pipeline([], run.id)
+
+    assert archived == []
@@ -0,0 +1,125 @@
+import pytest
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.library import tasks
+from apps.library.models import MediaItem, MediaText
+from apps.library.services.pipeline import create_pipeline_run
+
+
+@pytest.fixture
+def media_item(create_user, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    item = MediaItem(
+        user=create_user(),
+        title="Notes",
+        media_type=MediaItem.MediaType.TEXT,
+    )
+    item.file.save("notes.txt", ContentFile(b"Some lecture notes."))
+    return item
+
+
+def updates_of(queries, table: str) -> list[str]:
+    return [
+        q["sql"]
+        for q in queries
+        if q["sql"].startswith(f'UPDATE "{table}"')
+    ]
+
+
+def text_writes(queries) -> list[str]:
+    return [
+        q["sql"]
+        for q in queries
+        if q["sql"].startswith('INSERT INTO "library_mediatext"')
+    ]
+
+
+def test_analyze_writes_transcription_once(media_item):
+    run = create_pipeline_run(media_item)
+
+    with CaptureQueriesContext(connection) as queries:
+        tasks.analyze_media(media_item.id, run.id)
+
+    assert len(text_writes(queries)) == 1
+
+    item_updates = updates_of(queries, "library_mediaitem")
+    assert not any('"summary_excerpt"' in sql for sql in item_updates)
+    assert not any('"error_log"' in sql for sql in item_updates)
+    assert any('"status"' in sql for sql in item_updates)
+
+    assert any(
+        '"current_step"' in sql
+        for sql in updates_of(queries, "library_pipelinerun")
+    )
+
+    media_item.refresh_from_db()
+    assert media_item.transcription == "Some lecture notes."
+    assert media_item.status == MediaItem.Status.PROCESSING
+
+
+def test_unchanged_analyze_does_not_rewrite_text(media_item):
+    tasks.analyze_media(media_item.id)
+
+    with CaptureQueriesContext(connection) as queries:
+        tasks.analyze_media(media_item.id)
+
+    assert not text_writes(queries)
+
+
+def test_summarize_writes_summary_once(media_item, monkeypatch):
+    media_item.transcription = "Text"
+    media_item.save()
+
+    async def fake_summarize(self, text):
+        return "Summary"
+
+    monkeypatch.setattr(tasks.AIService, "summarize_async", fake_summarize)
+
+    with CaptureQueriesContext(connection) as queries:
+        tasks.summarize_media(media_item.id)
+
+    assert len(text_writes(queries)) == 1
+
+    item_updates = updates_of(queries, "library_mediaitem")
+    assert len(item_updates) == 1
+    assert '"summary_excerpt"' in item_updates[0]
+    assert '"error_log"' not in item_updates[0]
+
+    media_item = MediaItem.objects.get(id=media_item.id)
+    assert media_item.summary == "Summary"
+    assert media_item.summary_excerpt == "Summary"
+
+
+def test_unchanged_item_is_reindexed_after_collection_wipe(
+    media_item, monkeypatch
+):
+    indexed = set()
+
+    class FakeRAGService:
+        def index_media_item(self, item):
+            indexed.add(item.id)
+
+        def has_media_item(self, media_item_id):
+            return media_item_id in indexed
+
+    monkeypatch.setattr(tasks, "RAGService", FakeRAGService)
+    media_item.transcription = "Text"
+    media_item.save()
+
+    tasks.index_media(media_item.id)
+    indexed.clear()
+    tasks.index_media(media_item.id)
+
+    assert indexed == {media_item.id}
+
+
+def test_texts_are_compressed_and_sliceable(media_item):
+    media_item.transcription = "word " * 100_000
+    media_item.save(update_fields=["transcription"])
+
+    text = media_item.texts.get(kind=MediaText.Kind.TRANSCRIPTION)
+    assert len(text.data) < text.length / 10
+    assert text.slice(5, 14) == "word word"
+    assert "".join(text.stream(chunk_size=1000)) == "word " * 100_000
@@ -0,0 +1,127 @@
+import asyncio
+from types import SimpleNamespace
+
+from apps.learning.schemas import (
+    ConceptQuizSchema,
+    ConceptSchema,
+    QuizBatchSchema,
+    QuizQuestionSchema,
+    QuizSchema,
+)
+from apps.learning.services.ai_service import AIService
+
+
+def question(text):
+    return QuizQuestionSchema(
+        question=text, options=["a", "b"], correct_index=0, explanation="-"
+    )
+
+
+class StubLLM:
+    """Answers batch calls with `batch` and single calls per concept title."""
+
+    def __init__(self, batch):
+        self.batch = batch
+        self.single_calls = []
+
+    def with_structured_output(self, schema, include_raw):
+        stub = self
+
+        class Structured:
+            async def ainvoke(self, messages):
+                if schema is QuizBatchSchema:
+                    parsed = stub.batch
+                else:
+                    title = messages[-1].content.split("\n")[0]
+                    stub.single_calls.append(title)
+                    parsed = QuizSchema(questions=[question(f"single {title}")])
+                return {"raw": SimpleNamespace(usage_metadata={}), "parsed": parsed}
+
+        return Structured()
+
+
+def test_batch_quizzes_with_wrong_titles_fall_back_to_single_generation():
+    concepts = [
+        ConceptSchema(title=title, description="Desc", complexity=2)
+        for title in ("Entropy", "Enthalpy", "Gibbs energy", "Free energy")
+    ]
+    llm = StubLLM(
+        QuizBatchSchema(
+            quizzes=[
+                ConceptQuizSchema(
+                    concept_index=0,
+                    concept_title=" entropy ",
+                    questions=[question("q entropy")],
+                ),
+                # 1-based index: "Enthalpy" is [1], not [2]
+                ConceptQuizSchema(
+                    concept_index=2,
+                    concept_title="Enthalpy",
+                    questions=[question("q enthalpy")],
+                ),
+                ConceptQuizSchema(
+                    concept_index=0,
+                    concept_title="Entropy",
+                    questions=[question("q entropy again")],
+                ),
+                # A translated title is trusted by its index
+                ConceptQuizSchema(
+                    concept_index=3,
+                    concept_title="Свободная энергия",
+                    questions=[question("q free energy")],
+                ),
+            ]
+        )
+    )
+
+    results = asyncio.run(
+        AIService().generate_quizzes_batched_async(
+            concepts, "Generate quizzes.", llm=llm
+        )
+    )
+
+    quizzes = {concept.title: quiz for concept, quiz in results}
+    assert quizzes["Entropy"].questions[0].question == "q entropy"
+    assert quizzes["Enthalpy"].questions[0].question == (
+        "single Concept: Enthalpy"
+    )
+    assert quizzes["Gibbs energy"].questions[0].question == (
+        "single Concept: Gibbs energy"
+    )
+    assert quizzes["Free energy"].questions[0].question == "q free energy"
+    assert len(llm.single_calls) == 2
+
+
+def test_shared_context_counts_against_the_batch_budget(settings):
+    settings.QUIZ_BATCH_TOKEN_BUDGET = 2000
+    settings.QUIZ_OUTPUT_TOKENS_PER_CONCEPT = 600
+    concepts = [
+        ConceptSchema(title=f"Concept {i}", description="Desc", complexity=2)
+        for i in range(3)
+    ]
+    batch_sizes = []
+
+    class Recording(StubLLM):
+        def with_structured_output(self, schema, include_raw):
+            structured = super().with_structured_output(schema, include_raw)
+            ainvoke = structured.ainvoke
+
+            async def record(messages):
+                if schema is QuizBatchSchema:
+                    batch_sizes.append(messages[-1].content.count("Concept "))
+                return await ainvoke(messages)
+
+            structured.ainvoke = record
+            return structured
+
+    for context_text, expected in (("", [3]), ("x" * 4000, [1, 1, 1])):
+        batch_sizes.clear()
+        asyncio.run(
+            AIService().generate_quizzes_batched_async(
+                concepts,
+                "Generate quizzes.",
+                context_text=context_text,
+                llm=Recording(QuizBatchSchema(quizzes=[])),
+            )
+        )
+        assert batch_sizes == expected
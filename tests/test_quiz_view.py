@@ -0,0 +1,66 @@
+import pytest
+from django.core.cache import cache
+
+from apps.learning import tasks, views
+from apps.learning.models import Concept, StudyPlan, StudyUnit
+from apps.library.models import MediaItem
+
+
+@pytest.fixture
+def unit(create_user, api_client):
+    user = create_user()
+    media_item = MediaItem.objects.create(
+        user=user, title="Lecture", file="uploads/lecture.txt"
+    )
+    concept = Concept.objects.create(media_item=media_item, title="Entropy")
+    plan = StudyPlan.objects.create(user=user, media_item=media_item)
+    api_client.force_login(user)
+    return StudyUnit.objects.create(plan=plan, concept=concept)
+
+
+def test_missing_quiz_is_generated_in_the_background(
+    unit, api_client, monkeypatch
+):
+    enqueued = []
+    monkeypatch.setattr(views.generate_concept_quiz, "delay", enqueued.append)
+
+    response = api_client.get(f"/learning/quiz/{unit.id}/")
+    api_client.get(f"/learning/quiz/{unit.id}/")
+
+    # Repeated page loads enqueue a single generation
+    assert enqueued == [unit.concept_id]
+    assert response.context["quiz_generating"] is True
+    assert b"being generated" in response.content
+    assert b"Submit Answers" not in response.content
+
+
+def test_quiz_being_prefetched_shows_generating_state(
+    unit, api_client, monkeypatch
+):
+    monkeypatch.setattr(views.generate_concept_quiz, "delay", lambda id: None)
+    cache.set(f"quiz-generation:{unit.concept_id}", True)
+
+    response = api_client.get(f"/learning/quiz/{unit.id}/")
+
+    assert response.context["quiz_generating"] is True
+
+
+def test_failed_quiz_generation_offers_retry(unit, api_client, monkeypatch):
+    attempts = []
+    monkeypatch.setattr(
+        tasks, "generate_missing_quizzes", lambda ids: attempts.append(ids) or 1
+    )
+    # Run the task inline
+    monkeypatch.setattr(
+        views.generate_concept_quiz, "delay", tasks.generate_concept_quiz
+    )
+
+    api_client.get(f"/learning/quiz/{unit.id}/")
+    response = api_client.get(f"/learning/quiz/{unit.id}/")
+
+    assert len(attempts) == 1
+    assert response.context["quiz_generating"] is False
+    assert b"could not be generated" in response.content
+
+    api_client.get(f"/learning/quiz/{unit.id}/?retry=1")
+    assert len(attempts) == 2
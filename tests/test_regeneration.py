@@ -0,0 +1,137 @@
+from django.core.cache import cache
+
+from apps.core.models import ProjectSettings
+from apps.learning import tasks
+from apps.learning.models import Concept, QuizQuestion, StudyPlan
+from apps.learning.schemas import QuizQuestionSchema, QuizSchema
+from apps.learning.services import quiz_pool
+from apps.learning.services.regeneration import (
+    STAGES,
+    concepts_fingerprint,
+    plan_fingerprint,
+    stale_stages,
+)
+from apps.library.models import MediaItem
+
+
+def test_content_without_fingerprints_is_not_regenerated(create_user):
+    media_item = MediaItem.objects.create(
+        user=create_user(), title="Lecture", file="uploads/lecture.txt"
+    )
+    media_item.transcription = "Lecture transcript"
+    media_item.summary = "Lecture summary"
+    media_item.save()
+    Concept.objects.create(media_item=media_item, title="Entropy")
+
+    assert stale_stages(media_item) == []
+
+    media_item.summary_fingerprint = "outdated"
+    assert stale_stages(media_item) == STAGES
+
+
+def test_outdated_concept_fingerprint_regenerates_concepts(create_user):
+    project_settings = ProjectSettings.load()
+    media_item = MediaItem.objects.create(
+        user=create_user(), title="Lecture", file="uploads/lecture.txt"
+    )
+    media_item.transcription = "Lecture transcript"
+    media_item.save()
+    concept = Concept.objects.create(
+        media_item=media_item,
+        title="Entropy",
+        fingerprint=concepts_fingerprint(
+            project_settings, media_item.transcription
+        ),
+    )
+
+    assert stale_stages(media_item, project_settings) == []
+
+    concept.fingerprint = "outdated"
+    concept.save()
+    assert stale_stages(media_item, project_settings) == [
+        "concepts",
+        "plan",
+        "quizzes",
+    ]
+
+
+def test_regeneration_reads_settings_saved_by_another_process():
+    project_settings = ProjectSettings.load()
+    ProjectSettings.objects.filter(pk=1).update(
+        summarization_prompt="Summarize briefly"
+    )
+
+    # The cached copy predates the change, the fresh read does not
+    assert ProjectSettings.load().summarization_prompt != "Summarize briefly"
+    fresh = ProjectSettings.load(fresh=True)
+    assert fresh.summarization_prompt == "Summarize briefly"
+    assert project_settings.pk == fresh.pk
+
+
+def test_stale_quizzes_are_kept_until_replacements_are_generated(
+    create_user, monkeypatch
+):
+    media_item = MediaItem.objects.create(
+        user=create_user(), title="Lecture", file="uploads/lecture.txt"
+    )
+    concept = Concept.objects.create(media_item=media_item, title="Entropy")
+    QuizQuestion.objects.create(
+        concept=concept, position=0, fingerprint="outdated", question_data={}
+    )
+    generated = QuizSchema(
+        questions=[
+            QuizQuestionSchema(
+                question="What is entropy?",
+                options=["Disorder", "Order"],
+                correct_index=0,
+                explanation="By definition.",
+            )
+        ]
+    )
+    outcome = {"error": RuntimeError("LLM unavailable")}
+
+    class StubAIService:
+        async def generate_quizzes_batched_async(self, concepts, **kwargs):
+            if "error" in outcome:
+                raise outcome["error"]
+            return [(c, generated) for c in concepts]
+
+    monkeypatch.setattr(quiz_pool, "AIService", StubAIService)
+    monkeypatch.setattr(quiz_pool, "get_llm", lambda **kwargs: None)
+
+    tasks.regenerate_quizzes(media_item.id)
+    assert QuizQuestion.objects.get(concept=concept).fingerprint == "outdated"
+
+    outcome.clear()
+    tasks.regenerate_quizzes(media_item.id)
+    question = QuizQuestion.objects.get(concept=concept)
+    assert question.question_data["question"] == "What is entropy?"
+    assert question.fingerprint != "outdated"
+
+
+def test_study_plan_regeneration_runs_once_per_item(create_user, monkeypatch):
+    media_item = MediaItem.objects.create(
+        user=create_user(), title="Lecture", file="uploads/lecture.txt"
+    )
+    media_item.transcription = "Lecture transcript"
+    media_item.save()
+    Concept.objects.create(media_item=media_item, title="Entropy")
+    calls = []
+    monkeypatch.setattr(tasks, "AIService", lambda: calls.append(1))
+
+    cache.set(f"plan-generation:{media_item.id}", True)
+    tasks.regenerate_study_plan(media_item.id)
+    assert calls == []
+
+    cache.delete(f"plan-generation:{media_item.id}")
+    project_settings = ProjectSettings.load()
+    StudyPlan.objects.create(
+        user=media_item.user,
+        media_item=media_item,
+        fingerprint=plan_fingerprint(
+            project_settings,
+            concepts_fingerprint(project_settings, media_item.transcription),
+        ),
+    )
+    tasks.regenerate_study_plan(media_item.id)
+    assert calls == []
@@ -0,0 +1,50 @@
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import InMemoryStorage
+
+from apps.library import tasks
+from apps.library.models import MediaItem
+from apps.library.services.artifact_cache import ArtifactCache
+from apps.library.services.storage import is_local_storage, local_path
+
+
+@pytest.fixture
+def remote_storage(settings, tmp_path):
+    settings.STORAGES = {
+        **settings.STORAGES,
+        "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+    }
+    settings.ARTIFACT_CACHE_DIR = tmp_path / "artifacts"
+
+
+def test_worker_processes_files_from_remote_storage(remote_storage, create_user):
+    item = MediaItem(
+        user=create_user(), title="Notes", media_type=MediaItem.MediaType.TEXT
+    )
+    item.file.save("notes.txt", ContentFile(b"Remote lecture notes."))
+    assert not is_local_storage(item.file.storage)
+
+    path = local_path(item.file)
+    assert path.read_bytes() == b"Remote lecture notes."
+    assert local_path(item.file) == path
+
+    tasks.analyze_media(item.id)
+
+    item.refresh_from_db()
+    assert item.transcription == "Remote lecture notes."
+
+
+def test_artifacts_are_shared_between_nodes(tmp_path):
+    remote = InMemoryStorage()
+    calls = []
+
+    def build(output):
+        calls.append(output)
+        output.write_bytes(b"audio")
+
+    for node in ("a", "b"):
+        cache = ArtifactCache(tmp_path / node, max_bytes=1000, remote=remote)
+        path = cache.get_or_create("abc", "audio", ".wav", build)
+        assert path.read_bytes() == b"audio"
+
+    assert len(calls) == 1
@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.prompts import ChatPromptTemplate
+
+from apps.learning.agents.base import ainvoke_structured, invoke_structured
+from apps.learning.schemas import ConceptSchema
+
+PROMPT = ChatPromptTemplate.from_messages([("human", "Explain {topic}")])
+VALID = {"title": "Entropy", "description": "Disorder", "complexity": 2}
+
+
+class StubLLM:
+    """Returns the given raw messages in turn, recording what it was sent."""
+
+    def __init__(self, *raws):
+        self.raws = list(raws)
+        self.calls = []
+
+    def with_structured_output(self, schema, include_raw):
+        return self
+
+    def invoke(self, messages):
+        self.calls.append(messages)
+        raw = self.raws.pop(0)
+        if isinstance(raw, ConceptSchema):
+            return {"raw": AIMessage(content=""), "parsed": raw}
+        return {"raw": raw, "parsed": None}
+
+    async def ainvoke(self, messages):
+        return self.invoke(messages)
+
+
+def invoke(llm):
+    return invoke_structured(
+        llm, PROMPT, ConceptSchema, {"topic": "entropy"}, "Test"
+    )
+
+
+def test_fenced_json_is_repaired_without_retry():
+    llm = StubLLM(AIMessage(content=f"```json\n{json.dumps(VALID)}\n```"))
+
+    assert invoke(llm) == ConceptSchema(**VALID)
+    assert len(llm.calls) == 1
+
+
+def test_tool_call_arguments_are_repaired():
+    llm = StubLLM(
+        AIMessage(
+            content="",
+            tool_calls=[{"name": "ConceptSchema", "args": VALID, "id": "1"}],
+        )
+    )
+
+    assert invoke(llm).title == "Entropy"
+
+
+def test_retry_carries_the_validation_error():
+    llm = StubLLM(
+        AIMessage(content='{"title": "Entropy"}'), ConceptSchema(**VALID)
+    )
+
+    assert invoke(llm).title == "Entropy"
+    assert len(llm.calls) == 2
+    retry = llm.calls[1][-1].content
+    assert "did not match the required schema" in retry
+    assert "description" in retry
+
+
+def test_invalid_output_after_retry_raises():
+    llm = StubLLM(AIMessage(content="No idea."), AIMessage(content="Still no."))
+
+    with pytest.raises(ValueError, match="Test returned invalid output"):
+        invoke(llm)
+
+
+def test_async_version_repairs_and_retries():
+    llm = StubLLM(
+        AIMessage(content="No idea."), AIMessage(content=json.dumps(VALID))
+    )
+
+    result = asyncio.run(
+        ainvoke_structured(
+            llm, PROMPT, ConceptSchema, {"topic": "entropy"}, "Test"
+        )
+    )
+
+    assert result == ConceptSchema(**VALID)
+    assert len(llm.calls) == 2
@@ -0,0 +1,26 @@
+import logging
+
+from config import worker_memory
+
+
+class FakeTask:
+    name = "apps.library.tasks.analyze_media"
+
+
+def test_rss_is_logged_and_limit_warns(settings, caplog, monkeypatch):
+    readings = iter([500 * worker_memory.MB, 900 * worker_memory.MB])
+    monkeypatch.setattr(worker_memory, "current_rss", lambda: next(readings))
+    settings.WORKER_MAX_MEMORY_MB = 800
+
+    with caplog.at_level(logging.INFO, logger="config.worker_memory"):
+        worker_memory.sample_rss_before_task(task_id="t1")
+        worker_memory.check_rss_after_task(task_id="t1", task=FakeTask())
+
+    assert "900 MB (+400 MB)" in caplog.text
+    assert "recycling the process" in caplog.text
+    assert "t1" not in worker_memory._rss_before
+
+
+def test_current_rss_reads_proc():
+    rss = worker_memory.current_rss()
+    assert rss is None or rss > 0